@@ -1,6 +1,32 @@
+import socket
+import time
+
 import typer
+from typing import List, Optional
+
+from src.app.service import TCPService
+from src.config import profiles
+from src.config.loader import ConfigLoader
+from src.network import info
+from src.network.archive import parse_duration
+from src.network.latency import serve_echo
+from src.network.runner import CommandRunner
+from src.network.tuning import NetworkTuningManager
+from src.reporting.logger import Logger
 
 app = typer.Typer()
+checkpoint_app = typer.Typer(help="Inspect and roll back settings checkpoints.")
+app.add_typer(checkpoint_app, name="checkpoint")
+netns_app = typer.Typer(help="Tune other network namespaces.")
+app.add_typer(netns_app, name="netns")
+metrics_app = typer.Typer(help="Record and query the metrics archive.")
+app.add_typer(metrics_app, name="metrics")
+
+def build_service() -> TCPService:
+    """Wires the service with its default collaborators."""
+    logger = Logger()
+    runner = CommandRunner()
+    return TCPService(ConfigLoader(), profiles, NetworkTuningManager(runner, logger), info, runner, logger)
 
 @app.command()
 def main():
@@ -9,5 +35,200 @@ def main():
     """
     typer.echo("TCP Optimizer CLI is running.")
 
+@app.command()
+def watch(
+    profile: Optional[str] = typer.Option(None, help="Profile to enforce. Defaults to the applied config file."),
+    interval: float = typer.Option(30.0, help="Seconds between polls."),
+    policy: str = typer.Option("alert", help="alert, reapply or locate."),
+):
+    """
+    Watch the managed sysctl keys and react when something else changes them.
+    """
+    build_service().watch_for_drift(profile, {}, interval=interval, policy=policy)
+
+@app.command()
+def schedule():
+    """
+    Switch profiles automatically as load changes, following the "scheduler" rules in profiles.json.
+    """
+    build_service().run_scheduler({})
+
+@app.command()
+def apply(
+    profile: str = typer.Argument(..., help="Profile name from profiles.json."),
+    benchmark: List[str] = typer.Option([], help="Local benchmark to run before and after (repeatable)."),
+):
+    """
+    Apply a profile, optionally benchmarking before and after.
+    """
+    build_service().apply_predefined_profile_and_benchmark(profile, {"benchmarks": benchmark})
+
+@app.command()
+def benchmark(
+    name: str = typer.Argument(..., help="Benchmark to run: churn, throughput, latency or udp."),
+    duration: float = typer.Option(10.0, help="Seconds to run."),
+):
+    """
+    Run a local benchmark against the current settings.
+    """
+    build_service().run_benchmark(name, {"duration": duration})
+
+@app.command()
+def canary(
+    profile: str = typer.Argument(..., help="Profile name from profiles.json."),
+    baseline: float = typer.Option(60.0, help="Seconds of baseline health to record before applying."),
+    soak: float = typer.Option(300.0, help="Seconds to watch after applying."),
+    interval: float = typer.Option(30.0, help="Seconds per health sample."),
+    probe: List[str] = typer.Option([], help="Command that must keep succeeding (repeatable)."),
+    rtt_target: List[str] = typer.Option([], help="host:port to time TCP connects against (repeatable)."),
+):
+    """
+    Apply a profile and roll it back automatically if health regresses.
+    """
+    build_service().canary_apply(profile, {"probe_commands": probe, "rtt_targets": rtt_target},
+                                 baseline_window=baseline, soak_period=soak, interval=interval)
+
+@app.command()
+def pmtu(
+    targets: List[str] = typer.Argument(..., help="Hosts to probe."),
+    timeout: float = typer.Option(1.0, help="Seconds to wait for each probe's answer."),
+    apply: bool = typer.Option(False, help="Apply the recommended tcp_mtu_probing mode."),
+):
+    """
+    Find the path MTU to each target and recommend MTU probing, MSS clamping and jumbo frames.
+    """
+    build_service().probe_path_mtu(targets, timeout=timeout, apply=apply)
+
+@app.command()
+def ports(
+    interval: float = typer.Option(5.0, help="Seconds to measure the outbound connection rate over."),
+    apply: bool = typer.Option(False, help="Merge the recommended overlay into the applied settings."),
+    save: bool = typer.Option(False, help="Write the overlay, on top of the base profile, to profiles.json."),
+    base_profile: str = typer.Option("balanced", help="Profile the saved overlay builds on."),
+):
+    """
+    Find ephemeral port and TIME-WAIT exhaustion risks per destination and recommend port range and TIME-WAIT limits.
+    """
+    build_service().analyze_ephemeral_ports({}, interval=interval, apply=apply, save=save, base_profile=base_profile)
+
+@app.command("low-latency")
+def low_latency(
+    usecs: List[int] = typer.Option([], help="Busy-poll microseconds to try (repeatable; 0, the baseline, is always run)."),
+    budget: List[int] = typer.Option([], help="SO_BUSY_POLL_BUDGET values to try (repeatable)."),
+    duration: float = typer.Option(5.0, help="Seconds per point."),
+    max_cpu: Optional[float] = typer.Option(None, help="Highest CPU use, in cores, a point may cost."),
+    target: Optional[str] = typer.Option(None, help="host:port of a remote latency-server (default: loopback)."),
+    save: bool = typer.Option(False, help="Write the generated profile to profiles.json (requires --target)."),
+):
+    """
+    Find the busy-poll setting with the best latency/CPU trade-off and generate a low-latency profile.
+    """
+    build_service().tune_busy_poll({}, usecs=usecs, budgets=[None] + budget if budget else None, duration=duration,
+                                   max_cpu_cores=max_cpu, save=save, target=target)
+
+@app.command("latency-server")
+def latency_server(
+    host: str = typer.Option("0.0.0.0", help="Address to listen on."),
+    port: int = typer.Option(7007, help="Port to listen on."),
+    busy_poll: int = typer.Option(0, help="SO_BUSY_POLL microseconds for accepted connections."),
+):
+    """
+    Run the echo server for 'low-latency --target' and 'benchmark latency' from another host.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(128)
+    typer.echo(f"Echoing on {host}:{port}")
+    try:
+        serve_echo(server, busy_poll=busy_poll)
+    except KeyboardInterrupt:
+        pass
+
+@checkpoint_app.command("list")
+def checkpoint_list():
+    """
+    List stored checkpoints, oldest first.
+    """
+    build_service().list_checkpoints()
+
+@checkpoint_app.command("diff")
+def checkpoint_diff(
+    from_id: int = typer.Argument(..., help="Checkpoint to compare from."),
+    to_id: Optional[int] = typer.Argument(None, help="Checkpoint to compare to. Defaults to the live values."),
+):
+    """
+    Show the keys that differ between two checkpoints.
+    """
+    build_service().diff_checkpoints(from_id, to_id)
+
+@checkpoint_app.command("rollback")
+def checkpoint_rollback(checkpoint_id: int = typer.Argument(..., help="Checkpoint to restore.")):
+    """
+    Restore a checkpoint, writing only the keys that differ.
+    """
+    build_service().rollback_to_checkpoint(checkpoint_id)
+
+@netns_app.command("list")
+def netns_list():
+    """
+    List network namespaces other than this one.
+    """
+    build_service().list_network_namespaces()
+
+@netns_app.command("apply")
+def netns_apply(
+    profile: str = typer.Argument(..., help="Profile name from profiles.json."),
+    ns: List[str] = typer.Option([], help="Namespace id, name or PID (repeatable; default: all)."),
+    concurrency: int = typer.Option(8, help="Namespaces to tune at once."),
+):
+    """
+    Apply a profile inside network namespaces.
+    """
+    build_service().apply_profile_to_namespaces(profile, {}, ns, concurrency)
+
+@netns_app.command("snapshot")
+def netns_snapshot(
+    profile: str = typer.Argument(..., help="Profile whose keys are recorded."),
+    ns: List[str] = typer.Option([], help="Namespace id, name or PID (repeatable; default: all)."),
+    concurrency: int = typer.Option(8, help="Namespaces to snapshot at once."),
+):
+    """
+    Record a checkpoint of a profile's keys inside network namespaces.
+    """
+    build_service().snapshot_namespaces(profile, {}, ns, concurrency)
+
+@netns_app.command("revert")
+def netns_revert(
+    ns: List[str] = typer.Option([], help="Namespace id, name or PID (repeatable; default: all)."),
+    checkpoint_id: Optional[int] = typer.Option(None, "--checkpoint", help="Checkpoint to restore (default: original)."),
+    concurrency: int = typer.Option(8, help="Namespaces to revert at once."),
+):
+    """
+    Revert network namespaces to their original settings.
+    """
+    build_service().revert_namespaces(ns, checkpoint_id, concurrency)
+
+@metrics_app.command("record")
+def metrics_record(interval: float = typer.Option(10.0, help="Seconds between samples.")):
+    """
+    Sample TCP counters and interface rates into the archive until interrupted.
+    """
+    build_service().record_metrics({}, interval=interval)
+
+@metrics_app.command("query")
+def metrics_query(
+    since: str = typer.Option("1h", help="How far back to read, e.g. 90s, 15m, 6h, 7d."),
+    until: Optional[str] = typer.Option(None, help="How far back the range ends (default: now)."),
+    metric: List[str] = typer.Option([], help="Metric to show (repeatable; default: all)."),
+    tier: Optional[int] = typer.Option(None, help="0 raw, 1 per-minute, 2 per-hour (default: finest that covers the range)."),
+):
+    """
+    Show archived metrics for a time range.
+    """
+    now = time.time()
+    build_service().query_metrics({}, now - parse_duration(since), now - parse_duration(until) if until else None,
+                                  metric or None, tier)
+
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -1,10 +1,49 @@
 import curses
 import os
+import ipaddress
 import json
+import logging
+import time
 
-from src.config.profiles import load_profiles, get_active_profile
+from src.config.profiles import load_profiles, get_active_profile, save_profile
 from src.network.sysctl import backup_settings, write_sysctl_config, apply_sysctl_from_conf, revert_settings, get_sysctl_value
 from src.network.info import get_system_information
+from src.network.drift import DriftDetector
+from src.network.workload import WorkloadSampler, analyze_workload, format_evidence
+from src.network.memory import check_profile_budget, format_plan, plan_memory_budget
+from src.network.capabilities import format_resolution, get_capabilities, resolve_profile
+from src.network.churn import format_churn_report, run_churn_benchmark
+from src.network.throughput import format_throughput_report, run_throughput_benchmark
+from src.network.latency import format_latency_report, run_latency_benchmark
+from src.network.udp import format_udp_report, run_udp_benchmark
+from src.network.busypoll import (GENERATED_PROFILE, baseline_point, build_low_latency_profile, choose_operating_point,
+                                  format_sweep, sweep_busy_poll)
+from src.network.checkpoints import format_checkpoint
+from src.network.health import HealthMonitor, find_regressions, format_health, mean_health
+from src.network import netns
+from src.network.pmtu import format_pmtu_results, probe_path_mtu, recommend_mtu_settings
+from src.network import ports
+from src.network.archive import ARCHIVE_FILE, MetricsArchive, MetricsRecorder, format_rows
+from src.network.scheduler import DEFAULT_SCHEDULE, ProfileScheduler, RulesEngine
+from src.network.sysctl import read_sysctl_config
+
+# Local benchmarks selectable through the "benchmarks" option: name -> (run, format report).
+LOCAL_BENCHMARKS = {
+    "churn": (run_churn_benchmark, format_churn_report),
+    "throughput": (run_throughput_benchmark, format_throughput_report),
+    "latency": (run_latency_benchmark, format_latency_report),
+    "udp": (run_udp_benchmark, format_udp_report),
+}
+
+def _is_loopback(target):
+    """True when a "host:port" benchmark target (None: the local echo server) is on this host."""
+    if not target:
+        return True
+    host = target.rsplit(":", 1)[0].strip("[]")
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
 
 class TCPService:
     def __init__(self, config_loader, profile_manager, tuning_manager, network_info_provider, runner, logger):
@@ -18,8 +57,20 @@ class TCPService:
     def run_analysis_and_apply_optimal_settings(self, cli_args):
         self.logger.log("Running analysis to recommend a profile...")
         config = self.config_loader.load_config(cli_args)
-        recommended_profile_key = "balanced"
+        window = (cli_args or {}).get("analysis_window", 30.0)
+        recorder = self._open_recorder(config)
+        try:
+            sampler = WorkloadSampler(window, recorder=recorder)
+            report = analyze_workload(config, window=window, thresholds=(cli_args or {}).get("workload_thresholds"), sampler=sampler)
+        finally:
+            if recorder is not None:
+                recorder.archive.close()
+        recommended_profile_key = report["profile"]
+        config.setdefault(recommended_profile_key, report["profile_data"])
 
+        self.logger.log(f"Workload: {report['workload']} ({'; '.join(report['reasons'])})")
+        for line in format_evidence(report["evidence"]):
+            self.logger.log(line)
         self.logger.log(f"Recommended profile: '{recommended_profile_key}'. Applying and benchmarking...")
         self._apply_profile_and_benchmark(recommended_profile_key, config)
 
@@ -39,5 +90,386 @@ class TCPService:
         self.tuning_manager.revert_settings()
         self.logger.log("Settings reverted to original defaults.")
 
+    def canary_apply(self, profile_name, cli_args, baseline_window=60.0, soak_period=300.0, interval=30.0):
+        """Applies a profile under watch and rolls it back automatically if host health regresses.
+
+        Health is sampled every `interval` seconds: first over `baseline_window` before the change,
+        then for `soak_period` after it. Options "rtt_targets", "probe_commands" and
+        "canary_thresholds" are read from the merged config.
+        """
+        config = self.config_loader.load_config(cli_args)
+        if profile_name not in config:
+            self.logger.log(f"Profile '{profile_name}' not found.")
+            return None
+        settings = self._plan_settings(profile_name, config)
+        monitor = HealthMonitor(self.runner, config.get("rtt_targets"), config.get("probe_commands"))
+        thresholds = config.get("canary_thresholds")
+
+        self.logger.log(f"Canary '{profile_name}': recording baseline health for {baseline_window}s...")
+        samples = [monitor.sample(interval) for _ in range(max(1, int(baseline_window // interval)))]
+        baseline = mean_health(samples)
+        self.logger.log(f"Canary baseline: {format_health(baseline)}")
+
+        checkpoint = self.tuning_manager.backup_settings(self._managed_keys(settings, config), label=f"before canary {profile_name}")
+        self.tuning_manager.apply_settings(settings)
+        self.logger.log(f"Canary '{profile_name}' applied; soaking for {soak_period}s.")
+
+        evidence = []
+        try:
+            for _ in range(max(1, int(soak_period // interval))):
+                sample = monitor.sample(interval)
+                regressions = find_regressions(baseline, sample, thresholds)
+                evidence.append({"sample": sample, "regressions": regressions})
+                self.logger.log(f"Canary sample: {format_health(sample)}")
+                if regressions:
+                    for regression in regressions:
+                        self.logger.log(f"Canary regression: {regression}", level=logging.WARNING)
+                    self._rollback_canary(profile_name, checkpoint["id"])
+                    return {"outcome": "rolled_back", "baseline": baseline, "evidence": evidence, "checkpoint": checkpoint["id"]}
+        except BaseException as e:
+            # An interrupted or crashed soak must not leave an unverified profile applied.
+            self.logger.log(f"Canary '{profile_name}' soak aborted: {e!r}", level=logging.ERROR)
+            self._rollback_canary(profile_name, checkpoint["id"])
+            raise
+        self.logger.log(f"Canary '{profile_name}' PASSED after {len(evidence)} samples with no regressions.")
+        return {"outcome": "passed", "baseline": baseline, "evidence": evidence, "checkpoint": checkpoint["id"]}
+
+    def _rollback_canary(self, profile_name, checkpoint_id):
+        changes, errors = self.tuning_manager.checkpoints.rollback(checkpoint_id)
+        self.logger.log(
+            f"Canary '{profile_name}' FAILED; rolled back to checkpoint #{checkpoint_id} "
+            f"({len(changes) - len(errors)} keys restored, {len(errors)} failed).",
+            level=logging.ERROR,
+        )
+
+    def probe_path_mtu(self, targets, timeout=1.0, apply=False):
+        """Measures the path MTU to each target and logs the recommended MTU probing mode, MSS clamps and jumbo advice."""
+        results = probe_path_mtu(targets, timeout=timeout)
+        for line in format_pmtu_results(results):
+            self.logger.log(line)
+        recommendation = recommend_mtu_settings(results)
+        for note in recommendation["notes"]:
+            self.logger.log(note)
+        for key, value in recommendation["settings"].items():
+            self.logger.log(f"Recommended: {key} = {value}")
+        if apply:
+            self.tuning_manager.backup_settings(self._managed_keys(recommendation["settings"]), label="before pmtu recommendation")
+            # The config file holds the whole applied profile, so merge rather than replace it.
+            self.tuning_manager.apply_settings(dict(read_sysctl_config(), **recommendation["settings"]))
+        return {"results": results, "recommendation": recommendation}
+
+    def analyze_ephemeral_ports(self, cli_args, interval=5.0, apply=False, save=False, base_profile="balanced"):
+        """Reports ephemeral port and TIME-WAIT pressure per destination and the overlay that relieves it.
+
+        With `apply` the overlay is merged into the applied config; with `save` it is layered on
+        `base_profile` and written to profiles.json as a generated profile.
+        """
+        self.logger.log(f"Measuring outbound connection rate for {interval}s...")
+        try:
+            report = ports.analyze_ports(interval)
+        except OSError as e:
+            self.logger.log(f"Cannot read sockets via sock_diag: {e}", level=logging.ERROR)
+            return None
+        except ValueError as e:
+            self.logger.log(f"Cannot analyze ephemeral ports: {e}", level=logging.ERROR)
+            return None
+        recommendation = ports.recommend_port_settings(report)
+        for line in ports.format_port_report(report, recommendation):
+            self.logger.log(line)
+        for note in recommendation["notes"]:
+            self.logger.log(note)
+        overlay = recommendation["settings"]
+        if not overlay:
+            self.logger.log("No port or TIME-WAIT changes needed at the measured rates.")
+            return {"report": report, "recommendation": recommendation}
+        for key, value in overlay.items():
+            self.logger.log(f"Recommended: {key} = {value} (currently {report['settings'].get(key)})")
+        if save:
+            config = self.config_loader.load_config(cli_args)
+            save_profile(ports.GENERATED_PROFILE, {
+                "description": f"Generated: {base_profile} with ephemeral port and TIME-WAIT limits sized for "
+                               f"{report['outbound_rate']:.0f} outbound connections/s.",
+                "settings": dict(config.get(base_profile, {}).get("settings", {}), **overlay),
+            })
+            self.logger.log(f"Saved profile '{ports.GENERATED_PROFILE}'.")
+        if apply:
+            self.tuning_manager.backup_settings(self._managed_keys(overlay), label="before ephemeral port overlay")
+            self.tuning_manager.apply_settings(dict(read_sysctl_config(), **overlay))
+        return {"report": report, "recommendation": recommendation}
+
+    def tune_busy_poll(self, cli_args, usecs=None, budgets=None, duration=5.0, max_cpu_cores=None,
+                       base_profile="gaming", save=False, **options):
+        """Sweeps busy-poll settings under the latency benchmark and writes the chosen point into a generated profile.
+
+        Busy polling only acts on NIC queues, so a sweep over loopback (no "target" option) is
+        reported but never saved.
+        """
+        config = self.config_loader.load_config(cli_args)
+        sweep = {key: value for key, value in (("usecs", usecs), ("budgets", budgets)) if value}
+        self.logger.log("Sweeping busy-poll settings with the request/response latency benchmark...")
+        points = sweep_busy_poll(duration=duration, **sweep, **options)
+        chosen = choose_operating_point(points, max_cpu_cores)
+        for line in format_sweep(points, chosen):
+            self.logger.log(line)
+        baseline = baseline_point(points)
+        profile = build_low_latency_profile(chosen, baseline, config.get(base_profile, {}).get("settings", {}))
+        self.logger.log(profile["description"])
+        if save and _is_loopback(options.get("target")):
+            self.logger.log("Not saving: loopback results do not reflect busy polling on a NIC. "
+                            "Sweep against a remote latency-server with --target.", level=logging.WARNING)
+        elif save:
+            save_profile(GENERATED_PROFILE, profile)
+            self.logger.log(f"Saved profile '{GENERATED_PROFILE}'.")
+        return {"points": points, "chosen": chosen, "profile": profile}
+
+    def list_checkpoints(self):
+        """Logs and returns the stored checkpoints."""
+        checkpoints = self.tuning_manager.checkpoints.list()
+        for entry in checkpoints:
+            self.logger.log(format_checkpoint(entry))
+        return checkpoints
+
+    def diff_checkpoints(self, from_id, to_id=None):
+        """Logs the keys that differ between two checkpoints, or between one and the live values."""
+        changes = self.tuning_manager.checkpoints.diff(from_id, to_id)
+        target = f"#{to_id}" if to_id is not None else "live"
+        self.logger.log(f"#{from_id} -> {target}: {len(changes)} keys differ")
+        for key, (old, new) in changes.items():
+            self.logger.log(f"{key}: {old} -> {new}")
+        return changes
+
+    def rollback_to_checkpoint(self, checkpoint_id):
+        """Restores a checkpoint, writing only the keys that differ from the live values."""
+        changes, errors = self.tuning_manager.checkpoints.rollback(checkpoint_id)
+        for key, (old, new) in changes.items():
+            if key in errors:
+                self.logger.log(f"Could not restore {key}: {errors[key]}", level=logging.ERROR)
+            else:
+                self.logger.log(f"{key}: {old} -> {new}")
+        self.logger.log(f"Rolled back to checkpoint #{checkpoint_id} ({len(changes) - len(errors)} keys written).")
+        return changes, errors
+
+    def _select_namespaces(self, selectors=None):
+        namespaces = netns.list_namespaces()
+        if selectors:
+            namespaces = [ns for ns in namespaces if ns["id"] in selectors or ns["name"] in selectors
+                          or any(str(pid) in selectors for pid in ns["pids"])]
+        return namespaces
+
+    def list_network_namespaces(self):
+        """Logs and returns the network namespaces other than the tool's own."""
+        namespaces = netns.list_namespaces()
+        for ns in namespaces:
+            pids = ", ".join(str(pid) for pid in ns["pids"][:5]) + (" ..." if len(ns["pids"]) > 5 else "")
+            self.logger.log(f"{ns['id']}  {ns['name'] or '-'}  pids: {pids or '-'}")
+        return namespaces
+
+    def apply_profile_to_namespaces(self, profile_name, cli_args, selectors=None, concurrency=netns.DEFAULT_CONCURRENCY):
+        """Applies a profile inside each selected namespace (all of them by default), backing each up first."""
+        config = self.config_loader.load_config(cli_args)
+        if profile_name not in config:
+            self.logger.log(f"Profile '{profile_name}' not found.")
+            return None
+        settings = self._plan_settings(profile_name, config)
+        _, host_global = netns.split_host_global(settings)
+        if host_global:
+            self.logger.log(f"Not applied inside namespaces (host-wide; use 'apply' on the host): {', '.join(sorted(host_global))}",
+                            level=logging.WARNING)
+        results = netns.apply_to_namespaces(self._select_namespaces(selectors), settings, f"before {profile_name}", concurrency,
+                                            fallbacks=config[profile_name].get("fallbacks"))
+        return self._log_namespace_results(results, f"Applied '{profile_name}'")
+
+    def snapshot_namespaces(self, profile_name, cli_args, selectors=None, concurrency=netns.DEFAULT_CONCURRENCY):
+        """Records a checkpoint of a profile's keys inside each selected namespace."""
+        config = self.config_loader.load_config(cli_args)
+        if profile_name not in config:
+            self.logger.log(f"Profile '{profile_name}' not found.")
+            return None
+        results = netns.snapshot_namespaces(self._select_namespaces(selectors), config[profile_name]["settings"].keys(),
+                                            f"snapshot {profile_name}", concurrency)
+        return self._log_namespace_results(results, "Snapshot taken")
+
+    def revert_namespaces(self, selectors=None, checkpoint_id=None, concurrency=netns.DEFAULT_CONCURRENCY):
+        """Restores each selected namespace to a checkpoint, by default to its original values."""
+        results = netns.revert_namespaces(self._select_namespaces(selectors), checkpoint_id, concurrency)
+        return self._log_namespace_results(results, "Reverted")
+
+    def _log_namespace_results(self, results, action):
+        failed = 0
+        for result in results:
+            failed += bool(result.get("error") or result.get("errors"))
+            self.logger.log(netns.format_namespace_result(result),
+                            level=logging.ERROR if result.get("error") or result.get("errors") else logging.INFO)
+        self.logger.log(f"{action} in {len(results) - failed}/{len(results)} namespaces.")
+        return results
+
+    def watch_for_drift(self, profile_name, cli_args, interval=30.0, policy="alert", iterations=None):
+        """Runs the drift watcher against a profile, or against the applied config file when no profile is given."""
+        config = self.config_loader.load_config(cli_args)
+        if profile_name:
+            if profile_name not in config:
+                self.logger.log(f"Profile '{profile_name}' not found.")
+                return None
+            expected = config[profile_name]["settings"]
+        else:
+            expected = read_sysctl_config()
+            if not expected:
+                self.logger.log("No applied profile found. Apply a profile or pass one explicitly.")
+                return None
+        recorder = self._open_recorder(config)
+        try:
+            detector = DriftDetector(expected, self.logger, policy=policy, interval=interval, recorder=recorder)
+            return detector.run(iterations=iterations)
+        finally:
+            if recorder is not None:
+                recorder.archive.close()
+
+    def run_scheduler(self, cli_args, iterations=None, sleep=time.sleep):
+        """Switches profiles automatically as load changes, following the rules in the "scheduler" option.
+
+        Every profile a rule can pick is planned once up front (memory budget, kernel capabilities)
+        and a checkpoint of all their keys is taken, so 'rollback' can undo the whole session.
+        """
+        config = self.config_loader.load_config(cli_args)
+        schedule = dict(DEFAULT_SCHEDULE, **config.get("scheduler", {}))
+        names = {schedule["default_profile"]} | {rule["profile"] for rule in schedule["rules"]}
+        missing = sorted(name for name in names if name not in config)
+        if missing:
+            self.logger.log(f"Scheduler profiles not found: {', '.join(missing)}.")
+            return None
+        if not schedule["rules"]:
+            self.logger.log("No scheduler rules configured; add a \"scheduler\" section with \"rules\".")
+            return None
+        profiles = {name: {"settings": self._plan_settings(name, config)} for name in sorted(names)}
+        try:
+            engine = RulesEngine(schedule["rules"], schedule["default_profile"], schedule["enter_samples"],
+                                 schedule["exit_samples"], schedule["hysteresis"])
+            scheduler_kwargs = {"audit_log": schedule["audit_log"]} if "audit_log" in schedule else {}
+            scheduler = ProfileScheduler(profiles, engine, self.logger, min_dwell=schedule["min_dwell"],
+                                         max_switches_per_hour=schedule["max_switches_per_hour"], **scheduler_kwargs)
+        except (KeyError, ValueError) as e:
+            self.logger.log(f"Invalid scheduler rules: {e}", level=logging.ERROR)
+            return None
+        keys = self._managed_keys({key for profile in profiles.values() for key in profile["settings"]}, config)
+        checkpoint = self.tuning_manager.backup_settings(keys, label="before scheduler")
+        # Keys a profile stops managing on a switch go back to their value in this checkpoint.
+        scheduler.baseline = self.tuning_manager.checkpoints.get(checkpoint["id"])
+        scheduler.run(schedule["interval"], iterations=iterations, sleep=sleep)
+        return scheduler
+
+    def _open_recorder(self, config):
+        """Opens the metrics archive named by the "metrics_archive" option for writing; None disables recording."""
+        path = config.get("metrics_archive", ARCHIVE_FILE)
+        if not path:
+            return None
+        try:
+            return MetricsRecorder(MetricsArchive(path, writable=True))
+        except (OSError, ValueError) as e:
+            self.logger.log(f"Metrics archive disabled: {e}", level=logging.WARNING)
+            return None
+
+    def record_metrics(self, cli_args, interval=10.0, iterations=None, sleep=time.sleep):
+        """Samples host metrics into the archive every `interval` seconds until interrupted."""
+        recorder = self._open_recorder(self.config_loader.load_config(cli_args))
+        if recorder is None:
+            return 0
+        self.logger.log(f"Recording metrics to {recorder.archive.path} every {interval}s")
+        written = 0
+        try:
+            while iterations is None or written < iterations:
+                if recorder.record() is not None:
+                    written += 1
+                sleep(interval)
+        except KeyboardInterrupt:
+            self.logger.log("Metrics recorder stopped.")
+        finally:
+            recorder.archive.close()
+        return written
+
+    def query_metrics(self, cli_args, since, until=None, metrics=None, tier=None):
+        """Logs and returns archived metrics for a time range, read straight from the mapped file."""
+        path = self.config_loader.load_config(cli_args).get("metrics_archive", ARCHIVE_FILE)
+        try:
+            archive = MetricsArchive(path)
+        except (OSError, ValueError) as e:
+            self.logger.log(f"Cannot read metrics archive: {e}", level=logging.ERROR)
+            return None
+        with archive:
+            names = metrics or archive.metrics
+            try:
+                rows = archive.query(since, until, names, tier)
+            except ValueError as e:
+                self.logger.log(str(e), level=logging.ERROR)
+                return None
+        for line in format_rows(rows, names):
+            self.logger.log(line)
+        return rows
+
+    def run_benchmark(self, name, options=None, label=""):
+        """Runs one local benchmark and logs its report."""
+        if name not in LOCAL_BENCHMARKS:
+            self.logger.log(f"Unknown benchmark '{name}'. Available: {', '.join(LOCAL_BENCHMARKS)}")
+            return None
+        run, format_report = LOCAL_BENCHMARKS[name]
+        self.logger.log(f"Running {label + ' ' if label else ''}{name} benchmark...")
+        try:
+            report = run(**(options or {}))
+        except OSError as e:
+            self.logger.log(f"{name} benchmark failed: {e}", level=logging.ERROR)
+            return None
+        for line in format_report(report):
+            self.logger.log(line)
+        return report
+
+    def _run_benchmarks(self, config, label):
+        options = config.get("benchmark_options", {})
+        return {name: self.run_benchmark(name, options.get(name), label) for name in config.get("benchmarks", [])}
+
+    def _plan_settings(self, profile_name, config):
+        """Returns the profile's settings after the memory budget check and kernel capability resolution."""
+        settings = config[profile_name]["settings"]
+        plan = plan_memory_budget()
+        if plan is None:
+            self.logger.log("Memory budget: cannot read MemTotal from /proc/meminfo; applying the profile unclamped.",
+                            level=logging.WARNING)
+        else:
+            clamped, warnings = check_profile_budget(settings, plan)
+            for line in format_plan(plan):
+                self.logger.log(line)
+            for warning in warnings:
+                self.logger.log(f"Memory budget: {warning}", level=logging.WARNING)
+            if config.get("memory_policy", "clamp") == "clamp":
+                if warnings:
+                    self.logger.log("Clamping profile to the memory budget.")
+                settings = clamped
+        resolved, report = resolve_profile(settings, get_capabilities(settings.keys()), config[profile_name].get("fallbacks"))
+        for line in format_resolution(report):
+            self.logger.log(f"Capability: {line}", level=logging.WARNING)
+        return resolved
+
+    def _managed_keys(self, keys, config=None):
+        """Every key the optimizer may have changed: all profiles' keys, the applied config file's and `keys`.
+
+        Checkpoints cover all of them, so rolling back or rewriting the config file from one never
+        leaves another tuned key behind.
+        """
+        if config is None:
+            try:
+                config = self.config_loader.load_config({})
+            except (OSError, ValueError):
+                config = {}
+        profiles = [entry["settings"] for entry in config.values()
+                    if isinstance(entry, dict) and isinstance(entry.get("settings"), dict)]
+        return sorted(set(keys).union(read_sysctl_config(), *profiles))
+
     def _apply_profile_and_benchmark(self, profile_name, config):
-        self.logger.log(f"Applying profile '{profile_name}' and running benchmarks (placeholder)...")
\ No newline at end of file
+        if profile_name not in config:
+            self.logger.log(f"Profile '{profile_name}' not found.")
+            return
+        settings = self._plan_settings(profile_name, config)
+        before = self._run_benchmarks(config, "'Before'")
+        self.tuning_manager.backup_settings(self._managed_keys(settings, config), label=f"before {profile_name}")
+        self.tuning_manager.apply_settings(settings)
+        self.logger.log(f"Applied profile '{profile_name}'.")
+        after = self._run_benchmarks(config, "'After'")
+        return {"settings": settings, "before": before, "after": after}
\ No newline at end of file
@@ -15,6 +15,20 @@ def load_profiles():
     except json.JSONDecodeError:
         return None
 
+def save_profile(name, profile_data, path=PROFILES_FILE):
+    """Adds or replaces one profile in the profiles file, keeping the others as they are."""
+    try:
+        with open(path, 'r') as f:
+            profiles = json.load(f)
+    except FileNotFoundError:
+        profiles = {}
+    profiles[name] = profile_data
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(profiles, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
 def get_active_profile(profiles):
     """Identifies the active profile based on current settings."""
     if not os.path.exists(SYSCTL_CONF_FILE):
@@ -1,10 +1,21 @@
 import curses
 import os
+import time
 import json
 
 from src.config.profiles import load_profiles, get_active_profile
 from src.network.sysctl import backup_settings, write_sysctl_config, apply_sysctl_from_conf, revert_settings, get_sysctl_value
 from src.network.info import get_system_information
+from src.network.workload import analyze_workload, format_evidence
+from src.network.memory import check_profile_budget, format_plan, plan_memory_budget
+from src.network.capabilities import format_resolution, get_capabilities, resolve_profile
+from src.network.checkpoints import CheckpointStore, checkpoint_before_change, format_checkpoint
+from src.network.archive import MetricsArchive, format_rows
+
+ANALYSIS_WINDOW = 15
+# Menu label -> (seconds back, archive tier) for the metrics history view.
+HISTORY_RANGES = {"Last 10 Minutes": (600, 0), "Last Hour": (3600, 1), "Last Day": (86400, 2), "Last Week": (604800, 2)}
+HISTORY_METRICS = ["rx_bytes", "tx_bytes", "active_opens", "retrans_segs", "tcp_tw"]
 
 # --- Terminal User Interface (TUI) Functions ---
 
@@ -88,11 +99,14 @@ def run_profile_benchmark(stdscr, profile_key, profiles_data, all_managed_params
         before_speed = {'download': before_results['download'] / 1_000_000, 'upload': before_results['upload'] / 1_000_000, 'ping': before_results['ping']}
     except Exception as e: display_message(stdscr, f"Error during 'Before' speed test: {e}"); return
     display_message(stdscr, f"Applying '{profile_key}' profile...", pause=False)
-    backup_settings(ALL_MANAGED_PARAMS)
     if profiles_data is None or profile_key not in profiles_data:
         display_message(stdscr, "Profile data is not available or invalid.")
         return
-    write_sysctl_config(profiles_data[profile_key]["settings"])
+    settings = check_memory_budget(stdscr, profiles_data[profile_key]["settings"])
+    settings = resolve_capabilities(stdscr, settings, profiles_data[profile_key].get("fallbacks"))
+    backup_settings(sorted(set(all_managed_params) | set(settings)))
+    checkpoint_before_change(sorted(set(all_managed_params) | set(settings)), f"before {profile_key}")
+    write_sysctl_config(settings)
     apply_sysctl_from_conf()
     after_params = {p: get_sysctl_value(p) for p in key_params_to_check if get_sysctl_value(p)}
     display_message(stdscr, "Running 'After' speed test to measure improvement...", pause=False)
@@ -105,6 +119,36 @@ def run_profile_benchmark(stdscr, profile_key, profiles_data, all_managed_params
         display_comparison_report(stdscr, before_params, after_params, before_speed, {}); return
     display_comparison_report(stdscr, before_params, after_params, before_speed, after_speed)
 
+def check_memory_budget(stdscr, settings):
+    """Checks a profile against this machine's TCP memory budget and offers to clamp it."""
+    plan = plan_memory_budget()
+    if plan is None:
+        display_message(stdscr, "Memory budget skipped: /proc/meminfo is unreadable.")
+        return settings
+    clamped, warnings = check_profile_budget(settings, plan)
+    if clamped == settings:
+        return settings
+    stdscr.clear(); h, w = stdscr.getmaxyx()
+    stdscr.addstr(1, 2, "Memory Budget Warning", curses.A_BOLD | curses.A_UNDERLINE)
+    y_offset = 3
+    for line in format_plan(plan) + [""] + warnings:
+        if y_offset < h - 5: stdscr.addstr(y_offset, 4, line[:w - 6]); y_offset += 1
+    if get_confirmation(stdscr, "Apply these memory budget changes to the profile?"):
+        return clamped
+    return settings
+
+def resolve_capabilities(stdscr, settings, fallbacks=None):
+    """Resolves a profile against what this kernel supports and shows what was substituted or skipped."""
+    resolved, report = resolve_profile(settings, get_capabilities(settings.keys()), fallbacks)
+    if report:
+        stdscr.clear(); h, w = stdscr.getmaxyx()
+        stdscr.addstr(1, 2, "Kernel Capability Adjustments", curses.A_BOLD | curses.A_UNDERLINE)
+        y_offset = 3
+        for line in format_resolution(report):
+            if y_offset < h - 3: stdscr.addstr(y_offset, 4, line[:w - 6]); y_offset += 1
+        stdscr.addstr(h - 2, 2, "Press any key to continue..."); stdscr.getch()
+    return resolved
+
 def revert_and_show_report(stdscr):
     """Reverts settings to original state and shows a comparison report."""
     if not os.path.exists("/etc/sysctl.d/tcp-optimizer.conf.bak"):
@@ -129,21 +173,31 @@ def revert_and_show_report(stdscr):
     display_message(stdscr, revert_message)
 
 
-def analyze_and_apply(stdscr):
-    """Analyzes network performance to recommend and apply a suitable profile."""
-    display_message(stdscr, "Running analysis to recommend a profile...", pause=False)
+def display_analysis_report(stdscr, report):
+    """Shows the workload classification and the evidence behind it."""
+    stdscr.clear(); h, w = stdscr.getmaxyx()
+    stdscr.addstr(1, 2, "Workload Analysis", curses.A_BOLD | curses.A_UNDERLINE)
+    stdscr.addstr(3, 2, f"Workload: {report['workload'].replace('_', ' ')}", curses.A_BOLD)
+    y_offset = 4
+    for reason in report["reasons"]:
+        if y_offset < h - 6: stdscr.addstr(y_offset, 4, f"- {reason}"[:w - 6]); y_offset += 1
+    y_offset += 1
+    for line in format_evidence(report["evidence"]):
+        if y_offset < h - 5: stdscr.addstr(y_offset, 4, line[:w - 6]); y_offset += 1
+    stdscr.refresh()
+
+def analyze_and_apply(stdscr, profiles_data, all_managed_params):
+    """Samples the host's own traffic to recommend and apply a suitable profile."""
+    display_message(stdscr, f"Sampling this host's traffic for {ANALYSIS_WINDOW}s...", pause=False)
     try:
-        import speedtest
-        s = speedtest.Speedtest(secure=True); s.get_best_server(); s.download()
-        download_speed = s.results.dict()['download'] / 1_000_000
-        if download_speed > 1000: profile_key = "high_speed"
-        elif download_speed < 50: profile_key = "gaming"
-        else: profile_key = "balanced"
-        
-        prompt = f"Analysis complete. Recommended profile: '{profile_key}'. Apply and benchmark?"
+        report = analyze_workload(profiles_data, window=ANALYSIS_WINDOW)
+        profile_key = report["profile"]
+        if profile_key not in profiles_data:
+            profiles_data = dict(profiles_data, **{profile_key: report["profile_data"]})
+        display_analysis_report(stdscr, report)
+        prompt = f"Recommended profile: '{profile_key}'. Apply and benchmark?"
         if get_confirmation(stdscr, prompt):
-            # Pass profiles_data and all_managed_params to run_profile_benchmark
-            run_profile_benchmark(stdscr, profile_key, PROFILES, ALL_MANAGED_PARAMS)
+            run_profile_benchmark(stdscr, profile_key, profiles_data, all_managed_params)
 
     except Exception as e:
         display_message(stdscr, f"Could not complete analysis: {e}. Please choose a profile manually.")
@@ -152,7 +206,7 @@ def analyze_and_apply(stdscr):
 
 def main_menu(stdscr, profiles_data, all_managed_params):
     """Handles the main menu navigation and options."""
-    menu = ["Analyze Network & Apply Optimal Settings", "Apply Pre-defined Profile (with Benchmark)", "System Information", "Revert to Original Defaults", "Exit"]
+    menu = ["Analyze Network & Apply Optimal Settings", "Apply Pre-defined Profile (with Benchmark)", "System Information", "Revert to Original Defaults", "Checkpoints & Rollback", "Metrics History", "Exit"]
     current_row = 0
     while True:
         active_profile = get_active_profile(profiles_data)
@@ -161,12 +215,14 @@ def main_menu(stdscr, profiles_data, all_managed_params):
         if key == curses.KEY_UP and current_row > 0: current_row -= 1
         elif key == curses.KEY_DOWN and current_row < len(menu) - 1: current_row += 1
         elif key == curses.KEY_ENTER or key in [10, 13]:
-            if current_row == 0: analyze_and_apply(stdscr)
+            if current_row == 0: analyze_and_apply(stdscr, profiles_data, all_managed_params)
             # Pass profiles_data and all_managed_params to profiles_menu
             elif current_row == 1: profiles_menu(stdscr, profiles_data, all_managed_params)
             elif current_row == 2: display_system_info(stdscr)
             elif current_row == 3: revert_and_show_report(stdscr)
-            elif current_row == 4: break
+            elif current_row == 4: checkpoints_menu(stdscr)
+            elif current_row == 5: metrics_history_menu(stdscr)
+            elif current_row == 6: break
 
 def profiles_menu(stdscr, profiles_data, all_managed_params):
     """Handles the submenu for selecting pre-defined profiles."""
@@ -199,6 +255,64 @@ def profiles_menu(stdscr, profiles_data, all_managed_params):
                 run_profile_benchmark(stdscr, profile_key, profiles_data, all_managed_params)
             else: break
 
+def checkpoints_menu(stdscr):
+    """Lists checkpoints and rolls back to the selected one after showing what would change."""
+    store = CheckpointStore()
+    try:
+        checkpoints = list(reversed(store.list()))
+    except ValueError as e:
+        display_message(stdscr, str(e)); return
+    if not checkpoints:
+        display_message(stdscr, "No checkpoints recorded yet."); return
+    menu_items = [format_checkpoint(entry) for entry in checkpoints] + ["Back"]; current_row = 0
+    while True:
+        draw_menu(stdscr, current_row, menu_items, "Roll Back to a Checkpoint")
+        key = stdscr.getch()
+        if key == curses.KEY_UP and current_row > 0: current_row -= 1
+        elif key == curses.KEY_DOWN and current_row < len(menu_items) - 1: current_row += 1
+        elif key == curses.KEY_ENTER or key in [10, 13]:
+            if current_row == len(checkpoints): break
+            checkpoint_id = checkpoints[current_row]["id"]
+            changes = store.diff(checkpoint_id)
+            if not changes:
+                display_message(stdscr, f"Live settings already match checkpoint #{checkpoint_id}."); continue
+            stdscr.clear(); h, w = stdscr.getmaxyx()
+            stdscr.addstr(1, 2, f"Changes to restore checkpoint #{checkpoint_id}", curses.A_BOLD | curses.A_UNDERLINE)
+            y_offset = 3
+            for param, (saved, live) in changes.items():
+                if y_offset < h - 5: stdscr.addstr(y_offset, 4, f"{param.split('.')[-1]:<25}: {live} -> {saved}"[:w - 6]); y_offset += 1
+            if get_confirmation(stdscr, f"Write {len(changes)} keys?"):
+                _, errors = store.rollback(checkpoint_id)
+                message = f"Rolled back to checkpoint #{checkpoint_id}."
+                if errors: message += f" {len(errors)} keys could not be written."
+                display_message(stdscr, message)
+
+def metrics_history_menu(stdscr):
+    """Shows archived metrics for a chosen time range, reading only that range from the archive."""
+    try:
+        archive = MetricsArchive()
+    except (OSError, ValueError):
+        display_message(stdscr, "No metrics archive yet. Run 'metrics record' or the drift watcher to fill it."); return
+    menu_items = list(HISTORY_RANGES) + ["Back"]; current_row = 0
+    with archive:
+        while True:
+            draw_menu(stdscr, current_row, menu_items, "Metrics History")
+            key = stdscr.getch()
+            if key == curses.KEY_UP and current_row > 0: current_row -= 1
+            elif key == curses.KEY_DOWN and current_row < len(menu_items) - 1: current_row += 1
+            elif key == curses.KEY_ENTER or key in [10, 13]:
+                if current_row == len(HISTORY_RANGES): break
+                seconds, tier = HISTORY_RANGES[menu_items[current_row]]
+                rows = archive.query(time.time() - seconds, metrics=HISTORY_METRICS, tier=tier)
+                stdscr.clear(); h, w = stdscr.getmaxyx()
+                stdscr.addstr(1, 2, f"{menu_items[current_row]} (per-second rates, TIME-WAIT count)", curses.A_BOLD | curses.A_UNDERLINE)
+                lines = format_rows(rows, HISTORY_METRICS)
+                lines = lines[:1] + lines[1:][-(h - 6):] if len(lines) > h - 5 else lines
+                for y_offset, line in enumerate(lines if rows else ["No samples in this range."], start=3):
+                    stdscr.addstr(y_offset, 2, line[:w - 4])
+                stdscr.addstr(h - 2, 2, "Press any key to return...")
+                stdscr.getch()
+
 def display_system_info(stdscr):
     """Displays system information."""
     info = get_system_information()
@@ -0,0 +1,249 @@
+import fcntl
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.network.procfs import read_net_dev, read_snmp_counters, read_sockstat
+
+ARCHIVE_FILE = "/var/lib/tcp-optimizer/metrics.arc"
+MAGIC = b"TCPOARC1"
+VERSION = 1
+NAME_SIZE = 32
+READ_RETRIES = 100
+
+# (step seconds, slots): 10 s for a day, 1 min for a week, 1 h for a year.
+DEFAULT_TIERS: Tuple[Tuple[float, int], ...] = ((10.0, 8640), (60.0, 10080), (3600.0, 8760))
+
+# Per-second rates of the procfs counters, followed by gauges.
+COUNTER_METRICS = {
+    "active_opens": ("Tcp", "ActiveOpens"),
+    "passive_opens": ("Tcp", "PassiveOpens"),
+    "in_segs": ("Tcp", "InSegs"),
+    "out_segs": ("Tcp", "OutSegs"),
+    "retrans_segs": ("Tcp", "RetransSegs"),
+    "listen_drops": ("TcpExt", "ListenDrops"),
+    "rx_bytes": ("dev", "rx_bytes"),
+    "tx_bytes": ("dev", "tx_bytes"),
+    "rx_packets": ("dev", "rx_packets"),
+    "tx_packets": ("dev", "tx_packets"),
+    "rx_drop": ("dev", "rx_drop"),
+    "tx_drop": ("dev", "tx_drop"),
+}
+GAUGE_METRICS = {
+    "tcp_inuse": ("TCP", "inuse"),
+    "tcp_tw": ("TCP", "tw"),
+    "tcp_mem_pages": ("TCP", "mem"),
+}
+DEFAULT_METRICS = tuple(COUNTER_METRICS) + tuple(GAUGE_METRICS)
+
+_HEADER = struct.Struct("<8sIIII")      # magic, version, metrics, tiers, slot size
+_TIER = struct.Struct("<dQQ")           # step, slots, offset
+_SEQ = struct.Struct("<Q")
+
+
+class MetricsArchive:
+    """A fixed-size, memory-mapped round-robin archive of host metrics.
+
+    Each tier is a ring of slots indexed by time bucket, so a write touches one slot per tier
+    and a range query reads only the slots in range. A slot holds a sequence number, its bucket
+    start, a sample count and the running mean of every metric. Writers serialize on flock;
+    readers never lock, and retry a slot whose sequence number is odd or changed while it was
+    read (a seqlock). The file keeps its layout across restarts; opening it with a different
+    metric list or tier layout is an error.
+    """
+
+    def __init__(self, path: str = ARCHIVE_FILE, metrics: Sequence[str] = DEFAULT_METRICS,
+                 tiers: Sequence[Tuple[float, int]] = DEFAULT_TIERS, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        if writable and not os.path.exists(path):
+            self._create(list(metrics), list(tiers))
+        self.fd = os.open(path, os.O_RDWR if writable else os.O_RDONLY)
+        try:
+            self.map = mmap.mmap(self.fd, 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+            self._load_layout()
+        except (OSError, ValueError, struct.error):
+            os.close(self.fd)
+            raise
+        if writable and (self.metrics != list(metrics) or [(s, n) for s, n, _ in self.tiers] != [(float(s), n) for s, n in tiers]):
+            self.close()
+            raise ValueError(f"Error: archive '{path}' was created with a different layout.")
+
+    def _create(self, metrics: List[str], tiers: List[Tuple[float, int]]):
+        slot = struct.Struct(f"<Qdd{len(metrics)}d")
+        header_size = _HEADER.size + _TIER.size * len(tiers) + NAME_SIZE * len(metrics)
+        offset = -(-header_size // mmap.PAGESIZE) * mmap.PAGESIZE
+        header = bytearray(_HEADER.pack(MAGIC, VERSION, len(metrics), len(tiers), slot.size))
+        for step, slots in tiers:
+            header += _TIER.pack(float(step), slots, offset)
+            offset += slots * slot.size
+        for name in metrics:
+            header += name.encode().ljust(NAME_SIZE, b"\0")
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, f".{os.path.basename(self.path)}.{os.getpid()}")
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.truncate(offset)
+        try:
+            os.link(tmp, self.path)      # fails if another writer created it first
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+
+    def _load_layout(self):
+        magic, version, n_metrics, n_tiers, slot_size = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Error: '{self.path}' is not a metrics archive.")
+        position = _HEADER.size
+        self.tiers = []
+        for _ in range(n_tiers):
+            self.tiers.append(_TIER.unpack_from(self.map, position))
+            position += _TIER.size
+        self.metrics = [self.map[position + i * NAME_SIZE:position + (i + 1) * NAME_SIZE].rstrip(b"\0").decode()
+                        for i in range(n_metrics)]
+        self.slot = struct.Struct(f"<Qdd{n_metrics}d")
+        if self.slot.size != slot_size:
+            raise ValueError(f"Error: '{self.path}' has an inconsistent slot size.")
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _slot_offset(self, tier: Tuple[float, int, int], bucket: int) -> int:
+        step, slots, offset = tier
+        return offset + (bucket % slots) * self.slot.size
+
+    def write(self, values: Dict[str, float], timestamp: Optional[float] = None):
+        """Folds one sample into every tier. Metrics missing from `values` are stored as NaN."""
+        if not self.writable:
+            raise ValueError("Error: archive was opened read-only.")
+        timestamp = time.time() if timestamp is None else timestamp
+        sample = [float(values.get(name, math.nan)) for name in self.metrics]
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            for tier in self.tiers:
+                bucket = int(timestamp // tier[0])
+                position = self._slot_offset(tier, bucket)
+                seq, start, count, *means = self.slot.unpack_from(self.map, position)
+                if start != bucket * tier[0] or count == 0:
+                    count, means = 0, sample
+                else:
+                    means = [new if math.isnan(old) else old if math.isnan(new) else old + (new - old) / (count + 1)
+                             for old, new in zip(means, sample)]
+                # Derived from parity, not seq + 1, so a slot left odd by a writer that died
+                # mid-write does not invert the protocol for every later write.
+                writing = seq | 1
+                _SEQ.pack_into(self.map, position, writing)
+                self.slot.pack_into(self.map, position, writing, bucket * tier[0], count + 1, *means)
+                _SEQ.pack_into(self.map, position, writing + 1)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def _read_slot(self, position: int) -> Optional[Tuple[float, float, List[float]]]:
+        for _ in range(READ_RETRIES):
+            seq, start, count, *means = self.slot.unpack_from(self.map, position)
+            if seq % 2 == 0 and _SEQ.unpack_from(self.map, position)[0] == seq:
+                return start, count, means
+        return None
+
+    def pick_tier(self, start: float, now: Optional[float] = None) -> int:
+        """Returns the finest tier whose retention still reaches back to `start`."""
+        now = time.time() if now is None else now
+        for index, (step, slots, _) in enumerate(self.tiers):
+            if now - start <= step * slots:
+                return index
+        return len(self.tiers) - 1
+
+    def query(self, start: float, end: Optional[float] = None, metrics: Optional[Sequence[str]] = None,
+              tier: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns {"timestamp", "samples", <metric>: mean} rows for the buckets between start and end, oldest first.
+
+        Raises ValueError for metric names the archive does not hold.
+        """
+        unknown = [name for name in (metrics or []) if name not in self.metrics]
+        if unknown:
+            raise ValueError(f"Error: unknown metrics {', '.join(unknown)}. Available: {', '.join(self.metrics)}.")
+        end = time.time() if end is None else end
+        tier_index = self.pick_tier(start, end) if tier is None else tier
+        step, slots, _ = self.tiers[tier_index]
+        wanted = [(self.metrics.index(name), name) for name in (metrics or self.metrics)]
+        first, last = int(start // step), int(end // step)
+        rows = []
+        for bucket in range(max(first, last - slots + 1), last + 1):
+            slot = self._read_slot(self._slot_offset(self.tiers[tier_index], bucket))
+            if slot is None or slot[0] != bucket * step or slot[1] == 0:
+                continue
+            row = {"timestamp": slot[0], "samples": int(slot[1])}
+            row.update({name: slot[2][index] for index, name in wanted})
+            rows.append(row)
+        return rows
+
+
+class MetricsRecorder:
+    """Turns procfs counters into per-second rates and gauges and writes them to an archive.
+
+    Only the previous counter snapshot is kept, so memory use stays constant. The first call
+    primes the snapshot and writes nothing.
+    """
+
+    def __init__(self, archive: MetricsArchive, clock=time.monotonic):
+        self.archive = archive
+        self.clock = clock
+        self.previous: Optional[Dict[str, float]] = None
+
+    @staticmethod
+    def _read() -> Tuple[Dict[str, float], Dict[str, float]]:
+        snmp = read_snmp_counters()
+        devices = read_net_dev()
+        sockstat = read_sockstat()
+        dev = {}
+        for name, stats in devices.items():
+            if name != "lo":
+                for key, value in stats.items():
+                    dev[key] = dev.get(key, 0) + value
+        sources = dict(snmp, dev=dev)
+        counters = {name: sources.get(section, {}).get(key, 0) for name, (section, key) in COUNTER_METRICS.items()}
+        gauges = {name: sockstat.get(section, {}).get(key, 0) for name, (section, key) in GAUGE_METRICS.items()}
+        return counters, gauges
+
+    def record(self, timestamp: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Samples the host and writes the rates since the previous call. Returns the written values."""
+        counters, gauges = self._read()
+        counters["time"] = self.clock()
+        previous, self.previous = self.previous, counters
+        if previous is None:
+            return None
+        elapsed = max(counters["time"] - previous["time"], 1e-6)
+        values = {name: max(counters[name] - previous[name], 0) / elapsed for name in COUNTER_METRICS}
+        values.update(gauges)
+        self.archive.write(values, timestamp)
+        return values
+
+
+def format_rows(rows: List[Dict[str, Any]], metrics: Sequence[str]) -> List[str]:
+    """Renders archive rows as a fixed-width table."""
+    lines = ["time                 " + " ".join(f"{name[:14]:>14}" for name in metrics)]
+    for row in rows:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["timestamp"]))
+        lines.append(f"{stamp}  " + " ".join(f"{row[name]:>14.2f}" for name in metrics))
+    return lines
+
+
+def parse_duration(text: str) -> float:
+    """Parses '90', '15m', '6h' or '7d' into seconds."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    text = text.strip()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
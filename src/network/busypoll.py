@@ -0,0 +1,119 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.network.latency import run_latency_benchmark
+from src.network.sysctl import read_sysctl_values, write_sysctl_values
+
+BUSY_READ_KEY = "net.core.busy_read"
+BUSY_POLL_KEY = "net.core.busy_poll"
+DEFAULT_USECS = (0, 25, 50, 100, 200)
+DEFAULT_BUDGETS = (None, 8, 64)
+GENERATED_PROFILE = "low_latency_busy_poll"
+# Fraction by which a point must cut p99 below the baseline to be worth any CPU.
+MIN_GAIN = 0.05
+
+
+def sweep_busy_poll(usecs: Sequence[int] = DEFAULT_USECS, budgets: Sequence[Optional[int]] = DEFAULT_BUDGETS,
+                    duration: float = 5.0, benchmark: Callable[..., Dict[str, Any]] = run_latency_benchmark,
+                    proc_root: str = "/proc/sys", **options) -> List[Dict[str, Any]]:
+    """Runs the latency benchmark at every busy-poll setting and returns one point per run.
+
+    Each point sets net.core.busy_read and net.core.busy_poll to the same microsecond value and
+    the sockets' SO_BUSY_POLL to match, with an optional SO_BUSY_POLL_BUDGET. The baseline (0,
+    no busy polling) is always measured first. The sysctls are restored afterwards whatever happens.
+    """
+    if 0 not in usecs:
+        usecs = (0, *usecs)
+    original = read_sysctl_values([BUSY_READ_KEY, BUSY_POLL_KEY], proc_root)
+    points = []
+    try:
+        for value in usecs:
+            for budget in (budgets if value else (None,)):
+                errors = write_sysctl_values({BUSY_READ_KEY: str(value), BUSY_POLL_KEY: str(value)}, proc_root)
+                if errors:
+                    raise OSError(f"cannot set busy polling: {'; '.join(errors.values())}")
+                report = benchmark(duration=duration, busy_poll=value, budget=budget, **options)
+                points.append({
+                    "usecs": value,
+                    "budget": budget,
+                    "p50_us": report["latency_us"]["p50"],
+                    "p99_us": report["latency_us"]["p99"],
+                    "p999_us": report["latency_us"]["p99.9"],
+                    "cpu_cores": report["cpu_cores"],
+                    "transactions_per_sec": report["transactions_per_sec"],
+                })
+    finally:
+        write_sysctl_values({key: value for key, value in original.items() if value is not None}, proc_root)
+    return points
+
+
+def pareto_front(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Points no other point beats on both p99 latency and CPU, ordered by CPU."""
+    front = []
+    for point in sorted(points, key=lambda p: (p["cpu_cores"], p["p99_us"])):
+        if not front or point["p99_us"] < front[-1]["p99_us"]:
+            front.append(point)
+    return front
+
+
+def baseline_point(points: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The sweep point without busy polling."""
+    baseline = next((p for p in points if not p["usecs"]), None)
+    if baseline is None:
+        raise ValueError("the sweep has no baseline point (busy poll 0) to compare against")
+    return baseline
+
+
+def choose_operating_point(points: List[Dict[str, Any]], max_cpu_cores: Optional[float] = None,
+                           min_gain: float = MIN_GAIN) -> Dict[str, Any]:
+    """Picks the knee of the latency/CPU trade-off curve.
+
+    Candidates are Pareto points that cut p99 by at least `min_gain` and stay under
+    `max_cpu_cores`. The knee is the candidate furthest from the straight line between the
+    baseline and the lowest-latency candidate, with both axes normalized; with a single
+    candidate that one wins. Without candidates, the baseline (no busy polling) is kept.
+    Raises ValueError when `points` has no baseline.
+    """
+    baseline = baseline_point(points)
+    candidates = [p for p in pareto_front(points) if p["usecs"]
+                  and p["p99_us"] <= baseline["p99_us"] * (1 - min_gain)
+                  and (max_cpu_cores is None or p["cpu_cores"] <= max_cpu_cores)]
+    if not candidates:
+        return baseline
+    fastest = min(candidates, key=lambda p: p["p99_us"])
+    span_cpu = max(fastest["cpu_cores"] - baseline["cpu_cores"], 1e-9)
+    span_lat = max(baseline["p99_us"] - fastest["p99_us"], 1e-9)
+
+    def distance(point):
+        # Normalized: x = extra CPU, y = latency saved; the chord runs from (0, 0) to (1, 1).
+        x = (point["cpu_cores"] - baseline["cpu_cores"]) / span_cpu
+        y = (baseline["p99_us"] - point["p99_us"]) / span_lat
+        return y - x
+
+    return max(candidates, key=distance)
+
+
+def build_low_latency_profile(point: Dict[str, Any], baseline: Dict[str, Any],
+                              base_settings: Dict[str, str]) -> Dict[str, Any]:
+    """Returns a profile entry that adds the chosen busy-poll point to `base_settings`, stating its CPU cost."""
+    settings = dict(base_settings, **{BUSY_READ_KEY: str(point["usecs"]), BUSY_POLL_KEY: str(point["usecs"])})
+    extra_cpu = point["cpu_cores"] - baseline["cpu_cores"]
+    if point["usecs"]:
+        description = (f"Generated: busy polling at {point['usecs']} us cut p99 from {baseline['p99_us']:.0f} to "
+                       f"{point['p99_us']:.0f} us at a cost of {extra_cpu:+.2f} CPU cores "
+                       f"({point['cpu_cores']:.2f} vs {baseline['cpu_cores']:.2f}).")
+        if point["budget"]:
+            description += f" Applications should also set SO_PREFER_BUSY_POLL and SO_BUSY_POLL_BUDGET={point['budget']}."
+    else:
+        description = (f"Generated: no busy-poll setting beat p99 {baseline['p99_us']:.0f} us by "
+                       f"{MIN_GAIN:.0%} within the CPU limit, so busy polling stays off.")
+    return {"description": description, "settings": settings}
+
+
+def format_sweep(points: List[Dict[str, Any]], chosen: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Renders sweep points as a table, marking the chosen one."""
+    lines = ["  usecs budget     p50 us     p99 us   p99.9 us  cpu cores      trans/s"]
+    for p in points:
+        mark = "*" if p is chosen else " "
+        lines.append(f"{mark}{p['usecs']:>6} {p['budget'] or '-':>6} {p['p50_us']:>10.1f} {p['p99_us']:>10.1f} "
+                     f"{p['p999_us']:>10.1f} {p['cpu_cores']:>10.2f} {p['transactions_per_sec']:>12.0f}")
+    return lines
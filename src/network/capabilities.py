@@ -0,0 +1,194 @@
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.network.sysctl import sysctl_proc_path
+
+CONGESTION_KEY = "net.ipv4.tcp_congestion_control"
+QDISC_KEY = "net.core.default_qdisc"
+MODULES_FILE = "/proc/modules"
+
+# Tried in order when a profile asks for something the kernel cannot provide.
+# A profile can override these with its own "fallbacks" mapping.
+DEFAULT_FALLBACKS = {
+    CONGESTION_KEY: ["bbr", "cubic", "reno"],
+    QDISC_KEY: ["fq", "fq_codel", "pfifo_fast"],
+}
+
+# Queueing disciplines that are part of the core networking code and always present.
+CORE_QDISCS = {"pfifo_fast", "pfifo", "bfifo", "mq", "noqueue"}
+
+# (feature, minimum kernel version) pairs.
+KERNEL_FEATURES = [
+    ("tcp_fastopen", (3, 7)),
+    ("busy_poll", (3, 11)),
+    ("fq", (3, 12)),
+    ("bbr", (4, 9)),
+    ("cake", (4, 19)),
+    ("udp_gso", (4, 18)),
+]
+# tcp_low_latency has been a no-op since 4.14.
+LOW_LATENCY_REMOVED = (4, 14)
+
+_CACHE: Dict[str, Dict[str, Any]] = {}
+
+
+def parse_kernel_version(release: str) -> Tuple[int, ...]:
+    """Turns a release string such as '6.1.0-18-amd64' into (6, 1, 0)."""
+    match = re.match(r"(\d+)\.(\d+)(?:\.(\d+))?", release)
+    if not match:
+        return (0, 0, 0)
+    return tuple(int(part or 0) for part in match.groups())
+
+
+def _read_words(path: str) -> Optional[List[str]]:
+    try:
+        with open(path, "r") as f:
+            return f.read().split()
+    except OSError:
+        return None
+
+
+def _module_names(path: str) -> Optional[Set[str]]:
+    """Reads module names from modules.dep / modules.builtin style files."""
+    try:
+        with open(path, "r") as f:
+            names = set()
+            for line in f:
+                module = line.split(":", 1)[0].strip()
+                if module:
+                    names.add(os.path.basename(module).split(".ko", 1)[0].replace("-", "_"))
+            return names
+    except OSError:
+        return None
+
+
+def _loaded_modules(path: str = MODULES_FILE) -> Optional[Set[str]]:
+    try:
+        with open(path, "r") as f:
+            return {line.split()[0] for line in f if line.strip()}
+    except OSError:
+        return None
+
+
+def probe_capabilities(keys: Iterable[str] = (), proc_root: str = "/proc/sys", modules_root: str = "/lib/modules",
+                       release: Optional[str] = None, modules_file: str = MODULES_FILE) -> Dict[str, Any]:
+    """Takes a snapshot of what this kernel and network namespace can do.
+
+    `qdiscs` is None when module information is unavailable (e.g. in a container without
+    /lib/modules), in which case qdisc requests are left as they are. Likewise
+    `congestion_controls` is None when tcp_available_congestion_control cannot be read; module
+    names alone would miss the built-in algorithms.
+    """
+    release = release or os.uname().release
+    version = parse_kernel_version(release)
+    module_dir = os.path.join(modules_root, release)
+    loadable = _module_names(os.path.join(module_dir, "modules.dep"))
+    builtin = _module_names(os.path.join(module_dir, "modules.builtin"))
+    loaded = _loaded_modules(modules_file)
+    known_modules = None
+    if loadable is not None or builtin is not None or loaded is not None:
+        known_modules = (loadable or set()) | (builtin or set()) | (loaded or set())
+
+    available = _read_words(os.path.join(proc_root, "net", "ipv4", "tcp_available_congestion_control"))
+    congestion = set(available) if available is not None else None
+    if congestion is not None and known_modules:
+        congestion |= {name[len("tcp_"):] for name in known_modules if name.startswith("tcp_") and name != "tcp_diag"}
+
+    qdiscs = None
+    if known_modules is not None:
+        qdiscs = set(CORE_QDISCS) | {name[len("sch_"):] for name in known_modules if name.startswith("sch_")}
+        current = _read_words(sysctl_proc_path(QDISC_KEY, proc_root))
+        if current:
+            qdiscs.add(current[0])
+
+    sysctls = {}
+    for key in keys:
+        path = sysctl_proc_path(key, proc_root)
+        exists = os.path.exists(path)
+        sysctls[key] = {"exists": exists, "writable": exists and os.access(path, os.W_OK)}
+
+    try:
+        netns = os.readlink("/proc/self/ns/net")
+    except OSError:
+        netns = "unknown"
+
+    features = {name: version >= minimum for name, minimum in KERNEL_FEATURES}
+    features["tcp_low_latency_effective"] = version < LOW_LATENCY_REMOVED
+    return {
+        "kernel_release": release,
+        "kernel_version": version,
+        "netns": netns,
+        "congestion_controls": sorted(congestion) if congestion is not None else None,
+        "qdiscs": sorted(qdiscs) if qdiscs is not None else None,
+        "modules": known_modules,
+        "sysctl": sysctls,
+        "features": features,
+    }
+
+
+def get_capabilities(keys: Iterable[str] = (), refresh: bool = False) -> Dict[str, Any]:
+    """Returns the cached snapshot for the current network namespace, probing on first use."""
+    keys = list(keys)
+    try:
+        netns = os.readlink("/proc/self/ns/net")
+    except OSError:
+        netns = "unknown"
+    snapshot = _CACHE.get(netns)
+    if refresh or snapshot is None or not set(keys) <= set(snapshot["sysctl"]):
+        known = list(snapshot["sysctl"]) if snapshot and not refresh else []
+        snapshot = probe_capabilities(known + [key for key in keys if key not in known])
+        _CACHE[netns] = snapshot
+    return snapshot
+
+
+def _is_available(key: str, value: str, caps: Dict[str, Any]) -> Optional[bool]:
+    """Returns whether a value for an algorithm-selecting key is available, or None if unknown."""
+    if key == CONGESTION_KEY:
+        return None if caps["congestion_controls"] is None else value in caps["congestion_controls"]
+    if key == QDISC_KEY:
+        return None if caps["qdiscs"] is None else value in caps["qdiscs"]
+    return True
+
+
+def resolve_profile(settings: Dict[str, str], caps: Dict[str, Any],
+                    fallbacks: Optional[Dict[str, List[str]]] = None) -> Tuple[Dict[str, str], List[Dict[str, str]]]:
+    """Resolves a profile against a capability snapshot.
+
+    Returns (settings_to_apply, report) where the report lists every key that was
+    substituted, skipped or will have no effect.
+    """
+    chains = dict(DEFAULT_FALLBACKS, **(fallbacks or {}))
+    resolved = {}
+    report = []
+    for key, value in settings.items():
+        value = str(value)
+        sysctl = caps["sysctl"].get(key)
+        if sysctl is not None and not sysctl["exists"]:
+            report.append({"key": key, "requested": value, "applied": "", "action": "skipped", "reason": "not present in this kernel/namespace"})
+            continue
+        if sysctl is not None and not sysctl["writable"]:
+            report.append({"key": key, "requested": value, "applied": "", "action": "skipped", "reason": "read-only here"})
+            continue
+        if _is_available(key, value, caps) is False:
+            substitute = next((alt for alt in chains.get(key, []) if alt != value and _is_available(key, alt, caps)), None)
+            if substitute is None:
+                report.append({"key": key, "requested": value, "applied": "", "action": "skipped", "reason": f"'{value}' unavailable and no fallback is"})
+                continue
+            report.append({"key": key, "requested": value, "applied": substitute, "action": "substituted", "reason": f"'{value}' unavailable"})
+            value = substitute
+        elif key == "net.ipv4.tcp_low_latency" and not caps["features"]["tcp_low_latency_effective"]:
+            report.append({"key": key, "requested": value, "applied": value, "action": "ineffective", "reason": f"ignored since kernel {LOW_LATENCY_REMOVED[0]}.{LOW_LATENCY_REMOVED[1]}"})
+        resolved[key] = value
+    return resolved, report
+
+
+def format_resolution(report: List[Dict[str, str]]) -> List[str]:
+    """Renders a resolution report as lines."""
+    lines = []
+    for entry in report:
+        if entry["action"] == "substituted":
+            lines.append(f"{entry['key']}: {entry['requested']} -> {entry['applied']} ({entry['reason']})")
+        else:
+            lines.append(f"{entry['key']}: {entry['action']} ({entry['reason']})")
+    return lines
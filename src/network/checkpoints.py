@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.network.sysctl import (
+    BACKUP_FILE,
+    SYSCTL_CONF_FILE,
+    normalize_sysctl_value,
+    read_sysctl_values,
+    write_sysctl_values,
+)
+
+CHECKPOINT_DIR = "/var/lib/tcp-optimizer/checkpoints"
+DEFAULT_RETENTION = 50
+
+
+def _atomic_write_json(path: str, data: Any):
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class CheckpointStore:
+    """Numbered, timestamped snapshots of managed sysctl keys.
+
+    Snapshot contents are stored once per content hash under objects/, and index.json maps
+    checkpoint ids onto them. Checkpoint 1 is the state before the first change and is never
+    pruned, so the true original is always recoverable.
+    """
+
+    def __init__(self, root: str = CHECKPOINT_DIR, retention: int = DEFAULT_RETENTION,
+                 proc_root: str = "/proc/sys", conf_file: str = SYSCTL_CONF_FILE):
+        self.root = root
+        self.retention = max(2, retention)
+        self.proc_root = proc_root
+        self.conf_file = conf_file
+        self.index_file = os.path.join(root, "index.json")
+        self.objects_dir = os.path.join(root, "objects")
+
+    def _load_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_file, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"next_id": 1, "checkpoints": []}
+        except json.JSONDecodeError:
+            raise ValueError(f"Error: checkpoint index '{self.index_file}' is corrupted.")
+
+    def _save_index(self, index: Dict[str, Any]):
+        _atomic_write_json(self.index_file, index)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, f"{digest}.json")
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Returns checkpoint metadata, oldest first."""
+        return self._load_index()["checkpoints"]
+
+    def record(self, values: Dict[str, Optional[str]], label: str = "") -> Dict[str, Any]:
+        """Stores a snapshot of the given values and returns its checkpoint entry.
+
+        A snapshot identical to the latest checkpoint is not stored again.
+        """
+        values = {key: None if value is None else normalize_sysctl_value(value) for key, value in values.items()}
+        payload = json.dumps(values, sort_keys=True)
+        digest = hashlib.sha256(payload.encode()).hexdigest()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        index = self._load_index()
+        if index["checkpoints"] and index["checkpoints"][-1]["hash"] == digest:
+            return index["checkpoints"][-1]
+        if not os.path.exists(self._object_path(digest)):
+            _atomic_write_json(self._object_path(digest), values)
+        entry = {"id": index["next_id"], "timestamp": time.time(), "label": label, "hash": digest, "keys": len(values)}
+        index["checkpoints"].append(entry)
+        index["next_id"] += 1
+        self._save_index(index)
+        self.prune()
+        return entry
+
+    def create(self, params: Iterable[str], label: str = "") -> Dict[str, Any]:
+        """Snapshots the live values of `params` with one procfs pass."""
+        return self.record(read_sysctl_values(params, self.proc_root), label)
+
+    def _entry(self, checkpoint_id: int) -> Dict[str, Any]:
+        for entry in self.list():
+            if entry["id"] == checkpoint_id:
+                return entry
+        raise KeyError(f"No checkpoint with id {checkpoint_id}.")
+
+    def get(self, checkpoint_id: int) -> Dict[str, Optional[str]]:
+        """Returns the values stored in a checkpoint."""
+        with open(self._object_path(self._entry(checkpoint_id)["hash"]), "r") as f:
+            return json.load(f)
+
+    def original(self) -> Optional[Dict[str, Any]]:
+        """Returns the first checkpoint, taken before any change was made."""
+        checkpoints = self.list()
+        return checkpoints[0] if checkpoints else None
+
+    def diff(self, from_id: int, to_id: Optional[int] = None) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Returns key -> (value in from_id, value in to_id) for keys that differ.
+
+        With no `to_id` the comparison is against the live values.
+        """
+        old = self.get(from_id)
+        new = self.get(to_id) if to_id is not None else read_sysctl_values(old.keys(), self.proc_root)
+        return {key: (old.get(key), new.get(key)) for key in sorted(set(old) | set(new)) if old.get(key) != new.get(key)}
+
+    def rollback(self, checkpoint_id: int, persist: bool = True) -> Tuple[Dict[str, Tuple[Optional[str], str]], Dict[str, str]]:
+        """Restores a checkpoint, writing only the keys whose live value differs.
+
+        Returns (changes, errors). With `persist`, the optimizer config file is rewritten to match
+        so the state survives a reboot; rolling back to the original removes it instead.
+        """
+        target = {key: value for key, value in self.get(checkpoint_id).items() if value is not None}
+        current = read_sysctl_values(target.keys(), self.proc_root)
+        changes = {key: (current[key], value) for key, value in target.items() if current[key] != value}
+        errors = write_sysctl_values({key: new for key, (_, new) in changes.items()}, self.proc_root)
+        if persist:
+            original = self.original()
+            if original and original["id"] == checkpoint_id:
+                if os.path.exists(self.conf_file):
+                    os.remove(self.conf_file)
+            else:
+                self._write_conf(target)
+        return changes, errors
+
+    def _write_conf(self, settings: Dict[str, str]):
+        with open(self.conf_file, "w") as f:
+            f.write("\n")
+            for key, value in settings.items():
+                f.write(f"{key} = {value}\n")
+
+    def prune(self) -> List[int]:
+        """Applies the retention limit, keeping the original and the newest checkpoints."""
+        index = self._load_index()
+        checkpoints = index["checkpoints"]
+        if len(checkpoints) <= self.retention:
+            return []
+        kept = checkpoints[:1] + checkpoints[-(self.retention - 1):]
+        removed = [entry["id"] for entry in checkpoints if entry not in kept]
+        index["checkpoints"] = kept
+        self._save_index(index)
+        referenced = {entry["hash"] for entry in kept}
+        for name in os.listdir(self.objects_dir):
+            if name.endswith(".json") and name[:-len(".json")] not in referenced:
+                os.remove(os.path.join(self.objects_dir, name))
+        return removed
+
+
+def format_checkpoint(entry: Dict[str, Any]) -> str:
+    """Renders a checkpoint entry as one line."""
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["timestamp"]))
+    return f"#{entry['id']:<4} {stamp}  {entry['keys']:>3} keys  {entry['label']}"
+
+
+def checkpoint_before_change(params: Iterable[str], label: str, store: Optional[CheckpointStore] = None,
+                             backup_file: str = BACKUP_FILE) -> Dict[str, Any]:
+    """Records a checkpoint ahead of a change.
+
+    On first use, an existing single-level backup is imported as checkpoint 1 so the
+    original settings from before the store existed are not lost.
+    """
+    store = store or CheckpointStore()
+    if not store.list() and os.path.exists(backup_file):
+        try:
+            with open(backup_file, "r") as f:
+                store.record(json.load(f), "original (imported from backup)")
+        except (OSError, json.JSONDecodeError):
+            pass
+    return store.create(params, label)
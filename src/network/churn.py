@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import selectors
+import socket
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from src.network.procfs import read_snmp_counters, read_sockstat
+from src.network.sockdiag import iter_tcp_sockets
+from src.network.sysctl import read_sysctl_values
+from src.network.workers import WORKER_GRACE, collect_results
+from src.utils.stats import summarize
+
+TCP_FASTOPEN = getattr(socket, "TCP_FASTOPEN", 23)
+MSG_FASTOPEN = getattr(socket, "MSG_FASTOPEN", 0x20000000)
+LISTEN_BACKLOG = 4096
+FASTOPEN_QUEUE = 4096
+
+
+def fastopen_enabled(proc_root: str = "/proc/sys") -> bool:
+    """True when net.ipv4.tcp_fastopen enables both client (1) and server (2) sides."""
+    value = read_sysctl_values(["net.ipv4.tcp_fastopen"], proc_root)["net.ipv4.tcp_fastopen"]
+    try:
+        return int(value) & 3 == 3
+    except (TypeError, ValueError):
+        return False
+
+
+def _serve(host: str, port_pipe, stop, fastopen: bool, reply: bytes):
+    """Accept server: answers each request and closes once the client has, driven by a selector.
+
+    Letting the client close first leaves TIME-WAIT on the client side, as it is for outbound
+    connections in production.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if fastopen:
+        server.setsockopt(socket.IPPROTO_TCP, TCP_FASTOPEN, FASTOPEN_QUEUE)
+    server.bind((host, 0))
+    server.listen(LISTEN_BACKLOG)
+    server.setblocking(False)
+    port_pipe.send(server.getsockname()[1])
+    sel = selectors.DefaultSelector()
+    sel.register(server, selectors.EVENT_READ)
+    while not stop.is_set():
+        for key, _ in sel.select(timeout=0.1):
+            if key.fileobj is server:
+                while True:
+                    try:
+                        conn, _ = server.accept()
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    conn.setblocking(False)
+                    sel.register(conn, selectors.EVENT_READ)
+            else:
+                conn = key.fileobj
+                try:
+                    if conn.recv(4096):
+                        conn.send(reply)
+                        continue
+                except OSError:
+                    pass
+                sel.unregister(conn)
+                conn.close()
+    server.close()
+
+
+def _client(host: str, port: int, deadline: float, payload: bytes, fastopen: bool, results):
+    """Opens, exchanges a few bytes and closes connections until the deadline; reports connect latencies."""
+    latencies = array("d")
+    errors = 0
+    address = (host, port)
+    while time.monotonic() < deadline:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            start = time.perf_counter()
+            if fastopen:
+                sock.sendto(payload, MSG_FASTOPEN, address)
+                latencies.append(time.perf_counter() - start)
+            else:
+                sock.connect(address)
+                latencies.append(time.perf_counter() - start)
+                sock.sendall(payload)
+            sock.recv(4096)
+        except OSError:
+            errors += 1
+        finally:
+            sock.close()
+    results.put((latencies.tobytes(), errors))
+
+
+def _tfo_counters() -> Dict[str, int]:
+    ext = read_snmp_counters().get("TcpExt", {})
+    return {"active": ext.get("TCPFastOpenActive", 0), "passive": ext.get("TCPFastOpenPassive", 0)}
+
+
+def _time_wait_towards(port: int) -> int:
+    """Counts the clients' TIME-WAIT sockets towards the server port."""
+    try:
+        return sum(1 for _ in iter_tcp_sockets(states=["TIME-WAIT"], dport=port, families=[socket.AF_INET], info=False))
+    except OSError:
+        return -1
+
+
+def run_churn_benchmark(duration: float = 10.0, workers: Optional[int] = None, payload_size: int = 64,
+                        fastopen: Optional[bool] = None, host: str = "127.0.0.1") -> Dict[str, Any]:
+    """Measures connection setup/teardown throughput against a local accept server.
+
+    Reports connections per second, connect (SYN to established) latency percentiles,
+    TCP Fast Open hit rate and the TIME-WAIT sockets left behind.
+    """
+    workers = workers or os.cpu_count() or 1
+    if fastopen is None:
+        fastopen = fastopen_enabled()
+    payload = b"x" * payload_size
+    ctx = multiprocessing.get_context("fork")
+    stop = ctx.Event()
+    parent_pipe, child_pipe = ctx.Pipe()
+    server = ctx.Process(target=_serve, args=(host, child_pipe, stop, fastopen, payload), daemon=True)
+    server.start()
+    try:
+        port = parent_pipe.recv()
+        tfo_before = _tfo_counters()
+        tw_before = read_sockstat().get("TCP", {}).get("tw", 0)
+        results = ctx.Queue()
+        started = time.monotonic()
+        deadline = started + duration
+        clients = [ctx.Process(target=_client, args=(host, port, deadline, payload, fastopen, results), daemon=True) for _ in range(workers)]
+        for client in clients:
+            client.start()
+        latencies = array("d")
+        errors = 0
+        for raw, worker_errors in collect_results(results, clients, len(clients), duration + WORKER_GRACE):
+            latencies.frombytes(raw)
+            errors += worker_errors
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - started
+        tfo_after = _tfo_counters()
+        tw_after = read_sockstat().get("TCP", {}).get("tw", 0)
+        tw_towards_server = _time_wait_towards(port)
+    finally:
+        stop.set()
+        server.join(timeout=5)
+        if server.is_alive():
+            server.terminate()
+
+    connections = len(latencies)
+    passive = tfo_after["passive"] - tfo_before["passive"]
+    return {
+        "duration_s": elapsed,
+        "workers": workers,
+        "fastopen": fastopen,
+        "connections": connections,
+        "errors": errors,
+        "connections_per_sec": connections / elapsed if elapsed else 0.0,
+        "connect_latency_ms": summarize(value * 1000 for value in latencies),
+        "tfo_active": tfo_after["active"] - tfo_before["active"],
+        "tfo_passive": passive,
+        "tfo_hit_rate": passive / connections if connections else 0.0,
+        "time_wait_added": tw_after - tw_before,
+        "time_wait_towards_server": tw_towards_server,
+    }
+
+
+def format_churn_report(report: Dict[str, Any]) -> List[str]:
+    """Renders a churn benchmark report as lines."""
+    latency = report["connect_latency_ms"]
+    return [
+        f"Connections/s        : {report['connections_per_sec']:.0f} ({report['connections']} in {report['duration_s']:.1f}s, {report['errors']} errors)",
+        f"Connect p50/p90/p99  : {latency['p50']:.3f}/{latency['p90']:.3f}/{latency['p99']:.3f} ms",
+        f"TFO hit rate         : {report['tfo_hit_rate'] * 100:.1f}%" + ("" if report["fastopen"] else " (TFO disabled)"),
+        f"TIME-WAIT added      : {report['time_wait_added']} ({report['time_wait_towards_server']} towards the server)",
+    ]
@@ -0,0 +1,145 @@
+import glob
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.network.sysctl import (
+    SYSCTL_CONF_FILE,
+    normalize_sysctl_value,
+    read_sysctl_config,
+    read_sysctl_values,
+    write_sysctl_values,
+)
+
+# Search order used by `sysctl --system`; a file name in an earlier directory
+# shadows the same name in a later one, and /etc/sysctl.conf is applied last.
+SYSCTL_D_DIRS = ["/etc/sysctl.d", "/run/sysctl.d", "/usr/local/lib/sysctl.d", "/usr/lib/sysctl.d", "/lib/sysctl.d"]
+SYSCTL_MAIN_CONF = "/etc/sysctl.conf"
+
+DRIFT_POLICIES = ("alert", "reapply", "locate")
+
+
+def list_sysctl_config_files(dirs: Optional[List[str]] = None, main_conf: str = SYSCTL_MAIN_CONF) -> List[str]:
+    """Returns sysctl config files in the order `sysctl --system` applies them."""
+    by_name: Dict[str, str] = {}
+    for directory in dirs if dirs is not None else SYSCTL_D_DIRS:
+        for path in glob.glob(os.path.join(directory, "*.conf")):
+            by_name.setdefault(os.path.basename(path), path)
+    files = [by_name[name] for name in sorted(by_name)]
+    if os.path.exists(main_conf):
+        files.append(main_conf)
+    return files
+
+
+def find_overriding_sources(param: str, own_file: str = SYSCTL_CONF_FILE,
+                            dirs: Optional[List[str]] = None, main_conf: str = SYSCTL_MAIN_CONF) -> List[Dict[str, str]]:
+    """Lists the config files applied after ours that set `param`, in apply order.
+
+    Files applied before ours lose to it at boot and are left out. The last entry is the one
+    that wins at boot.
+    """
+    own_name = os.path.basename(own_file)
+    sources = []
+    for path in list_sysctl_config_files(dirs, main_conf):
+        if path != main_conf and os.path.basename(path) <= own_name:
+            continue
+        try:
+            settings = read_sysctl_config(path)
+        except OSError:
+            continue
+        if param in settings:
+            sources.append({"file": path, "value": normalize_sysctl_value(settings[param])})
+    return sources
+
+
+class DriftDetector:
+    """Polls the managed keys of the applied profile and reacts when another agent changes them."""
+
+    def __init__(self, expected: Dict[str, Any], logger, policy: str = "alert", interval: float = 30.0,
+                 proc_root: str = "/proc/sys", own_file: str = SYSCTL_CONF_FILE, recorder=None):
+        if policy not in DRIFT_POLICIES:
+            raise ValueError(f"Unknown drift policy '{policy}'. Expected one of: {', '.join(DRIFT_POLICIES)}.")
+        self.expected = {key: normalize_sysctl_value(value) for key, value in expected.items()}
+        self.logger = logger
+        self.policy = policy
+        self.interval = interval
+        self.proc_root = proc_root
+        self.own_file = own_file
+        self.last_seen: Dict[str, Optional[str]] = dict(self.expected)
+        self.metrics: Dict[str, Any] = {"checks": 0, "drift_events": 0, "reapplied": 0, "reapply_failures": 0, "keys": {}}
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        # Optional MetricsRecorder sampled once per poll, so the daemon keeps the metrics archive filled.
+        self.recorder = recorder
+
+    def check(self) -> List[Dict[str, Any]]:
+        """Reads all managed keys in one pass and returns a drift event per key that changed since the last check."""
+        current = read_sysctl_values(self.expected.keys(), self.proc_root)
+        self.metrics["checks"] += 1
+        events = []
+        now = time.time()
+        for key, value in current.items():
+            if value is None or value == self.last_seen.get(key):
+                continue
+            if value != self.expected[key]:
+                events.append({
+                    "key": key,
+                    "expected": self.expected[key],
+                    "old": self.last_seen.get(key),
+                    "new": value,
+                    "timestamp": now,
+                })
+            self.last_seen[key] = value
+        return events
+
+    def handle(self, events: List[Dict[str, Any]]):
+        """Logs drift events, records metrics and applies the configured policy."""
+        for event in events:
+            self.metrics["drift_events"] += 1
+            self.metrics["keys"][event["key"]] = self.metrics["keys"].get(event["key"], 0) + 1
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(event["timestamp"]))
+            self.logger.log(
+                f"Drift detected at {stamp}: {event['key']} changed {event['old']} -> {event['new']} "
+                f"(expected {event['expected']})",
+                level=logging.WARNING,
+            )
+            if self.policy == "locate":
+                event["sources"] = find_overriding_sources(event["key"], own_file=self.own_file)
+                if event["sources"]:
+                    # Prefer the file that sets the value we now observe; otherwise the one that wins at boot.
+                    winner = next((s for s in reversed(event["sources"]) if s["value"] == event["new"]), event["sources"][-1])
+                    self.logger.log(f"{event['key']} is overridden by {winner['file']} (sets {winner['value']})", level=logging.WARNING)
+                else:
+                    self.logger.log(f"No sysctl.d file sets {event['key']}; it was changed at runtime.", level=logging.WARNING)
+            for listener in self.listeners:
+                listener(event)
+        if self.policy == "reapply" and events:
+            self._reapply([event["key"] for event in events])
+
+    def _reapply(self, keys: List[str]):
+        """Writes the expected value back for the drifted keys only."""
+        errors = write_sysctl_values({key: self.expected[key] for key in keys}, self.proc_root)
+        for key in keys:
+            if key in errors:
+                self.metrics["reapply_failures"] += 1
+                self.logger.log(f"Could not re-apply {key}: {errors[key]}", level=logging.ERROR)
+            else:
+                self.metrics["reapplied"] += 1
+                self.last_seen[key] = self.expected[key]
+                self.logger.log(f"Re-applied {key} = {self.expected[key]}")
+
+    def run(self, iterations: Optional[int] = None, sleep: Callable[[float], None] = time.sleep):
+        """Runs the poll loop until interrupted, or for a fixed number of iterations."""
+        self.logger.log(f"Watching {len(self.expected)} keys every {self.interval}s (policy: {self.policy})")
+        count = 0
+        try:
+            while iterations is None or count < iterations:
+                self.handle(self.check())
+                if self.recorder is not None:
+                    self.recorder.record()
+                count += 1
+                if iterations is None or count < iterations:
+                    sleep(self.interval)
+        except KeyboardInterrupt:
+            self.logger.log("Drift watcher stopped.")
+        return self.metrics
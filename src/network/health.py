@@ -0,0 +1,124 @@
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.network.procfs import read_net_dev, read_snmp_counters
+from src.network.sockdiag import collect_tcp_info
+from src.utils.stats import percentile
+
+# metric -> (allowed relative increase, allowed absolute increase) over the baseline.
+DEFAULT_THRESHOLDS = {
+    "retrans_rate": (0.5, 0.1),     # percent of segments sent
+    "listen_drops": (0.5, 1.0),     # per second
+    "rtt_ms": (0.25, 1.0),
+    "iface_drops": (0.5, 1.0),      # per second
+    "probe_failures": (0.0, 0.0),
+}
+
+
+def _counters() -> Dict[str, float]:
+    snmp = read_snmp_counters()
+    tcp = snmp.get("Tcp", {})
+    devices = read_net_dev()
+    return {
+        "time": time.monotonic(),
+        "out_segs": tcp.get("OutSegs", 0),
+        "retrans_segs": tcp.get("RetransSegs", 0),
+        "listen_drops": snmp.get("TcpExt", {}).get("ListenDrops", 0),
+        "iface_drops": sum(d["rx_drop"] + d["tx_drop"] for name, d in devices.items() if name != "lo"),
+    }
+
+
+class HealthMonitor:
+    """Measures host health over a window: retransmits, listen drops, RTT, interface drops and app probes."""
+
+    def __init__(self, runner, rtt_targets: Optional[List[str]] = None, probe_commands: Optional[List[str]] = None,
+                 probe_timeout: float = 10.0, sleep: Callable[[float], None] = time.sleep):
+        self.runner = runner
+        self.rtt_targets = rtt_targets or []
+        self.probe_commands = probe_commands or []
+        self.probe_timeout = probe_timeout
+        self.sleep = sleep
+
+    def _rtt_ms(self) -> Tuple[Optional[float], int]:
+        """Median TCP connect time to the configured targets, or the median smoothed RTT of live flows.
+
+        Returns (rtt, failed targets). rtt is None when there is nothing to measure (every target
+        failed, or no live flows), so an unreachable target or an idle host never reads as 0 ms.
+        """
+        samples = []
+        failures = 0
+        for target in self.rtt_targets:
+            host, port = target.rsplit(":", 1)
+            start = time.perf_counter()
+            try:
+                with socket.create_connection((host, int(port)), timeout=self.probe_timeout):
+                    samples.append((time.perf_counter() - start) * 1000)
+            except OSError:
+                failures += 1
+        if not self.rtt_targets:
+            try:
+                samples = [flow["rtt_ms"] for flow in collect_tcp_info()]
+            except OSError:
+                samples = []
+        return (percentile(sorted(samples), 50) if samples else None), failures
+
+    def _probe_failures(self) -> int:
+        if not self.probe_commands:
+            return 0
+        outputs = self.runner.run_many(self.probe_commands, timeout=self.probe_timeout)
+        return sum(1 for output in outputs if output.startswith("Error"))
+
+    def sample(self, window: float) -> Dict[str, Any]:
+        """Returns health metrics measured over `window` seconds."""
+        start = _counters()
+        self.sleep(window)
+        end = _counters()
+        elapsed = max(end["time"] - start["time"], 1e-6)
+        out_segs = end["out_segs"] - start["out_segs"]
+        rtt_ms, rtt_failures = self._rtt_ms()
+        return {
+            "timestamp": time.time(),
+            "retrans_rate": 100.0 * (end["retrans_segs"] - start["retrans_segs"]) / out_segs if out_segs else 0.0,
+            "listen_drops": (end["listen_drops"] - start["listen_drops"]) / elapsed,
+            "iface_drops": (end["iface_drops"] - start["iface_drops"]) / elapsed,
+            "rtt_ms": rtt_ms,
+            "probe_failures": self._probe_failures() + rtt_failures,
+        }
+
+
+def find_regressions(baseline: Dict[str, Any], current: Dict[str, Any],
+                     thresholds: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Lists the metrics in `current` that are worse than `baseline` beyond their thresholds.
+
+    Metrics that were not measured (None) on either side are not compared; unreachable RTT
+    targets show up as probe failures instead.
+    """
+    limits = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    regressions = []
+    for metric, (relative, absolute) in limits.items():
+        if baseline.get(metric) is None or current.get(metric) is None:
+            continue
+        allowed = baseline[metric] * (1 + relative) + absolute
+        if current[metric] > allowed:
+            regressions.append(f"{metric} {current[metric]:.3f} > {allowed:.3f} (baseline {baseline[metric]:.3f})")
+    return regressions
+
+
+def mean_health(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Averages health samples per metric, skipping unmeasured (None) values."""
+    baseline = {}
+    for metric in samples[0]:
+        if metric == "timestamp":
+            continue
+        values = [s[metric] for s in samples if s[metric] is not None]
+        baseline[metric] = sum(values) / len(values) if values else None
+    return baseline
+
+
+def format_health(sample: Dict[str, Any]) -> str:
+    """Renders a health sample as one line."""
+    rtt = "n/a" if sample["rtt_ms"] is None else f"{sample['rtt_ms']:.2f} ms"
+    return (f"retrans {sample['retrans_rate']:.3f}%, listen drops {sample['listen_drops']:.2f}/s, "
+            f"rtt {rtt}, iface drops {sample['iface_drops']:.2f}/s, "
+            f"probe failures {sample['probe_failures']}")
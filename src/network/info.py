@@ -1,6 +1,8 @@
 import os
-from src.utils.system import run_command
+from src.utils.system import run_command, run_commands
 from src.network.sysctl import get_sysctl_value
+from src.network.sockdiag import count_tcp_states, iter_tcp_sockets
+from src.utils.stats import summarize
 
 
 
@@ -19,20 +21,27 @@ def get_active_network_interface():
 def get_system_information():
     """Gathers and returns key system information."""
     info = {}
-    info["Kernel Version"] = run_command("uname -r", suppress_errors=True, timeout=5)
-    os_name = ""
-    os_name = run_command("lsb_release -d -s", suppress_errors=True, timeout=5)
-    if "Error" in os_name or not os_name:
-        os_name = run_command("""cat /etc/os-release | grep PRETTY_NAME | cut -d'=' -f2 | tr -d '"'""", suppress_errors=True, timeout=5)
-        if "Error" in os_name or not os_name:
-            os_name = run_command("head -n 1 /etc/issue", suppress_errors=True, timeout=5)
-            if "Error" in os_name or not os_name:
-                os_name = "Unknown Linux Distribution"
+    # Host identity rarely changes: one cached batch, with the OS name sources in order of preference.
+    kernel, *os_names = run_commands([
+        "uname -r",
+        "lsb_release -d -s",
+        """cat /etc/os-release | grep PRETTY_NAME | cut -d'=' -f2 | tr -d '"'""",
+        "head -n 1 /etc/issue",
+    ], suppress_errors=True, timeout=5, cache=True)
+    info["Kernel Version"] = kernel
+    os_name = next((name for name in os_names if name and "Error" not in name), "Unknown Linux Distribution")
     info["Operating System"] = os_name.strip()
     info["Active Network Interface"] = get_active_network_interface()
-    info["IP Address"] = run_command(f"ip -4 addr show {info['Active Network Interface']} | grep -oP '(?<=inet )[0-9.]+'", suppress_errors=True, timeout=5) if info["Active Network Interface"] else "N/A"
-    info["Default Gateway"] = run_command("ip route | grep default | awk '{print $3}'", suppress_errors=True, timeout=5)
-    info["DNS Servers"] = run_command("cat /etc/resolv.conf | grep nameserver | awk '{print $2}' | paste -sd \",\" -", suppress_errors=True, timeout=5)
+    interface = info["Active Network Interface"]
+    ip_address, gateway, dns, link_stats = run_commands([
+        f"ip -4 addr show {interface} | grep -oP '(?<=inet )[0-9.]+'" if interface else "true",
+        "ip route | grep default | awk '{print $3}'",
+        "cat /etc/resolv.conf | grep nameserver | awk '{print $2}' | paste -sd \",\" -",
+        "ip -s link",
+    ], suppress_errors=True, timeout=5)
+    info["IP Address"] = ip_address if interface else "N/A"
+    info["Default Gateway"] = gateway
+    info["DNS Servers"] = dns
 
     # Add TCP/IP Kernel Parameters
     info["TCP Congestion Control"] = get_sysctl_value("net.ipv4.tcp_congestion_control")
@@ -42,7 +51,6 @@ def get_system_information():
     info["Netdev Max Backlog"] = get_sysctl_value("net.core.netdev_max_backlog")
 
     # Add Network Interface Statistics
-    link_stats = run_command("ip -s link", suppress_errors=True, timeout=5)
     if link_stats and info["Active Network Interface"] != "N/A":
         interface_section = ""
         for line in link_stats.splitlines():
@@ -68,13 +76,30 @@ def get_system_information():
                 info["TX Dropped"] = tx_parts[4] if len(tx_parts) > 4 else "N/A"
 
     # Add Active TCP Connections Summary
-    ss_output = run_command("ss -tuna", suppress_errors=True, timeout=5)
-    if ss_output:
-        estab_count = ss_output.count("ESTAB")
-        listen_count = ss_output.count("LISTEN")
-        time_wait_count = ss_output.count("TIME-WAIT")
-        info["TCP Established"] = str(estab_count)
-        info["TCP Listening"] = str(listen_count)
-        info["TCP Time-Wait"] = str(time_wait_count)
+    try:
+        states = count_tcp_states()
+        info["TCP Established"] = str(states["ESTABLISHED"])
+        info["TCP Listening"] = str(states["LISTEN"])
+        info["TCP Time-Wait"] = str(states["TIME-WAIT"])
+        # Stream the sockets and keep only what the summary needs, not a record per flow.
+        rtts, retransmits = [], 0
+        for entry in iter_tcp_sockets(states=("ESTABLISHED",)):
+            tcp_info = entry.get("tcp_info")
+            if tcp_info:
+                rtts.append(tcp_info.get("rtt", 0) / 1000.0)
+                retransmits += tcp_info.get("total_retrans", 0)
+        if rtts:
+            rtt = summarize(rtts)
+            info["TCP RTT p50/p99"] = f"{rtt['p50']:.2f} / {rtt['p99']:.2f} ms"
+            info["TCP Retransmitted Segs"] = str(retransmits)
+    except OSError:
+        ss_output = run_command("ss -tuna", suppress_errors=True, timeout=5)
+        if ss_output:
+            estab_count = ss_output.count("ESTAB")
+            listen_count = ss_output.count("LISTEN")
+            time_wait_count = ss_output.count("TIME-WAIT")
+            info["TCP Established"] = str(estab_count)
+            info["TCP Listening"] = str(listen_count)
+            info["TCP Time-Wait"] = str(time_wait_count)
 
     return info
\ No newline at end of file
@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import selectors
+import socket
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from src.network.procfs import read_cpu_times
+from src.network.workers import WORKER_GRACE, collect_results
+from src.utils.stats import summarize
+
+# Not exported by the socket module on every Python; values from <asm-generic/socket.h>.
+SO_BUSY_POLL = getattr(socket, "SO_BUSY_POLL", 46)
+SO_PREFER_BUSY_POLL = getattr(socket, "SO_PREFER_BUSY_POLL", 69)
+SO_BUSY_POLL_BUDGET = getattr(socket, "SO_BUSY_POLL_BUDGET", 70)
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+CONNECT_TIMEOUT = 5.0
+
+
+def set_busy_poll(sock: socket.socket, usecs: int, budget: Optional[int] = None) -> bool:
+    """Enables per-socket busy polling. Returns False when the kernel or our privileges refuse it."""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, usecs)
+        if budget:
+            sock.setsockopt(socket.SOL_SOCKET, SO_PREFER_BUSY_POLL, 1)
+            sock.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL_BUDGET, budget)
+        return True
+    except OSError:
+        return False
+
+
+def _handle(conn: socket.socket, sel, view: memoryview):
+    try:
+        received = conn.recv_into(view)
+        if received:
+            conn.sendall(view[:received])
+            return
+    except OSError:
+        pass
+    sel.unregister(conn)
+    conn.close()
+
+
+def serve_echo(server: socket.socket, stop=None, busy_poll: int = 0, budget: Optional[int] = None):
+    """Echoes whatever each connection sends until `stop` is set, driven by a selector."""
+    server.setblocking(False)
+    sel = selectors.DefaultSelector()
+    sel.register(server, selectors.EVENT_READ)
+    view = memoryview(bytearray(65536))
+    while stop is None or not stop.is_set():
+        for key, _ in sel.select(timeout=0.1):
+            if key.fileobj is server:
+                try:
+                    conn, _ = server.accept()
+                except (BlockingIOError, InterruptedError):
+                    continue
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if busy_poll:
+                    set_busy_poll(conn, busy_poll, budget)
+                sel.register(conn, selectors.EVENT_READ)
+            else:
+                _handle(key.fileobj, sel, view)
+    server.close()
+
+
+def _serve(host: str, port_pipe, stop, busy_poll: int, budget: Optional[int]):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, 0))
+    server.listen(128)
+    port_pipe.send(server.getsockname()[1])
+    serve_echo(server, stop, busy_poll, budget)
+
+
+def _client(address, deadline: float, message_size: int, busy_poll: int, budget: Optional[int], results):
+    """Sends one message at a time and waits for its echo; records each round trip.
+
+    Always reports, counting a failed connect as an error, so the parent never waits on a dead worker.
+    """
+    latencies = array("d")
+    busy_poll_set = False
+    message = b"x" * message_size
+    view = memoryview(bytearray(message_size))
+    errors = 0
+    sock = None
+    try:
+        sock = socket.create_connection(address, timeout=CONNECT_TIMEOUT)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        busy_poll_set = set_busy_poll(sock, busy_poll, budget) if busy_poll else False
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            sock.sendall(message)
+            received = 0
+            while received < message_size:
+                chunk = sock.recv_into(view[received:])
+                if not chunk:
+                    raise ConnectionError("server closed the connection")
+                received += chunk
+            latencies.append(time.perf_counter() - start)
+    except OSError:
+        errors += 1
+    finally:
+        if sock is not None:
+            sock.close()
+    results.put((latencies.tobytes(), errors, busy_poll_set))
+
+
+def run_latency_benchmark(duration: float = 5.0, clients: int = 1, message_size: int = 64, busy_poll: int = 0,
+                          budget: Optional[int] = None, host: str = "127.0.0.1",
+                          target: Optional[str] = None) -> Dict[str, Any]:
+    """Measures request/response latency with one outstanding message per connection.
+
+    Runs against a local echo server unless `target` ("host:port") names a remote one, e.g. the
+    'latency-server' command on another host. Busy polling only has an effect on NIC queues, so
+    loopback numbers show the measurement floor rather than a busy-poll gain. CPU use is taken
+    host-wide from /proc/stat, so it includes softirq time spent polling.
+    """
+    ctx = multiprocessing.get_context("fork")
+    stop = ctx.Event()
+    server = None
+    if target:
+        target_host, target_port = target.rsplit(":", 1)
+        address = (target_host, int(target_port))
+    else:
+        parent_pipe, child_pipe = ctx.Pipe()
+        server = ctx.Process(target=_serve, args=(host, child_pipe, stop, busy_poll, budget), daemon=True)
+        server.start()
+    try:
+        if server is not None:
+            address = (host, parent_pipe.recv())
+        results = ctx.Queue()
+        cpu_before = read_cpu_times()
+        started = time.monotonic()
+        deadline = started + duration
+        workers = [ctx.Process(target=_client, args=(address, deadline, message_size, busy_poll, budget, results), daemon=True)
+                   for _ in range(clients)]
+        for worker in workers:
+            worker.start()
+        latencies = array("d")
+        errors = 0
+        busy_poll_set = True
+        for raw, worker_errors, worker_set in collect_results(results, workers, clients,
+                                                              duration + CONNECT_TIMEOUT + WORKER_GRACE):
+            latencies.frombytes(raw)
+            errors += worker_errors
+            busy_poll_set = busy_poll_set and worker_set
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+        cpu_after = read_cpu_times()
+    finally:
+        stop.set()
+        if server is not None:
+            server.join(timeout=5)
+            if server.is_alive():
+                server.terminate()
+
+    total = cpu_after["total"] - cpu_before["total"]
+    cpu_cores = (os.cpu_count() or 1) * (cpu_after["busy"] - cpu_before["busy"]) / total if total else 0.0
+    return {
+        "duration_s": elapsed,
+        "clients": clients,
+        "message_size": message_size,
+        "busy_poll": busy_poll,
+        "budget": budget,
+        "busy_poll_set": bool(busy_poll) and busy_poll_set,
+        "transactions": len(latencies),
+        "transactions_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "latency_us": summarize((value * 1e6 for value in latencies), LATENCY_PERCENTILES),
+        "cpu_cores": cpu_cores,
+    }
+
+
+def format_latency_report(report: Dict[str, Any]) -> List[str]:
+    """Renders a latency benchmark report as lines."""
+    latency = report["latency_us"]
+    poll = f"busy poll {report['busy_poll']} us" + (f", budget {report['budget']}" if report["budget"] else "") \
+        if report["busy_poll"] else "no busy poll"
+    if report["busy_poll"] and not report["busy_poll_set"]:
+        poll += " (SO_BUSY_POLL refused)"
+    return [
+        f"Transactions/s       : {report['transactions_per_sec']:.0f} over {report['clients']} connection(s), {poll}",
+        f"RTT p50/p99/p99.9    : {latency['p50']:.1f}/{latency['p99']:.1f}/{latency['p99.9']:.1f} us",
+        f"CPU                  : {report['cpu_cores']:.2f} cores",
+    ]
@@ -0,0 +1,140 @@
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.network.procfs import read_meminfo, read_sockstat
+
+# Share of RAM TCP may use before the kernel starts dropping/pruning (tcp_mem[2]).
+DEFAULT_BUDGET_FRACTION = 0.125
+# Share of connections assumed to fill their buffers at the same time.
+DEFAULT_BUSY_FRACTION = 0.1
+MIN_SOCKET_BUFFER = 1024 * 1024
+MAX_SOCKET_BUFFER = 128 * 1024 * 1024
+MIN_FREE_RATIO = 0.01
+MAX_MIN_FREE_KBYTES = 262144
+
+BUFFER_MAX_KEYS = ("net.core.rmem_max", "net.core.wmem_max")
+BUFFER_TRIPLET_KEYS = ("net.ipv4.tcp_rmem", "net.ipv4.tcp_wmem")
+
+
+def _page_size() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return 4096
+
+
+def plan_memory_budget(meminfo: Optional[Dict[str, int]] = None, sockstat: Optional[Dict[str, Dict[str, int]]] = None,
+                       connections: Optional[int] = None, budget_fraction: float = DEFAULT_BUDGET_FRACTION,
+                       busy_fraction: float = DEFAULT_BUSY_FRACTION, page_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Computes a TCP memory budget for this machine from /proc/meminfo and /proc/net/sockstat.
+
+    Returns the tcp_mem triplet (pages), a per-socket buffer cap (bytes) and a min_free_kbytes value,
+    or None when MemTotal is unknown: a budget of zero would starve TCP rather than protect it.
+    """
+    meminfo = meminfo if meminfo is not None else read_meminfo()
+    sockstat = sockstat if sockstat is not None else read_sockstat()
+    page_size = page_size or _page_size()
+    total_kb = meminfo.get("MemTotal", 0)
+    if total_kb <= 0:
+        return None
+    tcp = sockstat.get("TCP", {})
+    if connections is None:
+        connections = tcp.get("inuse", 0) + tcp.get("tw", 0)
+
+    budget_bytes = int(total_kb * 1024 * budget_fraction)
+    high = budget_bytes // page_size
+    busy = max(1, int(connections * busy_fraction))
+    socket_max = min(MAX_SOCKET_BUFFER, max(MIN_SOCKET_BUFFER, budget_bytes // busy))
+    min_free = int(min(MAX_MIN_FREE_KBYTES, max(math.sqrt(total_kb * 16), total_kb * MIN_FREE_RATIO)))
+
+    return {
+        "mem_total_kb": total_kb,
+        "page_size": page_size,
+        "connections": connections,
+        "tcp_mem_in_use_pages": tcp.get("mem", 0),
+        "budget_bytes": budget_bytes,
+        "tcp_mem": [high // 2, high * 3 // 4, high],
+        "socket_max": socket_max,
+        "min_free_kbytes": min_free,
+    }
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(str(value).split()[-1])
+    except (ValueError, IndexError):
+        return None
+
+
+def check_profile_budget(settings: Dict[str, str], plan: Dict[str, Any]) -> Tuple[Dict[str, str], List[str]]:
+    """Checks a profile against a memory plan.
+
+    Returns (clamped_settings, warnings). The clamped settings cap per-socket maxima, scale
+    min_free_kbytes to the machine and add a tcp_mem triplet if the profile lacks one. Every
+    key the clamped settings change or add has a warning, so an empty list means they are
+    identical to the profile.
+    """
+    clamped = dict(settings)
+    warnings = []
+    cap = plan["socket_max"]
+
+    for key in BUFFER_MAX_KEYS:
+        value = _as_int(settings.get(key))
+        if value is not None and value > cap:
+            warnings.append(f"{key} = {value} exceeds the per-socket budget of {cap} bytes")
+            clamped[key] = str(cap)
+
+    for key in BUFFER_TRIPLET_KEYS:
+        if key not in settings:
+            continue
+        parts = str(settings[key]).split()
+        if len(parts) != 3:
+            continue
+        low, default, maximum = (int(p) for p in parts)
+        if maximum > cap:
+            worst = maximum * max(1, plan["connections"])
+            warnings.append(
+                f"{key} max {maximum} exceeds the per-socket budget of {cap} bytes "
+                f"({worst / 1_073_741_824:.1f} GiB if {plan['connections']} sockets fill up)"
+            )
+            maximum = cap
+            clamped[key] = f"{low} {min(default, maximum)} {maximum}"
+
+    min_free = _as_int(settings.get("vm.min_free_kbytes"))
+    if min_free is not None and min_free != plan["min_free_kbytes"]:
+        if min_free > plan["min_free_kbytes"]:
+            warnings.append(
+                f"vm.min_free_kbytes = {min_free} reserves more than the {plan['min_free_kbytes']} kB "
+                f"suited to {plan['mem_total_kb'] // 1024} MiB of RAM"
+            )
+        else:
+            warnings.append(
+                f"vm.min_free_kbytes = {min_free} reserves less than the {plan['min_free_kbytes']} kB "
+                f"suited to {plan['mem_total_kb'] // 1024} MiB of RAM; it will be raised"
+            )
+        clamped["vm.min_free_kbytes"] = str(plan["min_free_kbytes"])
+
+    if "net.ipv4.tcp_mem" not in settings:
+        clamped["net.ipv4.tcp_mem"] = " ".join(str(pages) for pages in plan["tcp_mem"])
+        warnings.append(f"net.ipv4.tcp_mem is not set; adding the budgeted {clamped['net.ipv4.tcp_mem']} pages")
+    else:
+        high = _as_int(settings["net.ipv4.tcp_mem"])
+        if high is not None and high > plan["tcp_mem"][2]:
+            warnings.append(f"net.ipv4.tcp_mem high mark {high} pages exceeds the budget of {plan['tcp_mem'][2]} pages")
+            clamped["net.ipv4.tcp_mem"] = " ".join(str(pages) for pages in plan["tcp_mem"])
+
+    return clamped, warnings
+
+
+def format_plan(plan: Dict[str, Any]) -> List[str]:
+    """Renders a memory plan as report lines."""
+    low, pressure, high = plan["tcp_mem"]
+    pages_to_mib = plan["page_size"] / 1_048_576
+    return [
+        f"RAM                  : {plan['mem_total_kb'] // 1024} MiB",
+        f"TCP sockets          : {plan['connections']} (using {plan['tcp_mem_in_use_pages'] * pages_to_mib:.1f} MiB)",
+        f"tcp_mem (pages)      : {low} {pressure} {high} (high = {high * pages_to_mib:.0f} MiB)",
+        f"Per-socket cap       : {plan['socket_max'] // 1024} KiB",
+        f"min_free_kbytes      : {plan['min_free_kbytes']}",
+    ]
@@ -0,0 +1,187 @@
+import ctypes
+import ctypes.util
+import multiprocessing
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.network.capabilities import probe_capabilities, resolve_profile
+from src.network.checkpoints import CHECKPOINT_DIR, CheckpointStore
+from src.network.sysctl import normalize_sysctl_value, read_sysctl_values, write_sysctl_values
+
+NETNS_RUN_DIR = "/run/netns"
+NETNS_CHECKPOINT_DIR = os.path.join(CHECKPOINT_DIR, "netns")
+CLONE_NEWNET = 0x40000000
+DEFAULT_CONCURRENCY = 8
+
+
+def split_host_global(settings: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Splits settings into (net.* keys, which may be per namespace, and host-wide keys such as vm.*).
+
+    Host-wide keys look the same from every namespace, so writing them from inside one would
+    change the whole host.
+    """
+    namespaced = {key: value for key, value in settings.items() if key.startswith("net.")}
+    return namespaced, {key: value for key, value in settings.items() if key not in namespaced}
+
+
+def _ns_id(path: str) -> str:
+    """Returns the namespace identity for an nsfs path, e.g. 'net:[4026532205]'."""
+    return f"net:[{os.stat(path).st_ino}]"
+
+
+def list_namespaces(run_dir: str = NETNS_RUN_DIR, proc_root: str = "/proc",
+                    include_current: bool = False) -> List[Dict[str, Any]]:
+    """Lists network namespaces: named ones under `run_dir` and those held by processes.
+
+    Each namespace appears once, with its id, a path that can be entered, its name (if any)
+    and the PIDs living in it. The tool's own namespace is left out unless `include_current`.
+    """
+    namespaces: Dict[str, Dict[str, Any]] = {}
+    try:
+        names = sorted(os.listdir(run_dir))
+    except OSError:
+        names = []
+    for name in names:
+        path = os.path.join(run_dir, name)
+        try:
+            ns_id = _ns_id(path)
+        except OSError:
+            continue
+        namespaces.setdefault(ns_id, {"id": ns_id, "path": path, "name": name, "pids": []})
+    for entry in os.listdir(proc_root):
+        if not entry.isdigit():
+            continue
+        path = os.path.join(proc_root, entry, "ns", "net")
+        try:
+            ns_id = _ns_id(path)
+        except OSError:
+            continue
+        namespace = namespaces.setdefault(ns_id, {"id": ns_id, "path": path, "name": None, "pids": []})
+        namespace["pids"].append(int(entry))
+    if not include_current:
+        namespaces.pop(_ns_id(os.path.join(proc_root, "self", "ns", "net")), None)
+    return sorted(namespaces.values(), key=lambda ns: (ns["name"] is None, ns["name"] or "", ns["id"]))
+
+
+def enter_namespace(path: str):
+    """Moves the calling process into the network namespace at `path`."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, "setns"):
+            os.setns(fd, CLONE_NEWNET)
+            return
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if libc.setns(fd, CLONE_NEWNET) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"setns({path}): {os.strerror(errno)}")
+    finally:
+        os.close(fd)
+
+
+def namespace_store(ns_id: str, root: str = NETNS_CHECKPOINT_DIR) -> CheckpointStore:
+    """Returns the checkpoint store that holds one namespace's backups.
+
+    Namespaces have no sysctl.d of their own, so the store never writes a config file.
+    """
+    directory = os.path.join(root, ns_id.replace(":[", "-").rstrip("]"))
+    return CheckpointStore(directory, conf_file=os.devnull)
+
+
+def _snapshot(namespace: Dict[str, Any], params: List[str], label: str, root: str) -> Dict[str, Any]:
+    sysctls = probe_capabilities(params)["sysctl"]
+    entry = namespace_store(namespace["id"], root).create([key for key in params if sysctls[key]["exists"]], label)
+    return {"checkpoint": entry["id"]}
+
+
+def _apply(namespace: Dict[str, Any], settings: Dict[str, str], fallbacks: Optional[Dict[str, List[str]]],
+           label: str, root: str) -> Dict[str, Any]:
+    # Resolved here, after setns(), because keys and algorithms differ between namespaces.
+    settings, report = resolve_profile(settings, probe_capabilities(settings.keys()), fallbacks)
+    store = namespace_store(namespace["id"], root)
+    if not store.list():
+        store.create(settings.keys(), "original")
+    entry = store.create(settings.keys(), label)
+    current = read_sysctl_values(settings.keys())
+    changes = {key: value for key, value in settings.items() if current[key] != normalize_sysctl_value(value)}
+    return {"checkpoint": entry["id"], "changed": sorted(changes), "errors": write_sysctl_values(changes),
+            "skipped": sorted(item["key"] for item in report if item["action"] == "skipped")}
+
+
+def _revert(namespace: Dict[str, Any], checkpoint_id: Optional[int], root: str) -> Dict[str, Any]:
+    store = namespace_store(namespace["id"], root)
+    original = store.original()
+    if checkpoint_id is None and original is None:
+        return {"changed": [], "errors": {}, "note": "no backup for this namespace"}
+    changes, errors = store.rollback(checkpoint_id if checkpoint_id is not None else original["id"], persist=False)
+    return {"changed": sorted(changes), "errors": errors}
+
+
+def _run_in_namespace(task):
+    operation, namespace, args = task
+    result = {"id": namespace["id"], "name": namespace["name"]}
+    try:
+        enter_namespace(namespace["path"])
+        result.update(operation(namespace, *args))
+    except (OSError, KeyError, ValueError) as e:
+        result["error"] = str(e)
+    return result
+
+
+def _for_each(operation: Callable, namespaces: Iterable[Dict[str, Any]], args: tuple,
+              concurrency: int) -> List[Dict[str, Any]]:
+    """Runs `operation` inside each namespace, at most `concurrency` at a time.
+
+    Every namespace gets a fresh forked worker, because setns() cannot be undone safely
+    in a process that will be reused.
+    """
+    tasks = [(operation, namespace, args) for namespace in namespaces]
+    if not tasks:
+        return []
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(processes=max(1, min(concurrency, len(tasks))), maxtasksperchild=1) as pool:
+        return pool.map(_run_in_namespace, tasks, chunksize=1)
+
+
+def snapshot_namespaces(namespaces, params: Iterable[str], label: str = "",
+                        concurrency: int = DEFAULT_CONCURRENCY, root: str = NETNS_CHECKPOINT_DIR) -> List[Dict[str, Any]]:
+    """Records a checkpoint of the net.* `params` that exist in each namespace."""
+    return _for_each(_snapshot, namespaces, (sorted(key for key in params if key.startswith("net.")), label, root), concurrency)
+
+
+def apply_to_namespaces(namespaces, settings: Dict[str, str], label: str = "",
+                        concurrency: int = DEFAULT_CONCURRENCY, root: str = NETNS_CHECKPOINT_DIR,
+                        fallbacks: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    """Writes the net.* keys of `settings` into each namespace, backing each one up first.
+
+    Host-wide keys are left out (see split_host_global). Inside each namespace the settings
+    are resolved against that namespace's own capabilities, so keys it lacks are skipped
+    rather than failed. The first apply in a namespace records its original values; only
+    keys whose value differs are written.
+    """
+    namespaced, _ = split_host_global(settings)
+    return _for_each(_apply, namespaces, (namespaced, fallbacks, label, root), concurrency)
+
+
+def revert_namespaces(namespaces, checkpoint_id: Optional[int] = None,
+                      concurrency: int = DEFAULT_CONCURRENCY, root: str = NETNS_CHECKPOINT_DIR) -> List[Dict[str, Any]]:
+    """Restores each namespace to a checkpoint, by default the original values from before the first apply."""
+    return _for_each(_revert, namespaces, (checkpoint_id, root), concurrency)
+
+
+def format_namespace_result(result: Dict[str, Any]) -> str:
+    """Renders one namespace's result as one line."""
+    label = f"{result['name']} ({result['id']})" if result.get("name") else result["id"]
+    if "error" in result:
+        return f"{label}: error: {result['error']}"
+    parts = []
+    if "checkpoint" in result:
+        parts.append(f"checkpoint #{result['checkpoint']}")
+    if "changed" in result:
+        parts.append(f"{len(result['changed'])} keys written")
+    if result.get("errors"):
+        parts.append(f"{len(result['errors'])} failed: {', '.join(sorted(result['errors']))}")
+    if result.get("skipped"):
+        parts.append(f"{len(result['skipped'])} not present: {', '.join(result['skipped'])}")
+    if result.get("note"):
+        parts.append(result["note"])
+    return f"{label}: {', '.join(parts)}"
@@ -0,0 +1,253 @@
+import errno
+import fcntl
+import os
+import select
+import socket
+import struct
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.utils.system import run_command
+
+# Not exported by the socket module; values from <linux/in.h> and <linux/in6.h>.
+IP_MTU_DISCOVER = 10
+IP_RECVERR = 11
+IP_MTU = 14
+IPV6_MTU_DISCOVER = 23
+IPV6_MTU = 24
+IPV6_RECVERR = 25
+PMTUDISC_PROBE = 3
+SIOCGIFMTU = 0x8921
+
+PROBE_PORT = 33434
+SYSFS_NET = "/sys/class/net"
+IP_HEADER = {socket.AF_INET: 20, socket.AF_INET6: 40}
+TCP_HEADER = 20
+MIN_MTU = {socket.AF_INET: 576, socket.AF_INET6: 1280}
+STANDARD_MTU = 1500
+
+_EXTENDED_ERR = struct.Struct("=IBBBBII")   # struct sock_extended_err
+
+
+def interface_mtu(interface: str, sysfs_root: str = SYSFS_NET) -> Optional[int]:
+    """Reads an interface's MTU from sysfs.
+
+    sysfs shows the network namespace it was mounted in, so an interface missing there is
+    asked for with SIOCGIFMTU, which always answers for the caller's namespace.
+    """
+    try:
+        with open(os.path.join(sysfs_root, interface, "mtu"), "r") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        pass
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            request = struct.pack("16si20x", interface.encode()[:15], 0)
+            return struct.unpack_from("16si", fcntl.ioctl(sock.fileno(), SIOCGIFMTU, request))[1]
+    except OSError:
+        return None
+
+
+def route_interface(host: str) -> Optional[str]:
+    """Returns the interface the kernel routes `host` through."""
+    fields = run_command(f"ip -o route get {host}", suppress_errors=True, timeout=5).split()
+    return fields[fields.index("dev") + 1] if "dev" in fields else None
+
+
+class PathMTUProber:
+    """Finds the path MTU to one host by binary search over DF-marked UDP datagrams.
+
+    The socket uses IP_PMTUDISC_PROBE, so every datagram carries DF but the kernel's cached
+    path MTU is ignored, and IP_RECVERR, so ICMP errors come back on the error queue. A probe
+    to a closed port that arrives draws a port unreachable (fits); a router that cannot forward
+    it answers fragmentation needed with the next-hop MTU (too big); silence after every retry
+    means the probe was dropped without a word, which is what a PMTU black hole looks like.
+    """
+
+    def __init__(self, host: str, port: int = PROBE_PORT, timeout: float = 1.0, attempts: int = 2):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.attempts = attempts
+        self.sequence = 0
+        info = socket.getaddrinfo(host, port, 0, socket.SOCK_DGRAM)[0]
+        self.family, self.address = info[0], info[4]
+        level = socket.IPPROTO_IP if self.family == socket.AF_INET else socket.IPPROTO_IPV6
+        self.level = level
+        self.sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.sock.setsockopt(level, IP_MTU_DISCOVER if level == socket.IPPROTO_IP else IPV6_MTU_DISCOVER, PMTUDISC_PROBE)
+        self.sock.setsockopt(level, IP_RECVERR if level == socket.IPPROTO_IP else IPV6_RECVERR, 1)
+        self.sock.connect(self.address)
+
+    def close(self):
+        self.sock.close()
+
+    def route_mtu(self) -> int:
+        """The MTU the kernel would use for this destination (interface MTU or a cached path MTU)."""
+        return self.sock.getsockopt(self.level, IP_MTU if self.level == socket.IPPROTO_IP else IPV6_MTU)
+
+    def _read_error(self) -> Optional[Dict[str, int]]:
+        try:
+            data, ancillary, _, _ = self.sock.recvmsg(64, 512, socket.MSG_ERRQUEUE)
+        except (BlockingIOError, InterruptedError):
+            return None
+        for level, kind, payload in ancillary:
+            if len(payload) >= _EXTENDED_ERR.size:
+                ee_errno, _, _, _, _, ee_info, _ = _EXTENDED_ERR.unpack_from(payload)
+                sequence = struct.unpack_from("!I", data)[0] if len(data) >= 4 else -1
+                return {"errno": ee_errno, "info": ee_info, "sequence": sequence}
+        return None
+
+    def _drain(self):
+        self.sock.setblocking(False)
+        try:
+            while self._read_error() is not None:
+                pass
+            try:
+                self.sock.recv(65535)
+            except OSError:
+                pass
+        finally:
+            self.sock.setblocking(True)
+
+    def probe(self, mtu: int) -> Dict[str, Any]:
+        """Sends one datagram of `mtu` bytes on the wire. Returns {"fits": bool|None, "hint": next-hop MTU or None}.
+
+        fits is None when nothing came back at all.
+        """
+        payload_size = mtu - IP_HEADER[self.family] - 8
+        for _ in range(self.attempts):
+            self._drain()
+            self.sequence += 1
+            payload = struct.pack("!I", self.sequence) + b"\0" * max(payload_size - 4, 0)
+            try:
+                self.sock.send(payload)
+            except OSError as e:
+                if e.errno == errno.EMSGSIZE:
+                    return {"fits": False, "hint": self.route_mtu()}
+                if e.errno == errno.ENOBUFS:
+                    continue        # dropped by the device without an ICMP error
+                raise
+            deadline = time.monotonic() + self.timeout
+            poller = select.poll()
+            poller.register(self.sock, select.POLLERR | select.POLLIN)
+            while (remaining := deadline - time.monotonic()) > 0:
+                if not poller.poll(remaining * 1000):
+                    break
+                self.sock.setblocking(False)
+                try:
+                    error = self._read_error()
+                finally:
+                    self.sock.setblocking(True)
+                if error is None:
+                    self._drain()       # a reply from an open port also proves the datagram arrived
+                    return {"fits": True, "hint": None}
+                if error["sequence"] != self.sequence:
+                    continue
+                if error["errno"] == errno.EMSGSIZE:
+                    return {"fits": False, "hint": error["info"] or None}
+                return {"fits": True, "hint": None}
+        return {"fits": None, "hint": None}
+
+    def discover(self, ceiling: Optional[int] = None) -> Dict[str, Any]:
+        """Binary-searches the largest datagram that reaches the host, up to `ceiling` (default: the route MTU)."""
+        ceiling = ceiling or self.route_mtu()
+        floor = MIN_MTU[self.family]
+        probes = 1
+        if not self.probe(floor)["fits"]:
+            return {"path_mtu": None, "method": "unreachable", "probes": probes}
+        low, high, icmp_seen, silent = floor, ceiling, False, False
+        candidate = ceiling
+        while low < high:
+            result = self.probe(candidate)
+            probes += 1
+            if result["fits"]:
+                low = candidate
+            else:
+                high = candidate - 1
+                if result["fits"] is None:
+                    silent = True
+                else:
+                    icmp_seen = True
+                    if result["hint"] and low <= result["hint"] < candidate:
+                        high = result["hint"]
+                        candidate = high
+                        continue
+            candidate = (low + high + 1) // 2
+        method = "full" if low == ceiling else "blackhole" if silent and not icmp_seen else "icmp"
+        return {"path_mtu": low, "method": method, "probes": probes}
+
+
+def probe_path_mtu(targets: Sequence[str], timeout: float = 1.0, attempts: int = 2) -> List[Dict[str, Any]]:
+    """Probes every target and compares its path MTU with the MTU of the interface that reaches it."""
+    results = []
+    for target in targets:
+        result = {"target": target, "interface": None, "interface_mtu": None, "path_mtu": None,
+                  "method": "error", "probes": 0, "family": None}
+        try:
+            prober = PathMTUProber(target, timeout=timeout, attempts=attempts)
+        except OSError as e:
+            result["error"] = str(e)
+            results.append(result)
+            continue
+        try:
+            result["family"] = prober.family
+            result["interface"] = route_interface(prober.address[0])
+            result["interface_mtu"] = interface_mtu(result["interface"]) if result["interface"] else None
+            result.update(prober.discover(result["interface_mtu"]))
+        except OSError as e:
+            result["error"] = str(e)
+        finally:
+            prober.close()
+        results.append(result)
+    return results
+
+
+def recommend_mtu_settings(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Turns probe results into a tcp_mtu_probing mode, an MSS clamp and jumbo frame advice.
+
+    A black hole anywhere calls for probing from the first segment (2) and a clamp; paths where
+    PMTU discovery works, or nothing is lost, keep the black-hole fallback (1).
+    """
+    measured = [r for r in results if r.get("path_mtu")]
+    notes = []
+    blackholes = [r for r in measured if r["method"] == "blackhole"]
+    reduced = [r for r in measured if r["interface_mtu"] and r["path_mtu"] < r["interface_mtu"]]
+    mode = "2" if blackholes else "1"
+    for r in blackholes:
+        notes.append(f"{r['target']}: path MTU {r['path_mtu']} < {r['interface']} MTU {r['interface_mtu']} "
+                     "and no ICMP fragmentation-needed came back (PMTU black hole)")
+    for r in reduced:
+        if r["method"] == "icmp":
+            notes.append(f"{r['target']}: path MTU {r['path_mtu']} < {r['interface']} MTU {r['interface_mtu']}; "
+                         "PMTU discovery works (ICMP received)")
+    mss_clamp = {r["target"]: r["path_mtu"] - IP_HEADER[r["family"]] - TCP_HEADER for r in reduced}
+    for target, mss in mss_clamp.items():
+        notes.append(f"Clamp MSS towards {target} to {mss} (e.g. 'ip route change {target} ... advmss {mss}' "
+                     f"or TCPMSS --set-mss {mss})")
+    for interface in sorted({r["interface"] for r in measured if (r["interface_mtu"] or 0) > STANDARD_MTU}):
+        paths = [r for r in measured if r["interface"] == interface]
+        short = [r["target"] for r in paths if r["method"] != "full"]
+        if short:
+            notes.append(f"Jumbo frames on {interface} do not reach {', '.join(short)}; rely on the MSS clamp or lower the MTU")
+        else:
+            notes.append(f"Jumbo frames work end to end on {interface}")
+    if measured and all(r["method"] == "full" and (r["interface_mtu"] or 0) <= STANDARD_MTU for r in measured):
+        notes.append("Every path carries the full interface MTU; raise the interface MTU and re-probe to test jumbo frames")
+    unreachable = [r["target"] for r in results if not r.get("path_mtu")]
+    if unreachable:
+        notes.append(f"No answer from {', '.join(unreachable)} (ICMP filtered or host down); not measured")
+    return {"settings": {"net.ipv4.tcp_mtu_probing": mode}, "mss_clamp": mss_clamp, "notes": notes}
+
+
+def format_pmtu_results(results: List[Dict[str, Any]]) -> List[str]:
+    """Renders probe results as one line per target."""
+    lines = []
+    for r in results:
+        if r.get("error"):
+            lines.append(f"{r['target']:<24} error: {r['error']}")
+            continue
+        path = r["path_mtu"] if r["path_mtu"] else "-"
+        lines.append(f"{r['target']:<24} path MTU {path:>5} via {r['interface'] or '?'} "
+                     f"(MTU {r['interface_mtu'] or '?'}), {r['method']}, {r['probes']} probes")
+    return lines
@@ -0,0 +1,226 @@
+import ipaddress
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.network.procfs import read_snmp_counters
+from src.network.sockdiag import STATE_CODES, iter_tcp_sockets
+from src.network.sysctl import read_sysctl_values
+
+PORT_RANGE_KEY = "net.ipv4.ip_local_port_range"
+MAX_TW_KEY = "net.ipv4.tcp_max_tw_buckets"
+TW_REUSE_KEY = "net.ipv4.tcp_tw_reuse"
+FIN_TIMEOUT_KEY = "net.ipv4.tcp_fin_timeout"
+TIMESTAMPS_KEY = "net.ipv4.tcp_timestamps"
+PORT_KEYS = (PORT_RANGE_KEY, MAX_TW_KEY, TW_REUSE_KEY, FIN_TIMEOUT_KEY, TIMESTAMPS_KEY)
+
+TIME_WAIT_LEN = 60.0        # TCP_TIMEWAIT_LEN; fixed in the kernel, tcp_fin_timeout does not change it
+TW_REUSE_HOLD = 1.0         # tcp_tw_reuse lets connect() take over a TIME-WAIT port after one second
+TARGET_UTILIZATION = 0.5    # projected demand should stay under this share of the port range
+WIDEST_RANGE = (1024, 65535)
+TW_AGE_BUCKETS = (10, 20, 30, 40, 50, 60)
+GENERATED_PROFILE = "ephemeral_ports"
+
+
+def parse_port_range(value: Optional[str]) -> Tuple[int, int]:
+    try:
+        low, high = (int(part) for part in value.split())
+    except (AttributeError, ValueError):
+        raise ValueError(f"Error: cannot read {PORT_RANGE_KEY} (got {value!r}).") from None
+    return low, high
+
+
+def port_hold_time(dst: str, settings: Dict[str, Optional[str]]) -> float:
+    """Seconds a closed outbound connection keeps its port: TIME_WAIT_LEN, or about a second with tcp_tw_reuse.
+
+    tcp_tw_reuse=1 applies to every destination and 2 (the default) only to loopback; both need
+    TCP timestamps.
+    """
+    reuse = settings.get(TW_REUSE_KEY) or "0"
+    if settings.get(TIMESTAMPS_KEY) in (None, "0"):
+        return TIME_WAIT_LEN
+    if reuse == "1" or (reuse == "2" and ipaddress.ip_address(dst).is_loopback):
+        return TW_REUSE_HOLD
+    return TIME_WAIT_LEN
+
+
+def project_exhaustion(held: int, time_wait: int, rate: float, range_size: int, hold: float) -> Dict[str, Any]:
+    """Projects port use towards one destination at a constant connection rate.
+
+    `held` ports are in use by connections that are not in TIME-WAIT and `time_wait` by ones that
+    are. Each new connection holds its port for `hold` seconds after closing, so the TIME-WAIT pool
+    settles at rate * hold; in between it moves exponentially,
+    tw(t) = rate * hold + (time_wait - rate * hold) * exp(-t / hold). The ports run out when
+    held + tw(t) reaches the range size; if the steady state stays below it, they never do.
+    """
+    demand = held + rate * hold
+    projection = {
+        "demand": demand,
+        "utilization": demand / range_size,
+        "headroom_ports": range_size - demand,
+        "headroom_pct": 100.0 * (range_size - demand) / range_size,
+        "max_rate": max(range_size - held, 0) / hold,
+        "seconds_to_exhaustion": None,
+    }
+    if held + time_wait >= range_size:
+        projection["seconds_to_exhaustion"] = 0.0
+    elif demand > range_size:
+        steady = rate * hold
+        projection["seconds_to_exhaustion"] = -hold * math.log((range_size - held - steady) / (time_wait - steady))
+    return projection
+
+
+def summarize_ports(sockets: Iterable[Dict[str, Any]], settings: Dict[str, Optional[str]],
+                    outbound_rate: float = 0.0, listening: Iterable[int] = ()) -> Dict[str, Any]:
+    """Groups the sockets that hold ephemeral ports by (destination IP, port) and projects each group.
+
+    Accepted connections are recognized by a local port in `listening` and left out, since they
+    use the listener's port rather than an ephemeral one.
+
+    A destination's connection rate is the larger of its TIME-WAIT sockets spread over
+    TIME_WAIT_LEN and its share of the host-wide outbound rate (ActiveOpens per second), which
+    also counts connections whose TIME-WAIT was cut short by tcp_tw_reuse.
+    """
+    low, high = parse_port_range(settings[PORT_RANGE_KEY])
+    range_size = high - low + 1
+    destinations: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    ages = [0] * len(TW_AGE_BUCKETS)
+    listening = set(listening)
+    states: Dict[str, int] = {}
+    for entry in sockets:
+        if entry["state"] == "LISTEN":
+            listening.add(entry["sport"])
+            continue
+        states[entry["state"]] = states.get(entry["state"], 0) + 1
+        if entry["state"] == "TIME-WAIT":
+            age = max(TIME_WAIT_LEN - entry["expires"] / 1000.0, 0.0)
+            ages[min(int(age // 10), len(TW_AGE_BUCKETS) - 1)] += 1
+        if not low <= entry["sport"] <= high or entry["sport"] in listening:
+            continue
+        group = destinations.setdefault((entry["dst"], entry["dport"]), {
+            "dst": entry["dst"], "dport": entry["dport"], "ports": 0, "time_wait": 0, "fin_wait2": 0,
+        })
+        group["ports"] += 1
+        if entry["state"] == "TIME-WAIT":
+            group["time_wait"] += 1
+        elif entry["state"] == "FIN-WAIT-2":
+            group["fin_wait2"] += 1
+    total_ports = sum(group["ports"] for group in destinations.values())
+    for group in destinations.values():
+        share = outbound_rate * group["ports"] / total_ports if total_ports else 0.0
+        group["rate"] = max(group["time_wait"] / TIME_WAIT_LEN, share)
+        group["projection"] = project_exhaustion(group["ports"] - group["time_wait"], group["time_wait"], group["rate"],
+                                                 range_size, port_hold_time(group["dst"], settings))
+    return {
+        "settings": dict(settings),
+        "port_range": (low, high),
+        "range_size": range_size,
+        "outbound_rate": outbound_rate,
+        "states": states,
+        "time_wait": states.get("TIME-WAIT", 0),
+        "tw_ages": dict(zip(TW_AGE_BUCKETS, ages)),
+        "listening": sorted(listening),
+        "destinations": sorted(destinations.values(), key=lambda g: g["projection"]["utilization"], reverse=True),
+    }
+
+
+def analyze_ports(interval: float = 5.0, proc_root: str = "/proc/sys",
+                  sleep: Callable[[float], None] = time.sleep) -> Dict[str, Any]:
+    """Measures the outbound connection rate over `interval` seconds, then summarizes ephemeral port use via sock_diag."""
+    settings = read_sysctl_values(PORT_KEYS, proc_root)
+    before = read_snmp_counters().get("Tcp", {}).get("ActiveOpens", 0)
+    started = time.monotonic()
+    sleep(interval)
+    after = read_snmp_counters().get("Tcp", {}).get("ActiveOpens", 0)
+    rate = (after - before) / max(time.monotonic() - started, 1e-6)
+    listening = {entry["sport"] for entry in iter_tcp_sockets(states=["LISTEN"], info=False)}
+    return summarize_ports(iter_tcp_sockets(states=[s for s in STATE_CODES if s != "LISTEN"], info=False),
+                           settings, rate, listening)
+
+
+def recommend_port_settings(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds an overlay for the port range, TIME-WAIT limits and FIN timeout, and reprojects every destination with it.
+
+    tcp_tw_reuse is tried first, since it lets ports be reused without touching the range; the
+    range is widened only if demand would still pass TARGET_UTILIZATION. tcp_max_tw_buckets is
+    raised to twice the TIME-WAIT population the measured rates sustain.
+    """
+    settings = report["settings"]
+    overlay: Dict[str, str] = {}
+    notes: List[str] = []
+    destinations = report["destinations"]
+    low, high = report["port_range"]
+    pressured = [g for g in destinations if g["projection"]["utilization"] > TARGET_UTILIZATION]
+
+    proposed = dict(settings)
+    if pressured:
+        if settings.get(TIMESTAMPS_KEY) in (None, "0"):
+            notes.append("tcp_timestamps is off, so tcp_tw_reuse cannot help; enable timestamps or widen the range")
+        elif settings.get(TW_REUSE_KEY) != "1" and any(port_hold_time(g["dst"], settings) > TW_REUSE_HOLD for g in pressured):
+            overlay[TW_REUSE_KEY] = proposed[TW_REUSE_KEY] = "1"
+        demand = max(g["ports"] - g["time_wait"] + g["rate"] * port_hold_time(g["dst"], proposed) for g in pressured)
+        needed = math.ceil(demand / TARGET_UTILIZATION)
+        if needed > report["range_size"]:
+            new_low = max(WIDEST_RANGE[0], min(low, WIDEST_RANGE[1] - needed + 1))
+            new_high = WIDEST_RANGE[1]
+            overlay[PORT_RANGE_KEY] = proposed[PORT_RANGE_KEY] = f"{new_low} {new_high}"
+            clashes = [port for port in report["listening"] if new_low <= port <= new_high and not low <= port <= high]
+            if clashes:
+                notes.append(f"Listening ports {', '.join(map(str, clashes))} fall inside the new range; "
+                             f"add them to net.ipv4.ip_local_reserved_ports")
+            if WIDEST_RANGE[1] - new_low + 1 < needed:
+                notes.append(f"Even the widest range cannot hold {demand:.0f} ports per destination at "
+                             f"{TARGET_UTILIZATION:.0%} utilization; spread connections over more destination IPs "
+                             "or source addresses, or pool connections")
+        fin_timeout = int(settings.get(FIN_TIMEOUT_KEY) or 60)
+        if fin_timeout > 15:
+            overlay[FIN_TIMEOUT_KEY] = proposed[FIN_TIMEOUT_KEY] = "15"
+            notes.append("tcp_fin_timeout shortens FIN-WAIT-2 for orphaned sockets; TIME-WAIT stays at 60s")
+
+    tw_demand = max(report["time_wait"], report["outbound_rate"] * TIME_WAIT_LEN)
+    max_tw = int(settings.get(MAX_TW_KEY) or 0)
+    if 2 * tw_demand > max_tw:
+        overlay[MAX_TW_KEY] = proposed[MAX_TW_KEY] = str(math.ceil(2 * tw_demand / 1024) * 1024)
+    elif max_tw and report["time_wait"] >= max_tw:
+        notes.append("TIME-WAIT is at tcp_max_tw_buckets; the kernel is destroying TIME-WAIT sockets early")
+
+    new_low, new_high = parse_port_range(proposed[PORT_RANGE_KEY])
+    projected = {
+        (g["dst"], g["dport"]): project_exhaustion(g["ports"] - g["time_wait"], g["time_wait"], g["rate"],
+                                                   new_high - new_low + 1, port_hold_time(g["dst"], proposed))
+        for g in destinations
+    }
+    return {"settings": overlay, "notes": notes, "projected": projected}
+
+
+def _duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "never"
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    return f"{seconds / 60:.0f}m" if seconds < 7200 else f"{seconds / 3600:.1f}h"
+
+
+def format_port_report(report: Dict[str, Any], recommendation: Optional[Dict[str, Any]] = None,
+                       limit: int = 10) -> List[str]:
+    """Renders the port analysis, with the headroom each destination would have after the overlay."""
+    low, high = report["port_range"]
+    lines = [
+        f"Ephemeral ports      : {low}-{high} ({report['range_size']} per destination), "
+        f"{report['outbound_rate']:.1f} outbound connections/s",
+        f"TIME-WAIT            : {report['time_wait']} (tcp_max_tw_buckets {report['settings'].get(MAX_TW_KEY)}), "
+        f"tw_reuse {report['settings'].get(TW_REUSE_KEY)}",
+        "TIME-WAIT age (s)    : " + ", ".join(f"<{edge}: {count}" for edge, count in report["tw_ages"].items()),
+        "destination                      ports   t-wait   conn/s  headroom  exhausted in" + ("  after overlay" if recommendation else ""),
+    ]
+    for g in report["destinations"][:limit]:
+        p = g["projection"]
+        line = (f"{g['dst'] + ':' + str(g['dport']):<32} {g['ports']:>5} {g['time_wait']:>8} {g['rate']:>8.1f} "
+                f"{p['headroom_pct']:>8.1f}% {_duration(p['seconds_to_exhaustion']):>13}")
+        if recommendation:
+            after = recommendation["projected"][(g["dst"], g["dport"])]
+            line += f"  {after['headroom_pct']:>6.1f}% / {_duration(after['seconds_to_exhaustion'])}"
+        lines.append(line)
+    if len(report["destinations"]) > limit:
+        lines.append(f"... {len(report['destinations']) - limit} more destinations")
+    return lines
@@ -0,0 +1,126 @@
+from typing import Dict, Iterable
+
+SNMP_FILE = "/proc/net/snmp"
+NETSTAT_FILE = "/proc/net/netstat"
+SOCKSTAT_FILE = "/proc/net/sockstat"
+NET_DEV_FILE = "/proc/net/dev"
+MEMINFO_FILE = "/proc/meminfo"
+STAT_FILE = "/proc/stat"
+TCP_TABLES = ("/proc/net/tcp", "/proc/net/tcp6")
+
+# Hex state codes used in /proc/net/tcp{,6}.
+TCP_STATES = {
+    "01": "ESTABLISHED", "02": "SYN-SENT", "03": "SYN-RECV", "04": "FIN-WAIT-1",
+    "05": "FIN-WAIT-2", "06": "TIME-WAIT", "07": "CLOSE", "08": "CLOSE-WAIT",
+    "09": "LAST-ACK", "0A": "LISTEN", "0B": "CLOSING", "0C": "NEW-SYN-RECV",
+}
+
+
+def _read_lines(path: str):
+    with open(path, "r") as f:
+        return f.read().splitlines()
+
+
+def read_snmp_counters(paths: Iterable[str] = (SNMP_FILE, NETSTAT_FILE)) -> Dict[str, Dict[str, int]]:
+    """Parses the header/value line pairs of /proc/net/snmp and /proc/net/netstat.
+
+    Returns e.g. {"Tcp": {"RetransSegs": 12, ...}, "TcpExt": {"ListenDrops": 0, ...}}.
+    Missing files are skipped.
+    """
+    counters: Dict[str, Dict[str, int]] = {}
+    for path in paths:
+        try:
+            lines = _read_lines(path)
+        except OSError:
+            continue
+        for header, values in zip(lines[::2], lines[1::2]):
+            section, names = header.split(":", 1)
+            _, numbers = values.split(":", 1)
+            counters.setdefault(section, {}).update(
+                {name: int(number) for name, number in zip(names.split(), numbers.split())}
+            )
+    return counters
+
+
+def read_sockstat(path: str = SOCKSTAT_FILE) -> Dict[str, Dict[str, int]]:
+    """Parses /proc/net/sockstat into {"TCP": {"inuse": .., "tw": .., "mem": ..}, ...}."""
+    stats: Dict[str, Dict[str, int]] = {}
+    try:
+        lines = _read_lines(path)
+    except OSError:
+        return stats
+    for line in lines:
+        if ":" not in line:
+            continue
+        section, rest = line.split(":", 1)
+        fields = rest.split()
+        stats[section] = {fields[i]: int(fields[i + 1]) for i in range(0, len(fields) - 1, 2)}
+    return stats
+
+
+def read_net_dev(path: str = NET_DEV_FILE) -> Dict[str, Dict[str, int]]:
+    """Parses /proc/net/dev into per-interface rx_*/tx_* counters."""
+    columns = ["bytes", "packets", "errs", "drop", "fifo", "frame", "compressed", "multicast"]
+    tx_columns = ["bytes", "packets", "errs", "drop", "fifo", "colls", "carrier", "compressed"]
+    interfaces: Dict[str, Dict[str, int]] = {}
+    try:
+        lines = _read_lines(path)
+    except OSError:
+        return interfaces
+    for line in lines[2:]:
+        if ":" not in line:
+            continue
+        name, rest = line.split(":", 1)
+        numbers = [int(x) for x in rest.split()]
+        stats = {f"rx_{col}": val for col, val in zip(columns, numbers[:8])}
+        stats.update({f"tx_{col}": val for col, val in zip(tx_columns, numbers[8:16])})
+        interfaces[name.strip()] = stats
+    return interfaces
+
+
+def read_cpu_times(path: str = STAT_FILE) -> Dict[str, int]:
+    """Returns the aggregate CPU jiffies from /proc/stat as {"busy": .., "total": ..}.
+
+    iowait counts as idle, steal as busy.
+    """
+    try:
+        fields = [int(x) for x in _read_lines(path)[0].split()[1:]]
+    except (OSError, IndexError, ValueError):
+        return {"busy": 0, "total": 0}
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return {"busy": sum(fields[:8]) - idle, "total": sum(fields[:8])}
+
+
+def read_meminfo(path: str = MEMINFO_FILE) -> Dict[str, int]:
+    """Parses /proc/meminfo into a dict of kB values."""
+    meminfo: Dict[str, int] = {}
+    try:
+        lines = _read_lines(path)
+    except OSError:
+        return meminfo
+    for line in lines:
+        if ":" not in line:
+            continue
+        key, rest = line.split(":", 1)
+        parts = rest.split()
+        if parts:
+            meminfo[key] = int(parts[0])
+    return meminfo
+
+
+def count_tcp_states(paths: Iterable[str] = TCP_TABLES) -> Dict[str, int]:
+    """Counts sockets per TCP state from the /proc/net/tcp tables."""
+    counts = {name: 0 for name in TCP_STATES.values()}
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split(None, 4)
+                    if len(fields) > 3:
+                        state = TCP_STATES.get(fields[3].upper())
+                        if state:
+                            counts[state] += 1
+        except OSError:
+            continue
+    return counts
@@ -1,29 +1,303 @@
+import os
+import selectors
+import shlex
+import signal
 import subprocess
-from typing import Tuple
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (exit status, stdout, stderr) — the shape every executor call returns.
+Result = Tuple[int, str, str]
+
+TIMEOUT_STATUS = 124
+SESSION_ERROR_STATUS = 125
+NOT_FOUND_STATUS = 127
+DEFAULT_CACHE_TTL = 30.0
+DEFAULT_WORKERS = 8
+
+
+def _timed_out(timeout: Optional[float] = None) -> Result:
+    return TIMEOUT_STATUS, "", f"Command timed out after {timeout:.3g}s" if timeout is not None else "Command timed out"
+
+
+def execute(command, timeout: Optional[float] = None) -> Result:
+    """Runs one command in its own shell and returns (status, stdout, stderr); never raises for command failures."""
+    try:
+        result = subprocess.run(
+            command, shell=True, check=True, capture_output=True,
+            text=True, encoding='utf-8', timeout=timeout
+        )
+        return 0, result.stdout, result.stderr
+    except subprocess.CalledProcessError as e:
+        return e.returncode, e.stdout or "", e.stderr or ""
+    except subprocess.TimeoutExpired:
+        return _timed_out(timeout)
+    except FileNotFoundError:
+        return NOT_FOUND_STATUS, "", f"Command not found: {str(command).split()[0]}"
+
+
+class ShellSession:
+    """A long-lived /bin/sh coprocess that runs commands without spawning a shell from Python each time.
+
+    Every command is handed over as a single-quoted variable and run with eval in a subshell
+    with stdin closed, so neither its quoting nor its effects can change the session's state or
+    eat the framing. Its stdout is followed by a marker line carrying the exit status, then its
+    stderr and a closing marker; the marker is random per session. A command that overruns its
+    deadline, or a session that loses the framing, kills the whole session, which is restarted
+    on next use. A session inherited across fork() is abandoned rather than shared.
+    """
+
+    def __init__(self, shell: str = "/bin/sh"):
+        self.shell = shell
+        self.process = None
+        self.marker = ""
+        self.buffer = b""
+        self.lock = threading.Lock()
+
+    def _start(self):
+        self.marker = f"__tcp_optimizer_{uuid.uuid4().hex}__"
+        self.buffer = b""
+        self.pid = os.getpid()
+        self.process = subprocess.Popen(
+            [self.shell], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        self.stderr_file = os.path.join(tempfile.gettempdir(), f"{self.marker}.err")
+
+    def close(self):
+        """Stops the shell and everything it started."""
+        if self.process is None:
+            return
+        if self.pid != os.getpid():
+            # The shell belongs to the parent process; leave it running for the parent.
+            self.process = None
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            stream.close()
+        try:
+            os.remove(self.stderr_file)
+        except OSError:
+            pass
+        self.process = None
+
+    def _frame(self, command: str) -> bytes:
+        err = self.stderr_file
+        return (f"__tcp_optimizer_cmd={shlex.quote(command)}\n"
+                f"( eval \"$__tcp_optimizer_cmd\" ) </dev/null 2>{err}; printf '\\n%s %d\\n' {self.marker} $?; "
+                f"cat {err}; printf '\\n%s\\n' {self.marker}\n").encode()
+
+    def _read_until(self, terminator: bytes, deadline: Optional[float]) -> Optional[bytes]:
+        """Returns everything up to `terminator` (consumed), or None when the deadline passes or the shell dies."""
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.process.stdout, selectors.EVENT_READ)
+            while terminator not in self.buffer:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                if not sel.select(remaining):
+                    continue
+                chunk = os.read(self.process.stdout.fileno(), 65536)
+                if not chunk:
+                    return None
+                self.buffer += chunk
+        data, self.buffer = self.buffer.split(terminator, 1)
+        return data
+
+    def run_batch(self, commands: Sequence[str], timeout: Optional[float] = None,
+                  deadline: Optional[float] = None) -> List[Result]:
+        """Runs commands one after another in the session.
+
+        `timeout` bounds each command and `deadline` (a time.monotonic() value) the whole batch.
+        A command that overruns is reported as timed out and the session is restarted for the
+        next one; once the batch deadline has passed, the remaining commands are not started.
+        If the session dies or its output cannot be parsed, the command reports
+        SESSION_ERROR_STATUS and the next one gets a fresh session.
+        """
+        results: List[Result] = []
+        with self.lock:
+            for command in commands:
+                limits = [limit for limit in (deadline, time.monotonic() + timeout if timeout is not None else None) if limit is not None]
+                command_deadline = min(limits) if limits else None
+                if deadline is not None and time.monotonic() >= deadline:
+                    results.append(_timed_out())
+                    continue
+                if self.process is None or self.pid != os.getpid() or self.process.poll() is not None:
+                    self.close()
+                    self._start()
+                result = None
+                try:
+                    self.process.stdin.write(self._frame(command))
+                    self.process.stdin.flush()
+                    stdout = self._read_until(f"\n{self.marker} ".encode(), command_deadline)
+                    status = self._read_until(b"\n", command_deadline) if stdout is not None else None
+                    stderr = self._read_until(f"\n{self.marker}\n".encode(), command_deadline) if status is not None else None
+                    if stderr is not None:
+                        result = (int(status), stdout.decode("utf-8", "replace"), stderr.decode("utf-8", "replace"))
+                except (BrokenPipeError, ValueError):
+                    result = None
+                if result is None:
+                    self.close()
+                    if command_deadline is not None and time.monotonic() >= command_deadline:
+                        result = _timed_out(timeout)
+                    else:
+                        result = SESSION_ERROR_STATUS, "", "Shell session lost the command framing; restarted it"
+                results.append(result)
+        return results
+
+
+class CommandExecutor:
+    """Runs shell commands in persistent shell sessions, one at a time, batched or concurrently, with an optional TTL cache.
+
+    Sessions are pooled: each concurrent caller borrows an idle one, so run_many keeps up to
+    max_workers shells alive instead of spawning one per command.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, cache_ttl: float = DEFAULT_CACHE_TTL,
+                 clock=time.monotonic):
+        self.max_workers = max_workers
+        self.cache_ttl = cache_ttl
+        self.clock = clock
+        self._sessions: List[ShellSession] = []
+        self._idle: List[ShellSession] = []
+        self._pool_lock = threading.Lock()
+        self._cache: Dict[str, Tuple[float, Result]] = {}
+        self._cache_lock = threading.Lock()
+
+    def _cached(self, command: str) -> Optional[Result]:
+        with self._cache_lock:
+            entry = self._cache.get(command)
+            if entry and entry[0] > self.clock():
+                return entry[1]
+            self._cache.pop(command, None)
+        return None
+
+    @contextmanager
+    def _session(self):
+        with self._pool_lock:
+            if self._idle:
+                session = self._idle.pop()
+            else:
+                session = ShellSession()
+                self._sessions.append(session)
+        try:
+            yield session
+        finally:
+            with self._pool_lock:
+                self._idle.append(session)
+
+    def _store(self, command: str, result: Result):
+        if result[0] == 0:
+            with self._cache_lock:
+                self._cache[command] = (self.clock() + self.cache_ttl, result)
+
+    def run(self, command, timeout: Optional[float] = None, cache: bool = False) -> Result:
+        """Runs one command in a shell session; with `cache`, a successful result is reused for cache_ttl seconds."""
+        return self.run_batch([command], timeout, cache=cache)[0]
+
+    def run_batch(self, commands: Sequence[str], timeout: Optional[float] = None,
+                  deadline: Optional[float] = None, cache: bool = False) -> List[Result]:
+        """Runs commands in order in one shell session; with `cache`, cached results are reused and new successes stored."""
+        commands = [command if isinstance(command, str) else shlex.join(command) for command in commands]
+        results: List[Optional[Result]] = [self._cached(command) if cache else None for command in commands]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            with self._session() as session:
+                for i, result in zip(pending, session.run_batch([commands[i] for i in pending], timeout, deadline)):
+                    results[i] = result
+                    if cache:
+                        self._store(commands[i], result)
+        return results
+
+    def run_many(self, commands: Sequence[str], timeout: Optional[float] = None,
+                 overall_timeout: Optional[float] = None, cache: bool = False) -> List[Result]:
+        """Runs independent commands concurrently, returning results in input order.
+
+        Each command gets at most `timeout` seconds and never more than what is left of
+        `overall_timeout`; commands that cannot start before the overall deadline report a timeout.
+        """
+        deadline = time.monotonic() + overall_timeout if overall_timeout is not None else None
+
+        def task(command):
+            limits = [limit for limit in (timeout, deadline - time.monotonic() if deadline is not None else None) if limit is not None]
+            budget = min(limits) if limits else None
+            if budget is not None and budget <= 0:
+                return _timed_out()
+            return self.run(command, budget, cache)
+
+        if not commands:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(commands))) as pool:
+            return list(pool.map(task, commands))
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def close(self):
+        with self._pool_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+            self._idle.clear()
+
+
+_default_executor: Optional[CommandExecutor] = None
+
+
+def get_executor() -> CommandExecutor:
+    """Returns the process-wide executor shared by every subprocess caller."""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = CommandExecutor()
+    return _default_executor
+
 
 class CommandRunner:
-    def run_command(self, command: str, suppress_errors: bool = False, timeout: int | None = None) -> str:
+    def __init__(self, executor: Optional[CommandExecutor] = None):
+        self.executor = executor or get_executor()
+
+    @staticmethod
+    def _format(command: str, status: int, stdout: str, stderr: str, suppress_errors: bool) -> str:
+        if status == 0:
+            return stdout.strip()
+        if suppress_errors:
+            return ""
+        if status == NOT_FOUND_STATUS and not stderr.strip():
+            return f"Error: Command not found: {command.split()[0]}"
+        return f"Error: {stderr.strip()}"
+
+    def run_command(self, command: str, suppress_errors: bool = False, timeout: int | None = None,
+                    cache: bool = False) -> str:
         """
         Runs a shell command and returns its stdout.
         If suppress_errors is True, stderr is not returned on error.
-        Optionally, a timeout in seconds can be provided for the command.
+        Optionally, a timeout in seconds can be provided for the command, and with cache
+        a successful result is reused for a short while.
         """
-        try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                check=True,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                timeout=timeout
-            )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            if not suppress_errors:
-                return f"Error: {e.stderr.strip()}"
-            return ""
-        except FileNotFoundError:
-            if not suppress_errors:
-                return f"Error: Command not found: {command.split()[0]}"
-            return ""
\ No newline at end of file
+        return self._format(command, *self.executor.run(command, timeout, cache), suppress_errors)
+
+    def run_batch(self, commands: Sequence[str], suppress_errors: bool = False,
+                  timeout: float | None = None, deadline: float | None = None, cache: bool = False) -> List[str]:
+        """
+        Runs commands in order in the executor's persistent shell and returns their outputs.
+        """
+        results = self.executor.run_batch(commands, timeout, deadline, cache)
+        return [self._format(command, *result, suppress_errors) for command, result in zip(commands, results)]
+
+    def run_many(self, commands: Sequence[str], suppress_errors: bool = False,
+                 timeout: float | None = None, overall_timeout: float | None = None) -> List[str]:
+        """
+        Runs independent commands concurrently and returns their outputs in order.
+        """
+        results = self.executor.run_many(commands, timeout, overall_timeout)
+        return [self._format(command, *result, suppress_errors) for command, result in zip(commands, results)]
@@ -0,0 +1,311 @@
+import json
+import logging
+import operator
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.network.procfs import read_net_dev, read_snmp_counters
+from src.network.sockdiag import collect_tcp_info
+from src.network.sysctl import (
+    SYSCTL_CONF_FILE,
+    normalize_sysctl_value,
+    read_sysctl_values,
+    write_sysctl_config,
+    write_sysctl_values,
+)
+from src.utils.stats import percentile
+
+AUDIT_LOG = "/var/log/tcp-optimizer/scheduler.jsonl"
+METRICS = ("throughput_mbps", "conn_rate", "rtt_ms", "retrans_rate")
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+OPERATORS = {">=": operator.ge, ">": operator.gt, "<=": operator.le, "<": operator.lt}
+
+DEFAULT_SCHEDULE = {
+    "interval": 30.0,
+    "default_profile": "balanced",
+    "enter_samples": 3,          # consecutive matching samples before a rule takes over
+    "exit_samples": 3,           # consecutive failing samples before it lets go
+    "hysteresis": 0.2,           # thresholds are loosened by this fraction while a rule is active
+    "min_dwell": 600.0,          # seconds a profile stays before the next switch
+    "max_switches_per_hour": 4,
+    "rules": [],
+}
+
+
+class LoadSampler:
+    """Measures throughput, connection rate, RTT and retransmit rate since the previous call.
+
+    Only the previous counter snapshot is kept. The first call primes it and returns None.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.previous: Optional[Dict[str, float]] = None
+
+    def _counters(self) -> Dict[str, float]:
+        snmp = read_snmp_counters()
+        tcp = snmp.get("Tcp", {})
+        devices = read_net_dev()
+        return {
+            "time": self.clock(),
+            "bytes": sum(d["rx_bytes"] + d["tx_bytes"] for name, d in devices.items() if name != "lo"),
+            "opens": tcp.get("ActiveOpens", 0) + tcp.get("PassiveOpens", 0),
+            "out_segs": tcp.get("OutSegs", 0),
+            "retrans_segs": tcp.get("RetransSegs", 0),
+        }
+
+    @staticmethod
+    def _rtt_ms() -> Optional[float]:
+        """Median smoothed RTT of live flows, or None when there are none to measure."""
+        try:
+            samples = sorted(flow["rtt_ms"] for flow in collect_tcp_info())
+        except OSError:
+            return None
+        return percentile(samples, 50) if samples else None
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        current = self._counters()
+        previous, self.previous = self.previous, current
+        if previous is None:
+            return None
+        elapsed = max(current["time"] - previous["time"], 1e-6)
+        out_segs = current["out_segs"] - previous["out_segs"]
+        return {
+            "throughput_mbps": (current["bytes"] - previous["bytes"]) * 8 / elapsed / 1_000_000,
+            "conn_rate": (current["opens"] - previous["opens"]) / elapsed,
+            "rtt_ms": self._rtt_ms(),
+            "retrans_rate": 100.0 * (current["retrans_segs"] - previous["retrans_segs"]) / out_segs if out_segs else 0.0,
+        }
+
+
+def parse_condition(text: str) -> Tuple[str, float]:
+    """Parses '>= 500' into ('>=', 500.0)."""
+    text = text.strip()
+    for symbol in sorted(OPERATORS, key=len, reverse=True):
+        if text.startswith(symbol):
+            return symbol, float(text[len(symbol):])
+    raise ValueError(f"Error: invalid condition '{text}'. Expected e.g. '>= 500'.")
+
+
+def parse_window(text: str) -> Tuple[int, int]:
+    """Parses '22:00-06:00' into (start, end) minutes after midnight."""
+    try:
+        start, end = (part.strip().split(":") for part in text.split("-"))
+        minutes = [int(h) * 60 + int(m) for h, m in (start, end)]
+        if not all(0 <= int(h) < 24 and 0 <= int(m) < 60 for h, m in (start, end)):
+            raise ValueError
+    except (AttributeError, ValueError):
+        raise ValueError(f"Error: invalid window '{text}'. Expected e.g. '22:00-06:00'.") from None
+    return minutes[0], minutes[1]
+
+
+def parse_days(days: List[str]) -> List[str]:
+    """Normalizes day names ('Sunday', 'sun') to DAYS entries."""
+    if isinstance(days, str):
+        days = [days]
+    normalized = [str(day).lower()[:3] for day in days]
+    unknown = [day for day, short in zip(days, normalized) if short not in DAYS]
+    if unknown:
+        raise ValueError(f"Error: invalid days {', '.join(map(str, unknown))}. Expected e.g. 'mon' or 'Monday'.")
+    return normalized
+
+
+def in_window(rule: Dict[str, Any], now: time.struct_time) -> bool:
+    """True when `now` falls inside the rule's "window" ('22:00-06:00' wraps midnight) and "days"."""
+    if "days" in rule and DAYS[now.tm_wday] not in parse_days(rule["days"]):
+        return False
+    if "window" not in rule:
+        return True
+    start, end = parse_window(rule["window"])
+    minute = now.tm_hour * 60 + now.tm_min
+    return start <= minute < end if start <= end else minute >= start or minute < end
+
+
+class RulesEngine:
+    """Chooses a profile from ordered rules with hysteresis.
+
+    A rule is a dict with "name", "profile", "when" ({metric: '>= 500'}, all must hold) and
+    optional "window"/"days". The first rule to match for enter_samples consecutive samples
+    becomes active. The active rule is judged against thresholds loosened by `hysteresis` and
+    stays until it fails exit_samples times in a row, so traffic hovering at a threshold does
+    not toggle profiles. With no active rule the default profile applies.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], default_profile: str, enter_samples: int = 3,
+                 exit_samples: int = 3, hysteresis: float = 0.2):
+        self.rules = [dict(rule, conditions={metric: parse_condition(text) for metric, text in rule.get("when", {}).items()})
+                      for rule in rules]
+        for rule in self.rules:
+            unknown = set(rule["conditions"]) - set(METRICS)
+            if unknown:
+                raise ValueError(f"Error: rule '{rule['name']}' uses unknown metrics: {', '.join(sorted(unknown))}.")
+            if "window" in rule:
+                parse_window(rule["window"])
+            if "days" in rule:
+                parse_days(rule["days"])
+        self.default_profile = default_profile
+        self.enter_samples = enter_samples
+        self.exit_samples = exit_samples
+        self.hysteresis = hysteresis
+        self.streaks = {rule["name"]: 0 for rule in self.rules}
+        self.active: Optional[Dict[str, Any]] = None
+        self.failures = 0
+
+    def _matches(self, rule: Dict[str, Any], metrics: Dict[str, float], loosen: float) -> bool:
+        for metric, (symbol, threshold) in rule["conditions"].items():
+            if symbol in (">=", ">"):
+                threshold *= 1 - loosen
+            else:
+                threshold *= 1 + loosen
+            # An unmeasured metric (no flows to take an RTT from) satisfies no condition.
+            if metrics[metric] is None or not OPERATORS[symbol](metrics[metric], threshold):
+                return False
+        return True
+
+    def evaluate(self, metrics: Dict[str, float], now: time.struct_time) -> Dict[str, Any]:
+        """Feeds one sample in and returns {"profile", "rule", "reason"} for the state after it."""
+        for rule in self.rules:
+            matched = in_window(rule, now) and self._matches(rule, metrics, 0.0)
+            self.streaks[rule["name"]] = self.streaks[rule["name"]] + 1 if matched else 0
+        if self.active is not None:
+            if in_window(self.active, now) and self._matches(self.active, metrics, self.hysteresis):
+                self.failures = 0
+            else:
+                self.failures += 1
+                if self.failures >= self.exit_samples or not in_window(self.active, now):
+                    self.active = None
+        if self.active is None:
+            self.failures = 0
+            self.active = next((rule for rule in self.rules if self.streaks[rule["name"]] >= self.enter_samples), None)
+        if self.active is None:
+            return {"profile": self.default_profile, "rule": None, "reason": "no rule active"}
+        reason = ", ".join(f"{metric} {symbol} {threshold:g}" for metric, (symbol, threshold) in self.active["conditions"].items())
+        return {"profile": self.active["profile"], "rule": self.active["name"], "reason": reason or "time window"}
+
+
+class ProfileScheduler:
+    """Switches between profiles as the rules engine decides, rate limited and audited.
+
+    A switch writes only the keys whose live value differs from the new profile, then rewrites
+    the config file so a reboot comes back on the same profile. Keys the outgoing profile set
+    but the new one does not manage go back to their `baseline` value (by default, the live
+    values when the scheduler starts). Each decision to change profile is appended to a JSON
+    Lines audit log with the metrics that triggered it; a decision the rate limit holds back
+    is recorded once, until the decision or the limit changes.
+    """
+
+    def __init__(self, profiles: Dict[str, Any], engine: RulesEngine, logger, sampler: Optional[LoadSampler] = None,
+                 audit_log: str = AUDIT_LOG, min_dwell: float = 600.0, max_switches_per_hour: int = 4,
+                 proc_root: str = "/proc/sys", conf_file: str = SYSCTL_CONF_FILE,
+                 clock: Callable[[], float] = time.time, baseline: Optional[Dict[str, Optional[str]]] = None):
+        for rule in engine.rules:
+            if rule["profile"] not in profiles:
+                raise ValueError(f"Error: rule '{rule['name']}' names unknown profile '{rule['profile']}'.")
+        self.profiles = profiles
+        self.engine = engine
+        self.logger = logger
+        self.sampler = sampler or LoadSampler()
+        self.audit_log = audit_log
+        self.min_dwell = min_dwell
+        self.max_switches_per_hour = max_switches_per_hour
+        self.proc_root = proc_root
+        self.conf_file = conf_file
+        self.clock = clock
+        if baseline is None:
+            baseline = read_sysctl_values({key for p in profiles.values() for key in p["settings"]}, proc_root)
+        self.baseline = baseline
+        self.held: Optional[Tuple[str, Optional[str], str]] = None
+        self.current: Optional[str] = None
+        self.last_switch = float("-inf")
+        self.switches: deque = deque()
+
+    def _audit(self, entry: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.audit_log) or ".", exist_ok=True)
+        with open(self.audit_log, "a") as f:
+            f.write(json.dumps(entry, sort_keys=True) + "\n")
+
+    def _rate_limited(self, now: float) -> Optional[Tuple[str, str]]:
+        """Returns (limit name, explanation) when a switch now would break a limit."""
+        while self.switches and now - self.switches[0] >= 3600:
+            self.switches.popleft()
+        if now - self.last_switch < self.min_dwell:
+            return "dwell", f"dwell time: last switch {now - self.last_switch:.0f}s ago (minimum {self.min_dwell:g}s)"
+        if len(self.switches) >= self.max_switches_per_hour:
+            return "hourly", f"{len(self.switches)} switches in the last hour (maximum {self.max_switches_per_hour})"
+        return None
+
+    def switch(self, profile: str) -> Tuple[List[str], Dict[str, str]]:
+        """Moves the live settings to `profile`, writing only what differs. Returns (changed keys, errors).
+
+        Keys only the outgoing profile manages are restored from the baseline; a key with no
+        baseline value (unreadable at start) is left as it is.
+        """
+        settings = self.profiles[profile]["settings"]
+        previous = self.profiles[self.current]["settings"] if self.current else {}
+        target = {key: self.baseline[key] for key in previous
+                  if key not in settings and self.baseline.get(key) is not None}
+        target.update(settings)
+        current = read_sysctl_values(target.keys(), self.proc_root)
+        changes = {key: value for key, value in target.items() if current[key] != normalize_sysctl_value(value)}
+        errors = write_sysctl_values(changes, self.proc_root)
+        write_sysctl_config(settings, self.conf_file)
+        return sorted(changes), errors
+
+    def tick(self) -> Optional[Dict[str, Any]]:
+        """Samples load, evaluates the rules and switches profile if needed. Returns the audit entry, if any."""
+        metrics = self.sampler.sample()
+        if metrics is None:
+            return None
+        decision = self.engine.evaluate(metrics, time.localtime(self.clock()))
+        if decision["profile"] == self.current:
+            self.held = None
+            return None
+        now = self.clock()
+        entry = {"timestamp": now, "from": self.current, "to": decision["profile"], "rule": decision["rule"],
+                 "reason": decision["reason"], "metrics": metrics}
+        limit = None if self.current is None else self._rate_limited(now)
+        if limit:
+            held = (decision["profile"], decision["rule"], limit[0])
+            if held == self.held:
+                return None
+            self.held = held
+            entry.update(applied=False, suppressed_by=limit[1])
+            self.logger.log(f"Scheduler: holding '{self.current}' instead of '{decision['profile']}' ({limit[1]})", level=logging.WARNING)
+        else:
+            self.held = None
+            changed, errors = self.switch(decision["profile"])
+            entry.update(applied=True, changed=changed, errors=errors)
+            self.logger.log(f"Scheduler: '{self.current}' -> '{decision['profile']}' ({decision['rule'] or 'default'}: "
+                            f"{decision['reason']}); {len(changed)} keys written")
+            for key, error in errors.items():
+                self.logger.log(f"Scheduler: could not write {key}: {error}", level=logging.ERROR)
+            self.current = decision["profile"]
+            self.last_switch = now
+            self.switches.append(now)
+        try:
+            self._audit(entry)
+        except OSError as e:
+            self.logger.log(f"Scheduler: could not write the audit log {self.audit_log}: {e}", level=logging.ERROR)
+        return entry
+
+    def run(self, interval: float = 30.0, iterations: Optional[int] = None, sleep: Callable[[float], None] = time.sleep):
+        """Ticks every `interval` seconds until interrupted, or for a fixed number of iterations.
+
+        A failed tick (unreadable counters, a sysctl write error) is logged and the next one runs
+        on schedule; only an interrupt stops the loop.
+        """
+        self.logger.log(f"Scheduler running every {interval}s with {len(self.engine.rules)} rules; audit log {self.audit_log}")
+        count = 0
+        try:
+            while iterations is None or count < iterations:
+                try:
+                    self.tick()
+                except Exception as e:
+                    self.logger.log(f"Scheduler: tick failed: {e}", level=logging.ERROR)
+                count += 1
+                if iterations is None or count < iterations:
+                    sleep(interval)
+        except KeyboardInterrupt:
+            self.logger.log("Scheduler stopped.")
@@ -0,0 +1,207 @@
+import socket
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 0x2
+NLMSG_DONE = 0x3
+
+INET_DIAG_REQ_BYTECODE = 1
+INET_DIAG_INFO = 2
+INET_DIAG_CONG = 4
+
+INET_DIAG_BC_S_GE = 2
+INET_DIAG_BC_S_LE = 3
+INET_DIAG_BC_D_GE = 4
+INET_DIAG_BC_D_LE = 5
+
+TCP_STATES = {
+    1: "ESTABLISHED", 2: "SYN-SENT", 3: "SYN-RECV", 4: "FIN-WAIT-1", 5: "FIN-WAIT-2",
+    6: "TIME-WAIT", 7: "CLOSE", 8: "CLOSE-WAIT", 9: "LAST-ACK", 10: "LISTEN",
+    11: "CLOSING", 12: "NEW-SYN-RECV",
+}
+STATE_CODES = {name: code for code, name in TCP_STATES.items()}
+ALL_STATES = 0xFFFFFFFF
+
+# Receive buffer size; memory use stays bounded by this regardless of socket count.
+RECV_BUFFER_SIZE = 256 * 1024
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_NLATTR = struct.Struct("=HH")
+_REQ_V2 = struct.Struct("=BBBBI")
+_SOCKID_PORTS = struct.Struct(">HH")
+_BC_OP = struct.Struct("=BBH")
+_DIAG_MSG_HEAD = struct.Struct("=BBBB")
+_DIAG_MSG_TAIL = struct.Struct("=IIIII")
+_DIAG_MSG_LEN = 72
+_SOCKID_LEN = 48
+
+# (name, struct format, offset) of the struct tcp_info fields we report.
+# Older kernels send a shorter struct; fields beyond the attribute length are skipped.
+TCP_INFO_FIELDS = [
+    ("state", "B", 0), ("ca_state", "B", 1), ("retransmits", "B", 2), ("probes", "B", 3),
+    ("backoff", "B", 4), ("options", "B", 5),
+    ("rto", "I", 8), ("ato", "I", 12), ("snd_mss", "I", 16), ("rcv_mss", "I", 20),
+    ("unacked", "I", 24), ("sacked", "I", 28), ("lost", "I", 32), ("retrans", "I", 36),
+    ("last_data_sent", "I", 44), ("last_data_recv", "I", 52),
+    ("pmtu", "I", 60), ("rcv_ssthresh", "I", 64), ("rtt", "I", 68), ("rttvar", "I", 72),
+    ("snd_ssthresh", "I", 76), ("snd_cwnd", "I", 80), ("advmss", "I", 84), ("reordering", "I", 88),
+    ("rcv_rtt", "I", 92), ("rcv_space", "I", 96), ("total_retrans", "I", 100),
+    ("pacing_rate", "Q", 104), ("max_pacing_rate", "Q", 112),
+    ("bytes_acked", "Q", 120), ("bytes_received", "Q", 128),
+    ("segs_out", "I", 136), ("segs_in", "I", 140),
+    ("notsent_bytes", "I", 144), ("min_rtt", "I", 148), ("data_segs_in", "I", 152), ("data_segs_out", "I", 156),
+    ("delivery_rate", "Q", 160),
+    ("busy_time", "Q", 168), ("rwnd_limited", "Q", 176), ("sndbuf_limited", "Q", 184),
+    ("delivered", "I", 192), ("delivered_ce", "I", 196),
+    ("bytes_sent", "Q", 200), ("bytes_retrans", "Q", 208),
+]
+_TCP_INFO_STRUCTS = [(name, struct.Struct("=" + fmt), offset) for name, fmt, offset in TCP_INFO_FIELDS]
+
+PortFilter = Union[int, Tuple[int, int], None]
+
+
+def state_mask(states: Optional[Iterable[str]] = None) -> int:
+    """Builds the kernel-side state bitmask from state names such as "ESTABLISHED"."""
+    if states is None:
+        return ALL_STATES
+    mask = 0
+    for name in states:
+        mask |= 1 << STATE_CODES[name]
+    return mask
+
+
+def build_port_bytecode(sport: PortFilter = None, dport: PortFilter = None) -> bytes:
+    """Builds inet_diag bytecode that keeps only sockets whose ports match.
+
+    Each filter is a single port or an inclusive (low, high) range; both filters must match.
+    """
+    conditions = []
+    for port, (ge, le) in ((sport, (INET_DIAG_BC_S_GE, INET_DIAG_BC_S_LE)), (dport, (INET_DIAG_BC_D_GE, INET_DIAG_BC_D_LE))):
+        if port is None:
+            continue
+        low, high = (port, port) if isinstance(port, int) else port
+        conditions.append((ge, low))
+        conditions.append((le, high))
+    total = len(conditions) * 8
+    code = bytearray()
+    for index, (op, port) in enumerate(conditions):
+        remaining = total - index * 8
+        # On success skip this op and its port operand; on failure jump past the end to reject.
+        code += _BC_OP.pack(op, 8, remaining + 4)
+        code += _BC_OP.pack(0, 0, port)
+    return bytes(code)
+
+
+def build_request(family: int, states: int, ext: int = 0, bytecode: bytes = b"", seq: int = 1) -> bytes:
+    """Builds a SOCK_DIAG_BY_FAMILY dump request carrying an inet_diag_req_v2."""
+    body = _REQ_V2.pack(family, socket.IPPROTO_TCP, ext, 0, states) + bytes(_SOCKID_LEN)
+    if bytecode:
+        body += _NLATTR.pack(_NLATTR.size + len(bytecode), INET_DIAG_REQ_BYTECODE) + bytecode
+    header = _NLMSGHDR.pack(_NLMSGHDR.size + len(body), SOCK_DIAG_BY_FAMILY, NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+    return header + body
+
+
+def decode_tcp_info(view: memoryview) -> Dict[str, int]:
+    """Decodes a struct tcp_info attribute in place."""
+    size = len(view)
+    return {name: st.unpack_from(view, offset)[0] for name, st, offset in _TCP_INFO_STRUCTS if offset + st.size <= size}
+
+
+def decode_diag_msg(view: memoryview, offset: int, end: int) -> Dict[str, Any]:
+    """Decodes one inet_diag_msg and its attributes from a netlink payload."""
+    family, state, timer, retrans = _DIAG_MSG_HEAD.unpack_from(view, offset)
+    sport, dport = _SOCKID_PORTS.unpack_from(view, offset + 4)
+    addr_len = 4 if family == socket.AF_INET else 16
+    src = socket.inet_ntop(family, view[offset + 8:offset + 8 + addr_len])
+    dst = socket.inet_ntop(family, view[offset + 24:offset + 24 + addr_len])
+    expires, rqueue, wqueue, uid, inode = _DIAG_MSG_TAIL.unpack_from(view, offset + 4 + _SOCKID_LEN)
+    entry: Dict[str, Any] = {
+        "family": family, "state": TCP_STATES.get(state, str(state)), "timer": timer, "retrans": retrans,
+        "src": src, "sport": sport, "dst": dst, "dport": dport,
+        "expires": expires, "rqueue": rqueue, "wqueue": wqueue, "uid": uid, "inode": inode,
+    }
+    attr = offset + _DIAG_MSG_LEN
+    while attr + _NLATTR.size <= end:
+        attr_len, attr_type = _NLATTR.unpack_from(view, attr)
+        if attr_len < _NLATTR.size:
+            break
+        payload = view[attr + _NLATTR.size:attr + attr_len]
+        if attr_type == INET_DIAG_INFO:
+            entry["tcp_info"] = decode_tcp_info(payload)
+        elif attr_type == INET_DIAG_CONG:
+            entry["congestion"] = bytes(payload).split(b"\0", 1)[0].decode()
+        attr += (attr_len + 3) & ~3
+    return entry
+
+
+def iter_tcp_sockets(states: Optional[Iterable[str]] = None, sport: PortFilter = None, dport: PortFilter = None,
+                     families: Iterable[int] = (socket.AF_INET, socket.AF_INET6), info: bool = True,
+                     buffer_size: int = RECV_BUFFER_SIZE) -> Iterator[Dict[str, Any]]:
+    """Streams TCP sockets from the kernel via NETLINK_SOCK_DIAG.
+
+    State and port filtering happen in the kernel, and replies are decoded straight out of a single
+    preallocated receive buffer, so memory stays bounded however many sockets the host has.
+    Raises OSError when the netlink family is unavailable.
+    """
+    mask = state_mask(states)
+    ext = ((1 << (INET_DIAG_INFO - 1)) | (1 << (INET_DIAG_CONG - 1))) if info else 0
+    bytecode = build_port_bytecode(sport, dport)
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG) as sock:
+        for seq, family in enumerate(families, start=1):
+            sock.sendall(build_request(family, mask, ext, bytecode, seq))
+            done = False
+            while not done:
+                received = sock.recv_into(buf)
+                offset = 0
+                while offset + _NLMSGHDR.size <= received:
+                    msg_len, msg_type, _, _, _ = _NLMSGHDR.unpack_from(view, offset)
+                    if msg_len < _NLMSGHDR.size:
+                        done = True
+                        break
+                    if msg_type == NLMSG_DONE:
+                        done = True
+                        break
+                    if msg_type == NLMSG_ERROR:
+                        error = -struct.unpack_from("=i", view, offset + _NLMSGHDR.size)[0]
+                        if error:
+                            raise OSError(error, f"sock_diag request failed: {error}")
+                        done = True
+                        break
+                    if msg_type == SOCK_DIAG_BY_FAMILY:
+                        yield decode_diag_msg(view, offset + _NLMSGHDR.size, offset + msg_len)
+                    offset += (msg_len + 3) & ~3
+
+
+def count_tcp_states(families: Iterable[int] = (socket.AF_INET, socket.AF_INET6)) -> Dict[str, int]:
+    """Counts TCP sockets per state without requesting tcp_info."""
+    counts = {name: 0 for name in TCP_STATES.values()}
+    for entry in iter_tcp_sockets(families=families, info=False):
+        counts[entry["state"]] = counts.get(entry["state"], 0) + 1
+    return counts
+
+
+def collect_tcp_info(states: Optional[Iterable[str]] = ("ESTABLISHED",), sport: PortFilter = None,
+                     dport: PortFilter = None) -> List[Dict[str, Any]]:
+    """Returns per-flow RTT (ms), cwnd, pacing/delivery rate and retransmits for matching sockets."""
+    flows = []
+    for entry in iter_tcp_sockets(states=states, sport=sport, dport=dport):
+        tcp_info = entry.get("tcp_info")
+        if not tcp_info:
+            continue
+        flows.append({
+            "src": entry["src"], "sport": entry["sport"], "dst": entry["dst"], "dport": entry["dport"],
+            "rtt_ms": tcp_info.get("rtt", 0) / 1000.0,
+            "cwnd": tcp_info.get("snd_cwnd", 0),
+            "pacing_rate": tcp_info.get("pacing_rate", 0),
+            "delivery_rate": tcp_info.get("delivery_rate", 0),
+            "total_retrans": tcp_info.get("total_retrans", 0),
+            "bytes": tcp_info.get("bytes_acked", 0) + tcp_info.get("bytes_received", 0),
+        })
+    return flows
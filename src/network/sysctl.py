@@ -9,9 +9,9 @@ def get_sysctl_value(param):
     """Gets the value of a sysctl parameter."""
     return run_command(f"sysctl -n {param}", timeout=5)
 
-def write_sysctl_config(settings):
+def write_sysctl_config(settings, path=SYSCTL_CONF_FILE):
     """Writes TCP settings to the sysctl config file."""
-    with open(SYSCTL_CONF_FILE, "w") as f:
+    with open(path, "w") as f:
         f.write("\n")
         for key, value in settings.items():
             f.write(f"{key} = {value}\n")
@@ -57,3 +57,50 @@ def revert_settings():
         os.remove(BACKUP_FILE)
 
     return "Settings reverted. All optimizer config and backup files have been deleted."
+
+def sysctl_proc_path(param, proc_root="/proc/sys"):
+    """Maps a dotted sysctl name to its procfs path."""
+    return os.path.join(proc_root, *param.split("."))
+
+def normalize_sysctl_value(value):
+    """Collapses tabs and repeated spaces so procfs and config values compare equal."""
+    return " ".join(str(value).split())
+
+def read_sysctl_values(params, proc_root="/proc/sys"):
+    """Reads many sysctl values straight from procfs without spawning a process per key.
+
+    Keys that do not exist or cannot be read map to None.
+    """
+    values = {}
+    for param in params:
+        try:
+            with open(sysctl_proc_path(param, proc_root), "r") as f:
+                values[param] = normalize_sysctl_value(f.read())
+        except OSError:
+            values[param] = None
+    return values
+
+def write_sysctl_values(settings, proc_root="/proc/sys"):
+    """Writes sysctl values straight to procfs. Returns a dict of key -> error for failed writes."""
+    errors = {}
+    for param, value in settings.items():
+        try:
+            with open(sysctl_proc_path(param, proc_root), "w") as f:
+                f.write(str(value))
+        except OSError as e:
+            errors[param] = e.strerror or str(e)
+    return errors
+
+def read_sysctl_config(path=SYSCTL_CONF_FILE):
+    """Parses a sysctl config file into a dict, skipping blanks and comments."""
+    settings = {}
+    if not os.path.exists(path):
+        return settings
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("#", ";")) or "=" not in line:
+                continue
+            key, value = [x.strip() for x in line.split("=", 1)]
+            settings[key.lstrip("-")] = value
+    return settings
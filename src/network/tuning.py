@@ -1,13 +1,16 @@
 import os
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from src.network.checkpoints import CheckpointStore, checkpoint_before_change
 
 class NetworkTuningManager:
-    def __init__(self, runner, logger):
+    def __init__(self, runner, logger, checkpoint_store: Optional[CheckpointStore] = None):
         self.runner = runner
         self.logger = logger
         self.sysctl_conf_file = "/etc/sysctl.d/tcp-optimizer.conf"
         self.backup_file = "/etc/sysctl.d/tcp-optimizer.conf.bak"
+        self.checkpoints = checkpoint_store or CheckpointStore()
 
     def apply_settings(self, settings: Dict[str, str]):
         """Applies sysctl settings from a given dictionary."""
@@ -18,7 +21,7 @@ class NetworkTuningManager:
         self.logger.log("Sysctl settings applied.")
 
     def revert_settings(self):
-        """Reverts settings to original state from backup."""
+        """Reverts settings to original state from backup and removes the optimizer's files."""
         self.logger.log("Reverting settings to original defaults...")
         if not os.path.exists(self.backup_file):
             self.logger.log("No backup file found. Cannot revert.")
@@ -29,9 +32,10 @@ class NetworkTuningManager:
                 backup_settings = json.load(f)
             self._write_sysctl_config([f"{key}={value}" for key, value in backup_settings.items()])
             self._apply_sysctl_from_conf()
+            os.remove(self.sysctl_conf_file)
             os.remove(self.backup_file)
             self.logger.log("Settings reverted from backup.")
-            return "Settings reverted to original defaults from backup."
+            return "Settings reverted. All optimizer config and backup files have been deleted."
         except json.JSONDecodeError:
             self.logger.log("Error: The backup file is corrupted. Cannot revert.")
             return "Error: The backup file is corrupted. Cannot revert."
@@ -39,18 +43,27 @@ class NetworkTuningManager:
             self.logger.log(f"Error during revert: {e}")
             return f"Error during revert: {e}"
 
-    def backup_settings(self, params_to_backup: List[str]):
-        """Backs up current sysctl settings for specified parameters."""
+    def backup_settings(self, params_to_backup: List[str], label: str = ""):
+        """Records a checkpoint of the specified parameters and keeps the first backup as the original.
+
+        Returns the checkpoint entry so callers can roll back to it.
+        """
+        checkpoint = checkpoint_before_change(params_to_backup, label, self.checkpoints, self.backup_file)
+        self.logger.log(f"Recorded checkpoint #{checkpoint['id']}.")
+        if os.path.exists(self.backup_file):
+            self.logger.log("Backup already exists.")
+            return checkpoint
         self.logger.log("Backing up current sysctl settings...")
         current_settings = {}
-        for param in params_to_backup:
-            value = self._get_sysctl_value(param)
-            if value is not None:
-                current_settings[param] = value
+        values = self.runner.run_batch([f"sysctl -n {param}" for param in params_to_backup], suppress_errors=True)
+        for param, value in zip(params_to_backup, values):
+            if value and "Error" not in value:
+                current_settings[param] = value.strip()
         
         with open(self.backup_file, 'w') as f:
             json.dump(current_settings, f, indent=2)
         self.logger.log("Current settings backed up.")
+        return checkpoint
 
     def _write_sysctl_config(self, config_lines: List[str]):
         """Writes sysctl configuration to a file."""
@@ -0,0 +1,257 @@
+import ctypes
+import ctypes.util
+import errno
+import multiprocessing
+import os
+import select
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+from src.network.procfs import read_snmp_counters
+from src.network.throughput import _cpu_seconds, _pin
+from src.network.workers import WORKER_GRACE, collect_results
+
+# Not exported by the socket module; values from <linux/udp.h> and <linux/socket.h>.
+SOL_UDP = 17
+UDP_SEGMENT = 103
+MSG_DONTWAIT = 0x40
+MAX_GSO_SEGMENTS = 64
+MAX_DATAGRAM = 65507
+UDP_COUNTERS = ("InDatagrams", "OutDatagrams", "InErrors", "RcvbufErrors", "SndbufErrors")
+PACING_INTERVAL = 0.001     # a paced sender bursts at most this many seconds' worth of datagrams
+IDLE_TIMEOUT = 0.2          # the sink stops this long after the last datagram once senders are done
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+        libc.recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_libc()
+
+
+class MessageBatch:
+    """A vector of mmsghdr entries over one preallocated buffer, for sendmmsg() and recvmmsg().
+
+    Entry i covers buffer[i * size:(i + 1) * size], so a batch is filled or drained without any
+    per-datagram allocation. For sending, all entries can share the first slot instead.
+    """
+
+    def __init__(self, count: int, size: int, shared: bool = False):
+        self.count = count
+        self.size = size
+        self.buffer = (ctypes.c_char * (size * (1 if shared else count)))()
+        self.iov = (_IOVec * count)()
+        self.msgs = (_MMsgHdr * count)()
+        base = ctypes.addressof(self.buffer)
+        for i in range(count):
+            self.iov[i].iov_base = base + (0 if shared else i * size)
+            self.iov[i].iov_len = size
+            self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iov[i])
+            self.msgs[i].msg_hdr.msg_iovlen = 1
+
+    def _call(self, function, *args) -> int:
+        while True:
+            done = function(*args)
+            if done >= 0:
+                return done
+            code = ctypes.get_errno()
+            if code != errno.EINTR:
+                raise OSError(code, os.strerror(code))
+
+    def send(self, sock: socket.socket) -> int:
+        """Sends the whole batch on a connected socket. Returns the number of messages sent."""
+        return self._call(_libc.sendmmsg, sock.fileno(), self.msgs, self.count, 0)
+
+    def receive(self, sock: socket.socket) -> int:
+        """Reads up to `count` queued datagrams without blocking. Returns how many were read."""
+        return self._call(_libc.recvmmsg, sock.fileno(), self.msgs, self.count, MSG_DONTWAIT, None)
+
+
+def enable_gso(sock: socket.socket, segment_size: int) -> bool:
+    """Turns on UDP GSO (UDP_SEGMENT) so one send carries many datagrams. False when unsupported."""
+    try:
+        sock.setsockopt(SOL_UDP, UDP_SEGMENT, segment_size)
+        return True
+    except OSError:
+        return False
+
+
+def read_udp_counters() -> Dict[str, int]:
+    """The Udp section of /proc/net/snmp, limited to the counters the benchmark reports."""
+    udp = read_snmp_counters().get("Udp", {})
+    return {name: udp.get(name, 0) for name in UDP_COUNTERS}
+
+
+def _sink(host: str, port_pipe, done, batch: int, size: int, rcvbuf: Optional[int], cpu: int, results):
+    """Counts datagrams until the senders are done and the socket has been idle for IDLE_TIMEOUT."""
+    _pin(cpu)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.bind((host, 0))
+    port_pipe.send(sock.getsockname()[1])
+    poller = select.poll()
+    poller.register(sock, select.POLLIN)
+    messages = MessageBatch(batch, size) if _libc else None
+    view = memoryview(bytearray(size))
+    received = 0
+    while True:
+        if not poller.poll(IDLE_TIMEOUT * 1000):
+            if done.is_set():
+                break
+            continue
+        try:
+            if messages is not None:
+                while (count := messages.receive(sock)) > 0:
+                    received += count
+            else:
+                while True:
+                    sock.recv_into(view, size, MSG_DONTWAIT)
+                    received += 1
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+    results.put({"role": "sink", "received": received, "rcvbuf": sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+                 "cpu_s": _cpu_seconds()})
+    sock.close()
+
+
+def _blaster(address, deadline: float, rate: float, batch: int, size: int, gso: bool, cpu: int, results):
+    """Sends datagrams until the deadline, pacing to `rate` packets per second when it is set."""
+    _pin(cpu)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect(address)
+    segments = min(MAX_GSO_SEGMENTS, MAX_DATAGRAM // size) if gso else 1
+    if rate:
+        burst = max(1, int(rate * PACING_INTERVAL))
+        segments = min(segments, burst)
+        batch = max(1, min(batch, burst // segments))
+    gso = segments > 1 and enable_gso(sock, size)
+    segments = segments if gso else 1
+    messages = MessageBatch(batch, size * segments, shared=True) if _libc else None
+    payload = bytes(size * segments)
+    sent = errors = 0
+    started = time.monotonic()
+    while (now := time.monotonic()) < deadline:
+        if rate and sent > (now - started) * rate:
+            time.sleep(min(sent / rate - (now - started), deadline - now))
+            continue
+        try:
+            if messages is not None:
+                sent += messages.send(sock) * segments
+            else:
+                for _ in range(batch):
+                    sock.send(payload)
+                    sent += segments
+        except OSError as e:
+            if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                raise
+            errors += 1         # the kernel is out of buffer; counted in SndbufErrors too
+    results.put({"role": "blaster", "sent": sent, "send_errors": errors, "gso": gso, "cpu_s": _cpu_seconds()})
+    sock.close()
+
+
+def run_udp_benchmark(duration: float = 5.0, datagram_size: int = 1200, rate: float = 0.0, senders: int = 1,
+                      batch: int = 64, gso: bool = True, rcvbuf: Optional[int] = None,
+                      host: str = "127.0.0.1") -> Dict[str, Any]:
+    """Blasts UDP datagrams at a local sink and reports packets per second, loss and UDP buffer errors.
+
+    Both ends use sendmmsg()/recvmmsg() through ctypes when libc has them, falling back to plain
+    send/recv loops, and senders use UDP GSO when the kernel supports it. `rate` caps each sender
+    in packets per second (0 sends flat out). The sink keeps net.core.rmem_default unless `rcvbuf`
+    is given, which, like a QUIC stack's SO_RCVBUF request, is capped by net.core.rmem_max. The
+    Udp counters from /proc/net/snmp are host-wide, so other UDP traffic shows up in them too.
+    """
+    datagram_size = max(16, min(datagram_size, MAX_DATAGRAM))
+    ctx = multiprocessing.get_context("fork")
+    done = ctx.Event()
+    results = ctx.Queue()
+    parent_pipe, child_pipe = ctx.Pipe()
+    sink = ctx.Process(target=_sink, args=(host, child_pipe, done, batch, datagram_size, rcvbuf, 0, results), daemon=True)
+    sink.start()
+    counters_before = read_udp_counters()
+    try:
+        address = (host, parent_pipe.recv())
+        started = time.monotonic()
+        deadline = started + duration
+        blasters = [ctx.Process(target=_blaster, args=(address, deadline, rate, batch, datagram_size, gso, i + 1, results),
+                                daemon=True) for i in range(senders)]
+        for blaster in blasters:
+            blaster.start()
+        reports = collect_results(results, blasters + [sink], senders, duration + WORKER_GRACE)
+        elapsed = time.monotonic() - started
+        done.set()
+        reports += collect_results(results, [sink], 1, IDLE_TIMEOUT + WORKER_GRACE)
+        for process in blasters + [sink]:
+            process.join()
+    finally:
+        done.set()
+        if sink.is_alive():
+            sink.terminate()
+    counters_after = read_udp_counters()
+
+    sent = sum(r["sent"] for r in reports if r["role"] == "blaster")
+    sink_report = next(r for r in reports if r["role"] == "sink")
+    received = min(sink_report["received"], sent)
+    return {
+        "duration_s": elapsed,
+        "datagram_size": datagram_size,
+        "senders": senders,
+        "rate_limit_pps": rate,
+        "batched": _libc is not None,
+        "gso": all(r["gso"] for r in reports if r["role"] == "blaster"),
+        "rcvbuf": sink_report["rcvbuf"],
+        "sent": sent,
+        "received": received,
+        "lost": sent - received,
+        "loss_pct": 100.0 * (sent - received) / sent if sent else 0.0,
+        "sent_pps": sent / elapsed if elapsed else 0.0,
+        "received_pps": received / elapsed if elapsed else 0.0,
+        "mbit_per_s": received * datagram_size * 8 / elapsed / 1e6 if elapsed else 0.0,
+        "send_errors": sum(r["send_errors"] for r in reports if r["role"] == "blaster"),
+        "cpu_s": sum(r["cpu_s"] for r in reports),
+        "udp_counters": {name: counters_after[name] - counters_before[name] for name in UDP_COUNTERS},
+    }
+
+
+def format_udp_report(report: Dict[str, Any]) -> List[str]:
+    """Renders a UDP benchmark report as lines."""
+    io = ("sendmmsg/recvmmsg" if report["batched"] else "send/recv") + (" + GSO" if report["gso"] else "")
+    counters = report["udp_counters"]
+    return [
+        f"UDP packets/s        : {report['received_pps']:.0f} received of {report['sent_pps']:.0f} sent "
+        f"({report['datagram_size']} B, {report['senders']} sender(s), {io})",
+        f"UDP loss             : {report['lost']} of {report['sent']} ({report['loss_pct']:.2f}%), "
+        f"{report['mbit_per_s']:.0f} Mbit/s delivered, sink buffer {report['rcvbuf']} B",
+        f"UDP buffer errors    : RcvbufErrors +{counters['RcvbufErrors']}, SndbufErrors +{counters['SndbufErrors']}, "
+        f"InErrors +{counters['InErrors']}",
+    ]
@@ -0,0 +1,27 @@
+import queue
+import time
+from typing import Any, List, Sequence
+
+# Seconds a benchmark worker may take beyond its run time to report back.
+WORKER_GRACE = 10.0
+
+
+def collect_results(results, processes: Sequence[Any], count: int, timeout: float) -> List[Any]:
+    """Reads `count` reports from a multiprocessing queue within `timeout` seconds.
+
+    A worker that crashes never reports, so on timeout every process still running is
+    terminated and TimeoutError is raised instead of blocking forever.
+    """
+    deadline = time.monotonic() + timeout
+    reports = []
+    try:
+        while len(reports) < count:
+            reports.append(results.get(timeout=max(deadline - time.monotonic(), 0.0)))
+    except queue.Empty:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(timeout=1)
+        raise TimeoutError(f"{count - len(reports)} of {count} benchmark workers did not report within {timeout:.0f}s")
+    return reports
@@ -0,0 +1,220 @@
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.network import procfs, sockdiag
+from src.network.procfs import read_net_dev, read_snmp_counters
+from src.network.sockdiag import iter_tcp_sockets
+from src.utils.stats import summarize
+from src.utils.system import run_command
+
+WORKLOAD_HIGH_CHURN = "short_lived_high_churn"
+WORKLOAD_LONG_FAT = "long_fat_flows"
+WORKLOAD_INTERACTIVE = "interactive_low_latency"
+WORKLOAD_MIXED = "mixed"
+
+DEFAULT_THRESHOLDS = {
+    "churn_arrival_rate": 100.0,       # new connections per second
+    "churn_time_wait": 5000,           # sockets in TIME-WAIT
+    "churn_syn_recv": 100,             # half-open connections
+    "churn_max_flow_duration": 2.0,    # seconds
+    "long_min_flow_duration": 30.0,    # seconds
+    "long_min_bytes_per_flow": 10 * 1024 * 1024,
+    "long_min_throughput_mbps": 500.0,
+    "interactive_max_bytes_per_flow": 1024 * 1024,
+    "interactive_max_throughput_mbps": 50.0,
+    "interactive_min_flow_duration": 10.0,
+}
+
+# Applied on top of 'balanced' when no pre-defined profile fits a high-churn host.
+HIGH_CHURN_OVERLAY = {
+    "net.ipv4.tcp_tw_reuse": "1",
+    "net.ipv4.tcp_fin_timeout": "15",
+    "net.ipv4.tcp_max_syn_backlog": "8192",
+    "net.ipv4.tcp_syncookies": "1",
+    "net.ipv4.tcp_fastopen": "3",
+    "net.ipv4.tcp_slow_start_after_idle": "0",
+}
+SYNTHESIZED_HIGH_CHURN = "synthesized_high_churn"
+
+_SS_RTT = re.compile(r"\brtt:([\d.]+)/")
+_SS_BYTES = re.compile(r"\b(bytes_acked|bytes_received):(\d+)")
+
+
+def collect_flow_samples() -> Tuple[List[float], int]:
+    """Returns the RTT (ms) of every established TCP flow and the bytes they moved in total.
+
+    Sockets are streamed from sock_diag and only these aggregates are kept. Falls back to
+    parsing `ss` where netlink is unavailable.
+    """
+    try:
+        rtts, moved = [], 0
+        for entry in iter_tcp_sockets(states=("ESTABLISHED",)):
+            tcp_info = entry.get("tcp_info")
+            if not tcp_info:
+                continue
+            rtts.append(tcp_info.get("rtt", 0) / 1000.0)
+            moved += tcp_info.get("bytes_acked", 0) + tcp_info.get("bytes_received", 0)
+        return rtts, moved
+    except OSError:
+        return _collect_flow_samples_ss()
+
+
+def _collect_flow_samples_ss() -> Tuple[List[float], int]:
+    rtts, moved = [], 0
+    output = run_command("ss -tin state established", suppress_errors=True)
+    for line in output.splitlines():
+        rtt = _SS_RTT.search(line)
+        if not rtt:
+            continue
+        rtts.append(float(rtt.group(1)))
+        moved += sum(int(value) for _, value in _SS_BYTES.findall(line))
+    return rtts, moved
+
+
+def _count_tcp_states() -> Dict[str, int]:
+    try:
+        return sockdiag.count_tcp_states()
+    except OSError:
+        return procfs.count_tcp_states()
+
+
+def _snapshot() -> Dict[str, Any]:
+    counters = read_snmp_counters()
+    tcp = counters.get("Tcp", {})
+    ext = counters.get("TcpExt", {})
+    devices = read_net_dev()
+    return {
+        "time": time.monotonic(),
+        "opens": tcp.get("ActiveOpens", 0) + tcp.get("PassiveOpens", 0),
+        "out_segs": tcp.get("OutSegs", 0),
+        "retrans_segs": tcp.get("RetransSegs", 0),
+        "listen_overflows": ext.get("ListenOverflows", 0) + ext.get("ListenDrops", 0),
+        "bytes": sum(d["rx_bytes"] + d["tx_bytes"] for name, d in devices.items() if name != "lo"),
+        "states": _count_tcp_states(),
+    }
+
+
+class WorkloadSampler:
+    """Samples the host's own TCP traffic over a window and summarizes it as evidence for classification."""
+
+    def __init__(self, window: float = 30.0, sleep: Callable[[float], None] = time.sleep, recorder=None):
+        self.window = window
+        self.sleep = sleep
+        self.recorder = recorder
+
+    def sample(self) -> Dict[str, Any]:
+        start = _snapshot()
+        if self.recorder is not None:
+            self.recorder.record()
+        self.sleep(self.window)
+        end = _snapshot()
+        if self.recorder is not None:
+            self.recorder.record()
+        rtts, flow_bytes = collect_flow_samples()
+        elapsed = max(end["time"] - start["time"], 1e-6)
+
+        opens = end["opens"] - start["opens"]
+        out_segs = end["out_segs"] - start["out_segs"]
+        established = (start["states"]["ESTABLISHED"] + end["states"]["ESTABLISHED"]) / 2.0
+        arrival_rate = opens / elapsed
+        moved = end["bytes"] - start["bytes"]
+        if rtts:
+            bytes_per_flow = flow_bytes / len(rtts)
+        else:
+            bytes_per_flow = moved / opens if opens else 0.0
+
+        return {
+            "window_s": round(elapsed, 1),
+            "arrival_rate": arrival_rate,
+            "established": established,
+            "time_wait": end["states"]["TIME-WAIT"],
+            "syn_recv": end["states"]["SYN-RECV"] + end["states"]["NEW-SYN-RECV"],
+            # Little's law: mean time in system = average population / arrival rate.
+            "mean_flow_duration_s": established / arrival_rate if arrival_rate else float("inf") if established else 0.0,
+            "bytes_per_flow": bytes_per_flow,
+            "throughput_mbps": moved * 8 / elapsed / 1_000_000,
+            "rtt_ms": summarize(rtts),
+            "retrans_rate": (end["retrans_segs"] - start["retrans_segs"]) / out_segs if out_segs else 0.0,
+            "listen_overflows": end["listen_overflows"] - start["listen_overflows"],
+        }
+
+
+def classify_workload(evidence: Dict[str, Any], thresholds: Optional[Dict[str, float]] = None) -> Tuple[str, List[str]]:
+    """Classifies sampled evidence into a workload type. Returns (workload, reasons)."""
+    t = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    duration = evidence["mean_flow_duration_s"]
+    scores = {WORKLOAD_HIGH_CHURN: [], WORKLOAD_LONG_FAT: [], WORKLOAD_INTERACTIVE: []}
+
+    if evidence["arrival_rate"] >= t["churn_arrival_rate"]:
+        scores[WORKLOAD_HIGH_CHURN].append(f"{evidence['arrival_rate']:.0f} new connections/s")
+    if evidence["time_wait"] >= t["churn_time_wait"]:
+        scores[WORKLOAD_HIGH_CHURN].append(f"{evidence['time_wait']} sockets in TIME-WAIT")
+    if evidence["syn_recv"] >= t["churn_syn_recv"] or evidence["listen_overflows"] > 0:
+        scores[WORKLOAD_HIGH_CHURN].append(f"{evidence['syn_recv']} half-open, {evidence['listen_overflows']} listen overflows")
+    if 0 < duration <= t["churn_max_flow_duration"]:
+        scores[WORKLOAD_HIGH_CHURN].append(f"flows last {duration:.2f}s on average")
+
+    if duration >= t["long_min_flow_duration"]:
+        if evidence["bytes_per_flow"] >= t["long_min_bytes_per_flow"]:
+            scores[WORKLOAD_LONG_FAT].append(f"{evidence['bytes_per_flow'] / 1_048_576:.1f} MiB per flow")
+        if evidence["throughput_mbps"] >= t["long_min_throughput_mbps"]:
+            scores[WORKLOAD_LONG_FAT].append(f"{evidence['throughput_mbps']:.0f} Mbit/s sustained")
+
+    if (duration >= t["interactive_min_flow_duration"] and evidence["established"] > 0
+            and evidence["bytes_per_flow"] <= t["interactive_max_bytes_per_flow"]
+            and evidence["throughput_mbps"] <= t["interactive_max_throughput_mbps"]):
+        scores[WORKLOAD_INTERACTIVE].append(
+            f"long-lived flows moving {evidence['bytes_per_flow'] / 1024:.0f} KiB each at {evidence['throughput_mbps']:.1f} Mbit/s"
+        )
+
+    best = max(scores, key=lambda key: len(scores[key]))
+    ranked = sorted(len(reasons) for reasons in scores.values())
+    if not scores[best] or ranked[-1] == ranked[-2]:
+        return WORKLOAD_MIXED, [reason for reasons in scores.values() for reason in reasons] or ["no dominant traffic pattern"]
+    return best, scores[best]
+
+
+def recommend_profile(workload: str, evidence: Dict[str, Any], profiles: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Maps a workload onto a profile key and its data, synthesizing one when no pre-defined profile fits."""
+    if workload == WORKLOAD_HIGH_CHURN:
+        base = profiles.get("balanced", {}).get("settings", {})
+        return SYNTHESIZED_HIGH_CHURN, {
+            "description": "Generated for short-lived, high-churn connections.",
+            "settings": dict(base, **HIGH_CHURN_OVERLAY),
+        }
+    if workload == WORKLOAD_LONG_FAT:
+        key = "ultimate_extreme" if evidence["throughput_mbps"] >= 5000 else "high_speed"
+    elif workload == WORKLOAD_INTERACTIVE:
+        key = "gaming"
+    else:
+        key = "balanced"
+    if key not in profiles:
+        key = "balanced" if "balanced" in profiles else next(iter(profiles))
+    return key, profiles[key]
+
+
+def analyze_workload(profiles: Dict[str, Any], window: float = 30.0, thresholds: Optional[Dict[str, float]] = None,
+                     sampler: Optional[WorkloadSampler] = None) -> Dict[str, Any]:
+    """Samples traffic, classifies it and recommends a profile. Returns a report with the evidence."""
+    evidence = (sampler or WorkloadSampler(window)).sample()
+    workload, reasons = classify_workload(evidence, thresholds)
+    profile_key, profile_data = recommend_profile(workload, evidence, profiles)
+    return {"workload": workload, "reasons": reasons, "profile": profile_key, "profile_data": profile_data, "evidence": evidence}
+
+
+def format_evidence(evidence: Dict[str, Any]) -> List[str]:
+    """Renders sampled evidence as report lines."""
+    rtt = evidence["rtt_ms"]
+    return [
+        f"Sample window        : {evidence['window_s']}s",
+        f"Connection arrivals  : {evidence['arrival_rate']:.1f}/s",
+        f"Established (avg)    : {evidence['established']:.0f}",
+        f"TIME-WAIT / SYN-RECV : {evidence['time_wait']} / {evidence['syn_recv']}",
+        f"Mean flow duration   : {evidence['mean_flow_duration_s']:.2f}s",
+        f"Bytes per flow       : {evidence['bytes_per_flow'] / 1024:.1f} KiB",
+        f"Throughput           : {evidence['throughput_mbps']:.2f} Mbit/s",
+        f"RTT p50/p90/p99      : {rtt['p50']:.2f}/{rtt['p90']:.2f}/{rtt['p99']:.2f} ms ({rtt['count']} flows)",
+        f"Retransmit rate      : {evidence['retrans_rate'] * 100:.3f}%",
+        f"Listen overflows     : {evidence['listen_overflows']}",
+    ]
@@ -0,0 +1,21 @@
+import math
+from typing import Dict, Iterable, Sequence
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Returns the pct-th percentile of an already sorted sequence using linear interpolation."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return float(sorted_values[int(rank)])
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+def summarize(values: Iterable[float], percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, float]:
+    """Returns count, mean and the requested percentiles (as p50, p90, ...) of a set of samples."""
+    ordered = sorted(values)
+    summary = {"count": len(ordered), "mean": sum(ordered) / len(ordered) if ordered else 0.0}
+    for pct in percentiles:
+        summary[f"p{pct:g}"] = percentile(ordered, pct)
+    return summary
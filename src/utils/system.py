@@ -1,13 +1,15 @@
-import subprocess
+from src.network.runner import get_executor
 
-def run_command(cmd, suppress_errors=False):
-    try:
-        result = subprocess.run(
-            cmd, shell=True, check=True, capture_output=True,
-            text=True, encoding='utf-8', timeout=None
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        if suppress_errors:
-            return "Error: Command failed but error was suppressed."
-        return f"Error: {e.stderr}"
+def _output(status, stdout, stderr, suppress_errors):
+    if status == 0:
+        return stdout
+    if suppress_errors:
+        return "Error: Command failed but error was suppressed."
+    return f"Error: {stderr}"
+
+def run_command(cmd, suppress_errors=False, timeout=None, cache=False):
+    return _output(*get_executor().run(cmd, timeout=timeout, cache=cache), suppress_errors)
+
+def run_commands(cmds, suppress_errors=False, timeout=None, cache=False):
+    """Runs commands in order in one shell session and returns their outputs, as run_command would."""
+    return [_output(*result, suppress_errors) for result in get_executor().run_batch(cmds, timeout=timeout, cache=cache)]
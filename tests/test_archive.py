@@ -0,0 +1,105 @@
+import math
+import multiprocessing
+import os
+import pytest
+from unittest.mock import patch
+from src.network.archive import _SEQ, MetricsArchive, MetricsRecorder, parse_duration
+
+METRICS = ["a", "b"]
+TIERS = ((10.0, 6), (60.0, 4))
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "metrics.arc")
+
+def open_writer(path, metrics=METRICS):
+    return MetricsArchive(path, metrics, TIERS, writable=True)
+
+class TestMetricsArchive:
+    def test_file_size_is_fixed_and_samples_are_averaged_per_bucket(self, path):
+        with open_writer(path) as archive:
+            size = os.path.getsize(path)
+            for t, value in ((1000, 1.0), (1005, 3.0), (1012, 10.0)):
+                archive.write({"a": value, "b": -value}, timestamp=t)
+            assert os.path.getsize(path) == size
+            raw = archive.query(990, 1019, tier=0)
+            assert [(r["timestamp"], r["samples"], r["a"]) for r in raw] == [(1000.0, 2, 2.0), (1010.0, 1, 10.0)]
+            minute = archive.query(960, 1019, tier=1)
+            assert minute[0]["a"] == pytest.approx(14 / 3) and minute[0]["b"] == pytest.approx(-14 / 3)
+
+    def test_ring_wraps_and_stale_slots_are_not_returned(self, path):
+        with open_writer(path) as archive:
+            for i in range(10):
+                archive.write({"a": i, "b": 0}, timestamp=1000 + 10 * i)
+            rows = archive.query(1000, 1099, metrics=["a"], tier=0)
+            assert [r["a"] for r in rows] == [4, 5, 6, 7, 8, 9]
+            assert set(rows[0]) == {"timestamp", "samples", "a"}
+
+    def test_survives_reopen_and_rejects_other_layouts(self, path):
+        with open_writer(path) as archive:
+            archive.write({"a": 7}, timestamp=2000)
+        with MetricsArchive(path) as reader:
+            [row] = reader.query(2000, 2009, tier=0)
+            assert row["a"] == 7 and math.isnan(row["b"])
+            with pytest.raises(ValueError):
+                reader.write({"a": 1})
+        with pytest.raises(ValueError):
+            open_writer(path, metrics=["a", "c"])
+
+    def test_pick_tier_uses_finest_tier_that_covers_the_range(self, path):
+        with open_writer(path) as archive:
+            assert archive.pick_tier(1000 - 60, now=1000) == 0
+            assert archive.pick_tier(1000 - 200, now=1000) == 1
+            assert archive.pick_tier(0, now=1000) == 1
+
+def _write_equal_values(path, count):
+    with open_writer(path) as archive:
+        for i in range(count):
+            archive.write({"a": i, "b": i}, timestamp=1000 + (i % 3))
+
+def test_slot_left_odd_by_a_dead_writer_recovers_on_next_write(path):
+    with open_writer(path) as archive:
+        archive.write({"a": 1, "b": 1}, timestamp=1000)
+        position = archive._slot_offset(archive.tiers[0], 100)
+        seq = _SEQ.unpack_from(archive.map, position)[0]
+        _SEQ.pack_into(archive.map, position, seq + 1)      # the writer died between its two stores
+        assert archive.query(1000, 1009, tier=0) == []
+        archive.write({"a": 3, "b": 3}, timestamp=1001)
+        [row] = archive.query(1000, 1009, tier=0)
+        assert row["samples"] == 2 and row["a"] == 2.0
+        archive.write({"a": 5, "b": 5}, timestamp=1002)
+        assert archive.query(1000, 1009, tier=0)[0]["samples"] == 3
+
+def test_unknown_metric_names_are_rejected(path):
+    with open_writer(path) as archive:
+        with pytest.raises(ValueError, match="Available: a, b"):
+            archive.query(1000, 1009, metrics=["a", "foo"], tier=0)
+
+def test_concurrent_reader_never_sees_torn_slots(path):
+    open_writer(path).close()
+    writer = multiprocessing.get_context("fork").Process(target=_write_equal_values, args=(path, 3000))
+    writer.start()
+    with MetricsArchive(path) as reader:
+        while writer.is_alive():
+            for row in reader.query(1000, 1009, tier=0):
+                assert row["a"] == row["b"]
+    writer.join()
+    assert writer.exitcode == 0
+
+@patch("src.network.archive.read_sockstat", return_value={"TCP": {"inuse": 5, "tw": 2, "mem": 9}})
+@patch("src.network.archive.read_net_dev")
+@patch("src.network.archive.read_snmp_counters")
+def test_recorder_writes_rates_after_priming(mock_snmp, mock_dev, mock_sockstat, path):
+    mock_snmp.side_effect = [{"Tcp": {"ActiveOpens": 100}}, {"Tcp": {"ActiveOpens": 160}}]
+    mock_dev.side_effect = [{"lo": {"rx_bytes": 999}, "eth0": {"rx_bytes": 1000}}, {"lo": {"rx_bytes": 0}, "eth0": {"rx_bytes": 4000}}]
+    clock = iter([0.0, 10.0])
+    with MetricsArchive(path, writable=True) as archive:
+        recorder = MetricsRecorder(archive, clock=lambda: next(clock))
+        assert recorder.record(timestamp=5000) is None
+        values = recorder.record(timestamp=5010)
+        assert values["active_opens"] == 6.0 and values["rx_bytes"] == 300.0 and values["tcp_tw"] == 2
+        [row] = archive.query(5010, 5019, metrics=["active_opens", "tcp_inuse"], tier=0)
+        assert row["active_opens"] == 6.0 and row["tcp_inuse"] == 5
+
+def test_parse_duration():
+    assert [parse_duration(text) for text in ("90", "15m", "6h", "7d")] == [90, 900, 21600, 604800]
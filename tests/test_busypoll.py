@@ -0,0 +1,51 @@
+import os
+import pytest
+from src.network.busypoll import build_low_latency_profile, choose_operating_point, pareto_front, sweep_busy_poll
+
+def point(usecs, p99, cpu, budget=None):
+    return {"usecs": usecs, "budget": budget, "p50_us": p99 / 2, "p99_us": p99, "p999_us": p99 * 2,
+            "cpu_cores": cpu, "transactions_per_sec": 1000}
+
+BASELINE = point(0, 100.0, 0.5)
+CURVE = [BASELINE, point(25, 60.0, 0.7), point(50, 50.0, 1.5), point(100, 48.0, 2.5), point(200, 70.0, 3.0)]
+
+class TestOperatingPoint:
+    def test_pareto_front_drops_dominated_points(self):
+        assert [p["usecs"] for p in pareto_front(CURVE)] == [0, 25, 50, 100]
+
+    def test_knee_is_chosen_over_the_lowest_latency(self):
+        assert choose_operating_point(CURVE)["usecs"] == 25
+
+    def test_cpu_limit_and_minimum_gain(self):
+        assert choose_operating_point(CURVE[:1] + CURVE[2:], max_cpu_cores=1.0) is BASELINE
+        assert choose_operating_point([BASELINE, point(50, 97.0, 0.6)]) is BASELINE
+
+    def test_profile_states_cpu_cost(self):
+        profile = build_low_latency_profile(CURVE[1], BASELINE, {"net.ipv4.tcp_low_latency": "1"})
+        assert profile["settings"]["net.core.busy_read"] == "25"
+        assert profile["settings"]["net.core.busy_poll"] == "25"
+        assert "+0.20 CPU cores" in profile["description"]
+        assert set(profile) == {"description", "settings"}
+
+    def test_points_without_a_baseline_are_rejected(self):
+        with pytest.raises(ValueError, match="baseline"):
+            choose_operating_point(CURVE[1:])
+
+def test_sweep_sets_and_restores_sysctls(tmp_path):
+    core = tmp_path / "net" / "core"
+    core.mkdir(parents=True)
+    (core / "busy_read").write_text("0")
+    (core / "busy_poll").write_text("0")
+    seen = []
+
+    def fake_benchmark(duration, busy_poll, budget):
+        seen.append(((core / "busy_read").read_text(), busy_poll, budget))
+        return {"latency_us": {"p50": 10, "p99": 20, "p99.9": 30}, "cpu_cores": 1.0, "transactions_per_sec": 5}
+
+    points = sweep_busy_poll(usecs=(0, 50), budgets=(None, 8), duration=0.1, benchmark=fake_benchmark, proc_root=str(tmp_path))
+    assert seen == [("0", 0, None), ("50", 50, None), ("50", 50, 8)]
+    assert len(points) == 3
+    assert (core / "busy_read").read_text().strip() == "0"
+    seen.clear()
+    sweep_busy_poll(usecs=(50,), budgets=(None,), duration=0.1, benchmark=fake_benchmark, proc_root=str(tmp_path))
+    assert seen == [("0", 0, None), ("50", 50, None)]
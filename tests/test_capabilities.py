@@ -0,0 +1,82 @@
+import os
+import pytest
+from src.network.capabilities import parse_kernel_version, probe_capabilities, resolve_profile
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+def caps(congestion=("cubic", "reno"), qdiscs=("pfifo_fast", "fq_codel"), sysctl=None, version=(6, 1, 0)):
+    return {
+        "kernel_version": version,
+        "congestion_controls": list(congestion),
+        "qdiscs": list(qdiscs) if qdiscs is not None else None,
+        "sysctl": sysctl or {},
+        "features": {"tcp_low_latency_effective": version < (4, 14)},
+    }
+
+class TestProbe:
+    def test_parse_kernel_version(self):
+        assert parse_kernel_version("6.1.0-18-amd64") == (6, 1, 0)
+        assert parse_kernel_version("5.15") == (5, 15, 0)
+
+    def test_probe_reads_procfs_and_modules(self, tmp_path):
+        proc = str(tmp_path / "proc")
+        write(os.path.join(proc, "net/ipv4/tcp_available_congestion_control"), "reno cubic\n")
+        write(os.path.join(proc, "net/core/default_qdisc"), "fq_codel\n")
+        write(os.path.join(proc, "net/ipv4/tcp_fastopen"), "1\n")
+        modules = str(tmp_path / "modules")
+        write(os.path.join(modules, "4.15.0/modules.dep"), "kernel/net/ipv4/tcp_bbr.ko: \nkernel/net/sched/sch_fq.ko.zst: \n")
+        snapshot = probe_capabilities(["net.ipv4.tcp_fastopen", "net.ipv4.tcp_missing"], proc_root=proc, modules_root=modules, release="4.15.0")
+        assert snapshot["congestion_controls"] == ["bbr", "cubic", "reno"]
+        assert "fq" in snapshot["qdiscs"] and "fq_codel" in snapshot["qdiscs"]
+        assert snapshot["sysctl"]["net.ipv4.tcp_fastopen"]["exists"]
+        assert not snapshot["sysctl"]["net.ipv4.tcp_missing"]["exists"]
+        assert snapshot["features"]["bbr"] and not snapshot["features"]["cake"]
+
+    def test_qdiscs_unknown_without_module_info(self, tmp_path):
+        snapshot = probe_capabilities([], proc_root=str(tmp_path), modules_root=str(tmp_path), release="6.1.0",
+                                      modules_file=str(tmp_path / "modules"))
+        assert snapshot["modules"] is None
+        assert snapshot["qdiscs"] is None
+
+    def test_congestion_controls_unknown_when_unreadable(self, tmp_path):
+        (tmp_path / "modules").write_text("tcp_bbr 20480 0 - Live 0x0\n")
+        snapshot = probe_capabilities([], proc_root=str(tmp_path), modules_root=str(tmp_path), release="6.1.0",
+                                      modules_file=str(tmp_path / "modules"))
+        assert snapshot["congestion_controls"] is None
+        resolved, report = resolve_profile({"net.ipv4.tcp_congestion_control": "cubic"}, snapshot)
+        assert resolved == {"net.ipv4.tcp_congestion_control": "cubic"} and report == []
+
+    def test_loaded_modules_add_qdiscs(self, tmp_path):
+        write(str(tmp_path / "net/ipv4/tcp_available_congestion_control"), "reno cubic\n")
+        (tmp_path / "modules").write_text("sch_fq 20480 2 - Live 0x0\ntcp_bbr 20480 0 - Live 0x0\n")
+        snapshot = probe_capabilities([], proc_root=str(tmp_path), modules_root=str(tmp_path), release="6.1.0",
+                                      modules_file=str(tmp_path / "modules"))
+        assert "fq" in snapshot["qdiscs"] and "bbr" in snapshot["congestion_controls"]
+
+class TestResolveProfile:
+    def test_bbr_falls_back_to_cubic(self):
+        resolved, report = resolve_profile({"net.ipv4.tcp_congestion_control": "bbr"}, caps())
+        assert resolved == {"net.ipv4.tcp_congestion_control": "cubic"}
+        assert report[0]["action"] == "substituted"
+
+    def test_profile_fallbacks_override_defaults(self):
+        resolved, _ = resolve_profile({"net.ipv4.tcp_congestion_control": "bbr"}, caps(), {"net.ipv4.tcp_congestion_control": ["reno"]})
+        assert resolved["net.ipv4.tcp_congestion_control"] == "reno"
+
+    def test_missing_and_read_only_keys_are_skipped(self):
+        sysctl = {"a.missing": {"exists": False, "writable": False}, "a.ro": {"exists": True, "writable": False}, "a.ok": {"exists": True, "writable": True}}
+        resolved, report = resolve_profile({"a.missing": "1", "a.ro": "1", "a.ok": "1"}, caps(sysctl=sysctl))
+        assert resolved == {"a.ok": "1"}
+        assert [entry["action"] for entry in report] == ["skipped", "skipped"]
+
+    def test_unknown_qdisc_support_keeps_request(self):
+        resolved, report = resolve_profile({"net.core.default_qdisc": "cake"}, caps(qdiscs=None))
+        assert resolved == {"net.core.default_qdisc": "cake"}
+        assert report == []
+
+    def test_low_latency_flagged_as_ineffective_on_modern_kernels(self):
+        _, report = resolve_profile({"net.ipv4.tcp_low_latency": "1"}, caps())
+        assert report[0]["action"] == "ineffective"
@@ -0,0 +1,76 @@
+import json
+import os
+import pytest
+from src.network.checkpoints import CheckpointStore, checkpoint_before_change
+
+KEYS = ["net.ipv4.tcp_congestion_control", "net.ipv4.tcp_fin_timeout"]
+
+def set_value(proc_root, param, value):
+    path = os.path.join(proc_root, *param.split("."))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(value)
+
+def read_value(proc_root, param):
+    with open(os.path.join(proc_root, *param.split("."))) as f:
+        return f.read()
+
+@pytest.fixture
+def proc_root(tmp_path):
+    root = str(tmp_path / "proc")
+    set_value(root, KEYS[0], "cubic")
+    set_value(root, KEYS[1], "60")
+    return root
+
+@pytest.fixture
+def store(tmp_path, proc_root):
+    return CheckpointStore(root=str(tmp_path / "store"), retention=3, proc_root=proc_root, conf_file=str(tmp_path / "tcp-optimizer.conf"))
+
+class TestCheckpointStore:
+    def test_identical_snapshots_are_deduplicated(self, store):
+        first = store.create(KEYS, "original")
+        again = store.create(KEYS, "again")
+        assert first["id"] == again["id"] == 1
+        assert len(os.listdir(store.objects_dir)) == 1
+
+    def test_rollback_writes_only_differing_keys(self, store, proc_root):
+        store.create(KEYS, "original")
+        set_value(proc_root, KEYS[0], "bbr")
+        store.create(KEYS, "bbr")
+        changes, errors = store.rollback(1)
+        assert changes == {KEYS[0]: ("bbr", "cubic")}
+        assert errors == {}
+        assert read_value(proc_root, KEYS[0]) == "cubic"
+
+    def test_rollback_to_original_removes_config_but_later_ones_persist(self, store, proc_root):
+        store.create(KEYS, "original")
+        set_value(proc_root, KEYS[1], "15")
+        store.create(KEYS, "fast fin")
+        set_value(proc_root, KEYS[1], "30")
+        store.rollback(2)
+        assert "net.ipv4.tcp_fin_timeout = 15" in open(store.conf_file).read()
+        store.rollback(1)
+        assert not os.path.exists(store.conf_file)
+
+    def test_diff_between_checkpoints_and_live(self, store, proc_root):
+        store.create(KEYS, "a")
+        set_value(proc_root, KEYS[1], "15")
+        store.create(KEYS, "b")
+        assert store.diff(1, 2) == {KEYS[1]: ("60", "15")}
+        assert store.diff(2) == {}
+        assert store.diff(1) == {KEYS[1]: ("60", "15")}
+
+    def test_retention_keeps_original_and_newest(self, store, proc_root):
+        for timeout in ["10", "20", "30", "40", "50"]:
+            set_value(proc_root, KEYS[1], timeout)
+            store.create(KEYS, timeout)
+        assert [entry["label"] for entry in store.list()] == ["10", "40", "50"]
+        assert len(os.listdir(store.objects_dir)) == 3
+        assert store.get(1)[KEYS[1]] == "10"
+
+    def test_legacy_backup_is_imported_as_original(self, store, tmp_path):
+        backup = tmp_path / "tcp-optimizer.conf.bak"
+        backup.write_text(json.dumps({KEYS[0]: "reno", KEYS[1]: "60"}))
+        entry = checkpoint_before_change(KEYS, "before gaming", store, str(backup))
+        assert entry["id"] == 2
+        assert store.get(1)[KEYS[0]] == "reno"
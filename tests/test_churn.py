@@ -0,0 +1,18 @@
+import pytest
+from src.network.churn import format_churn_report, run_churn_benchmark
+from src.network.procfs import read_sockstat
+from src.network.sysctl import read_sysctl_values
+
+@pytest.mark.integration
+@pytest.mark.slow
+def test_churn_benchmark_against_local_server():
+    tw_before = read_sockstat().get("TCP", {}).get("tw", 0)
+    limit = int(read_sysctl_values(["net.ipv4.tcp_max_tw_buckets"])["net.ipv4.tcp_max_tw_buckets"] or 0)
+    report = run_churn_benchmark(duration=0.5, workers=1, fastopen=False)
+    assert report["connections"] > 0
+    assert report["errors"] == 0
+    assert report["connections_per_sec"] > 0
+    assert report["connect_latency_ms"]["p99"] >= report["connect_latency_ms"]["p50"] > 0
+    # Every connection leaves one client TIME-WAIT socket, unless the bucket table fills up.
+    assert report["time_wait_towards_server"] >= min(report["connections"], limit - tw_before)
+    assert len(format_churn_report(report)) == 4
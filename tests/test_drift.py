@@ -0,0 +1,77 @@
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+from src.network.drift import DriftDetector, find_overriding_sources, list_sysctl_config_files
+
+def write_proc(root, param, value):
+    path = os.path.join(root, *param.split("."))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(value + "\n")
+
+@pytest.fixture
+def proc_root(tmp_path):
+    root = str(tmp_path / "proc")
+    write_proc(root, "net.ipv4.tcp_congestion_control", "bbr")
+    write_proc(root, "net.ipv4.tcp_rmem", "4096\t87380\t16777216")
+    return root
+
+class TestDriftDetector:
+    def test_no_drift_when_values_match(self, proc_root):
+        detector = DriftDetector({"net.ipv4.tcp_congestion_control": "bbr", "net.ipv4.tcp_rmem": "4096 87380 16777216"}, MagicMock(), proc_root=proc_root)
+        assert detector.check() == []
+        assert detector.metrics["checks"] == 1
+
+    def test_drift_reported_once_with_old_and_new(self, proc_root):
+        detector = DriftDetector({"net.ipv4.tcp_congestion_control": "bbr"}, MagicMock(), proc_root=proc_root)
+        write_proc(proc_root, "net.ipv4.tcp_congestion_control", "cubic")
+        events = detector.check()
+        assert len(events) == 1
+        assert events[0]["key"] == "net.ipv4.tcp_congestion_control"
+        assert events[0]["old"] == "bbr"
+        assert events[0]["new"] == "cubic"
+        assert detector.check() == []
+
+    def test_reapply_policy_restores_only_drifted_keys(self, proc_root):
+        logger = MagicMock()
+        detector = DriftDetector({"net.ipv4.tcp_congestion_control": "bbr", "net.ipv4.tcp_rmem": "4096 87380 16777216"}, logger, policy="reapply", proc_root=proc_root)
+        write_proc(proc_root, "net.ipv4.tcp_congestion_control", "cubic")
+        metrics = detector.run(iterations=1, sleep=lambda _: None)
+        with open(os.path.join(proc_root, "net", "ipv4", "tcp_congestion_control")) as f:
+            assert f.read() == "bbr"
+        assert metrics["drift_events"] == 1
+        assert metrics["reapplied"] == 1
+        assert metrics["keys"] == {"net.ipv4.tcp_congestion_control": 1}
+
+    def test_unknown_policy_rejected(self):
+        with pytest.raises(ValueError):
+            DriftDetector({}, MagicMock(), policy="ignore")
+
+class TestOverridingSources:
+    def test_sources_follow_sysctl_system_order(self, tmp_path):
+        etc = tmp_path / "etc"; lib = tmp_path / "lib"
+        etc.mkdir(); lib.mkdir()
+        (lib / "10-vendor.conf").write_text("net.ipv4.tcp_congestion_control = cubic\n")
+        (lib / "99-shadowed.conf").write_text("net.ipv4.tcp_congestion_control = reno\n")
+        (etc / "99-shadowed.conf").write_text("# nothing here\n")
+        (etc / "50-tuned.conf").write_text("net.ipv4.tcp_congestion_control=htcp\n")
+        (lib / "zz-late.conf").write_text("net.ipv4.tcp_congestion_control = vegas\n")
+        own = etc / "tcp-optimizer.conf"
+        own.write_text("net.ipv4.tcp_congestion_control = bbr\n")
+        main_conf = tmp_path / "sysctl.conf"
+        main_conf.write_text("net.ipv4.tcp_congestion_control = illinois\n")
+        dirs = [str(etc), str(lib)]
+        files = list_sysctl_config_files(dirs, main_conf=str(main_conf))
+        assert [os.path.basename(f) for f in files] == ["10-vendor.conf", "50-tuned.conf", "99-shadowed.conf",
+                                                        "tcp-optimizer.conf", "zz-late.conf", "sysctl.conf"]
+        # Files applied before ours (cubic, htcp) lose to it at boot and are not overriders.
+        sources = find_overriding_sources("net.ipv4.tcp_congestion_control", own_file=str(own), dirs=dirs, main_conf=str(main_conf))
+        assert [s["value"] for s in sources] == ["vegas", "illinois"]
+
+    @patch("src.network.drift.find_overriding_sources", return_value=[{"file": "/etc/sysctl.d/zz-a.conf", "value": "vegas"},
+                                                                    {"file": "/etc/sysctl.conf", "value": "illinois"}])
+    def test_locate_names_the_file_that_sets_the_observed_value(self, mock_sources):
+        logger = MagicMock()
+        detector = DriftDetector({"net.ipv4.tcp_congestion_control": "bbr"}, logger, policy="locate")
+        detector.handle([{"key": "net.ipv4.tcp_congestion_control", "expected": "bbr", "old": "bbr", "new": "vegas", "timestamp": 0}])
+        assert "zz-a.conf" in logger.log.call_args.args[0]
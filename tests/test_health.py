@@ -0,0 +1,58 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from src.network.health import HealthMonitor, find_regressions
+
+BASELINE = {"retrans_rate": 0.2, "listen_drops": 0.0, "rtt_ms": 10.0, "iface_drops": 0.0, "probe_failures": 0}
+
+class TestFindRegressions:
+    def test_noise_within_thresholds_is_ignored(self):
+        current = dict(BASELINE, retrans_rate=0.35, rtt_ms=12.0)
+        assert find_regressions(BASELINE, current) == []
+
+    def test_each_metric_regression_is_reported(self):
+        current = dict(BASELINE, retrans_rate=2.0, rtt_ms=30.0, probe_failures=1)
+        regressions = find_regressions(BASELINE, current)
+        assert [r.split()[0] for r in regressions] == ["retrans_rate", "rtt_ms", "probe_failures"]
+
+    def test_custom_thresholds_override_defaults(self):
+        current = dict(BASELINE, rtt_ms=12.0)
+        assert find_regressions(BASELINE, current, {"rtt_ms": (0.0, 0.5)})
+
+class TestHealthMonitor:
+    @patch("src.network.health.collect_tcp_info", return_value=[{"rtt_ms": 1.0}, {"rtt_ms": 3.0}, {"rtt_ms": 2.0}])
+    @patch("src.network.health._counters")
+    def test_sample_computes_rates_and_runs_probes(self, mock_counters, mock_flows):
+        mock_counters.side_effect = [
+            {"time": 0.0, "out_segs": 1000, "retrans_segs": 10, "listen_drops": 0, "iface_drops": 5},
+            {"time": 10.0, "out_segs": 2000, "retrans_segs": 20, "listen_drops": 20, "iface_drops": 15},
+        ]
+        runner = MagicMock()
+        runner.run_many.return_value = ["ok", "Error: connection refused"]
+        monitor = HealthMonitor(runner, probe_commands=["curl -fs localhost", "pg_isready"], sleep=lambda _: None)
+        sample = monitor.sample(10)
+        assert sample["retrans_rate"] == pytest.approx(1.0)
+        assert sample["listen_drops"] == pytest.approx(2.0)
+        assert sample["iface_drops"] == pytest.approx(1.0)
+        assert sample["rtt_ms"] == 2.0
+        assert sample["probe_failures"] == 1
+
+    @patch("src.network.health._counters")
+    @patch("src.network.health.socket.create_connection", side_effect=ConnectionRefusedError)
+    def test_unreachable_rtt_targets_are_failures_not_zero_rtt(self, mock_connect, mock_counters):
+        mock_counters.return_value = {"time": 0.0, "out_segs": 0, "retrans_segs": 0, "listen_drops": 0, "iface_drops": 0}
+        monitor = HealthMonitor(MagicMock(), rtt_targets=["10.0.0.1:443", "10.0.0.2:443"], sleep=lambda _: None)
+        sample = monitor.sample(10)
+        assert sample["rtt_ms"] is None
+        assert sample["probe_failures"] == 2
+        regressions = find_regressions(BASELINE, sample)
+        assert [r.split()[0] for r in regressions] == ["probe_failures"]
+
+    @patch("src.network.health.collect_tcp_info", return_value=[])
+    @patch("src.network.health._counters")
+    def test_idle_host_has_no_rtt_rather_than_zero(self, mock_counters, mock_flows):
+        mock_counters.return_value = {"time": 0.0, "out_segs": 0, "retrans_segs": 0, "listen_drops": 0, "iface_drops": 0}
+        idle = HealthMonitor(MagicMock(), sleep=lambda _: None).sample(10)
+        assert idle["rtt_ms"] is None and idle["probe_failures"] == 0
+        baseline = dict(BASELINE, rtt_ms=None)
+        assert find_regressions(baseline, dict(BASELINE, rtt_ms=40.0)) == []
+        assert find_regressions(BASELINE, idle) == []
@@ -0,0 +1,22 @@
+import socket
+import pytest
+from src.network.latency import format_latency_report, run_latency_benchmark
+
+@pytest.mark.integration
+@pytest.mark.slow
+def test_latency_benchmark_against_local_echo_server():
+    report = run_latency_benchmark(duration=0.5, clients=1)
+    assert report["transactions"] > 0
+    assert report["errors"] == 0
+    latency = report["latency_us"]
+    assert latency["p99.9"] >= latency["p99"] >= latency["p50"] > 0
+    assert len(format_latency_report(report)) == 3
+
+@pytest.mark.integration
+def test_unreachable_target_is_reported_as_errors():
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+    report = run_latency_benchmark(duration=0.2, clients=2, target=f"127.0.0.1:{port}")
+    assert report["errors"] == 2
+    assert report["transactions"] == 0
@@ -57,7 +57,7 @@ class TestMain:
         mock_init_pair.return_value = MagicMock()
         mock_curs_set.return_value = MagicMock()
         mock_color_pair.return_value = MagicMock()
-        mock_input[1].side_effect = [curses.KEY_DOWN, curses.KEY_DOWN, curses.KEY_DOWN, curses.KEY_DOWN, curses.KEY_ENTER]
+        mock_input[1].side_effect = [curses.KEY_DOWN, curses.KEY_DOWN, curses.KEY_DOWN, curses.KEY_DOWN, curses.KEY_DOWN, curses.KEY_DOWN, curses.KEY_ENTER]
         mock_stdscr.attron = MagicMock()
         mock_stdscr.attroff = MagicMock()
     
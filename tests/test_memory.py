@@ -0,0 +1,56 @@
+import pytest
+from src.network.memory import MIN_SOCKET_BUFFER, check_profile_budget, plan_memory_budget
+
+GIB_KB = 1024 * 1024
+
+def plan_for(ram_gib, connections):
+    return plan_memory_budget(meminfo={"MemTotal": ram_gib * GIB_KB}, sockstat={"TCP": {"inuse": connections, "mem": 100}}, page_size=4096)
+
+class TestMemoryPlanner:
+    def test_tcp_mem_scales_with_ram(self):
+        plan = plan_for(8, 10)
+        low, pressure, high = plan["tcp_mem"]
+        assert high == 8 * 1024 ** 3 // 8 // 4096
+        assert low < pressure < high
+
+    def test_socket_cap_shrinks_with_connection_count(self):
+        assert plan_for(8, 50_000)["socket_max"] < plan_for(8, 100)["socket_max"]
+        assert plan_for(8, 5_000_000)["socket_max"] == MIN_SOCKET_BUFFER
+
+    def test_min_free_kbytes_scales_and_is_capped(self):
+        assert plan_for(8, 10)["min_free_kbytes"] == int(8 * GIB_KB * 0.01)
+        assert plan_for(256, 10)["min_free_kbytes"] == 262144
+
+    def test_unknown_ram_gives_no_plan(self):
+        assert plan_memory_budget(meminfo={}, sockstat={}) is None
+
+    def test_extreme_profile_is_clamped_on_small_edge_box(self):
+        settings = {
+            "net.core.rmem_max": "134217728",
+            "net.ipv4.tcp_rmem": "4096 87380 134217728",
+            "vm.min_free_kbytes": "131072",
+        }
+        plan = plan_for(8, 50_000)
+        clamped, warnings = check_profile_budget(settings, plan)
+        assert len(warnings) == 4
+        assert any("tcp_mem is not set" in warning for warning in warnings)
+        assert clamped["net.core.rmem_max"] == str(plan["socket_max"])
+        assert clamped["net.ipv4.tcp_rmem"].split()[-1] == str(plan["socket_max"])
+        assert clamped["vm.min_free_kbytes"] == str(plan["min_free_kbytes"])
+        assert clamped["net.ipv4.tcp_mem"] == " ".join(str(p) for p in plan["tcp_mem"])
+        assert settings["net.core.rmem_max"] == "134217728"
+
+    def test_profile_within_budget_has_no_warnings(self):
+        plan = plan_for(64, 100)
+        settings = {"net.core.rmem_max": "16777216", "net.ipv4.tcp_mem": " ".join(str(p) for p in plan["tcp_mem"])}
+        clamped, warnings = check_profile_budget(settings, plan)
+        assert warnings == []
+        assert clamped == settings
+
+    def test_every_change_is_reported(self):
+        plan = plan_for(64, 100)
+        settings = {"net.core.rmem_max": "16777216", "vm.min_free_kbytes": "1024"}
+        clamped, warnings = check_profile_budget(settings, plan)
+        changed = {key for key in clamped if clamped[key] != settings.get(key)}
+        assert changed == {"vm.min_free_kbytes", "net.ipv4.tcp_mem"}
+        assert len(warnings) == 2 and "raised" in warnings[0]
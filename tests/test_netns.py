@@ -0,0 +1,93 @@
+import os
+import shutil
+import subprocess
+import time
+import pytest
+from unittest.mock import patch
+from src.network import netns
+
+FIN_TIMEOUT = "net.ipv4.tcp_fin_timeout"
+
+def fake_proc(tmp_path, pids):
+    """Builds a /proc with ns/net links; pids maps pid -> target file standing in for an nsfs inode."""
+    proc = tmp_path / "proc"
+    for pid, target in pids.items():
+        (proc / str(pid) / "ns").mkdir(parents=True)
+        os.symlink(target, proc / str(pid) / "ns" / "net")
+    return str(proc)
+
+class TestListNamespaces:
+    def test_groups_pids_and_names_and_skips_own_namespace(self, tmp_path):
+        own, other = tmp_path / "own", tmp_path / "other"
+        own.write_text("")
+        other.write_text("")
+        run_dir = tmp_path / "netns"
+        run_dir.mkdir()
+        os.symlink(other, run_dir / "blue")
+        proc = fake_proc(tmp_path, {1: own, 10: other, 11: other, "self": own})
+        namespaces = netns.list_namespaces(str(run_dir), proc)
+        assert len(namespaces) == 1
+        assert namespaces[0]["name"] == "blue"
+        assert sorted(namespaces[0]["pids"]) == [10, 11]
+        assert namespaces[0]["path"] == str(run_dir / "blue")
+        assert len(netns.list_namespaces(str(run_dir), proc, include_current=True)) == 2
+
+def test_format_namespace_result():
+    line = netns.format_namespace_result({"id": "net:[1]", "name": "blue", "checkpoint": 2, "changed": ["a"], "errors": {}})
+    assert line == "blue (net:[1]): checkpoint #2, 1 keys written"
+    assert "error: denied" in netns.format_namespace_result({"id": "net:[1]", "name": None, "error": "denied"})
+
+def test_host_global_keys_are_split_off():
+    namespaced, host = netns.split_host_global({FIN_TIMEOUT: "15", "vm.min_free_kbytes": "65536", "fs.file-max": "1"})
+    assert namespaced == {FIN_TIMEOUT: "15"}
+    assert sorted(host) == ["fs.file-max", "vm.min_free_kbytes"]
+
+@patch("src.network.netns.write_sysctl_values", return_value={})
+@patch("src.network.netns.read_sysctl_values", side_effect=lambda keys: {key: "0" for key in keys})
+@patch("src.network.netns.probe_capabilities")
+def test_apply_resolves_inside_the_namespace(mock_probe, mock_read, mock_write, tmp_path):
+    mock_probe.return_value = {
+        "congestion_controls": ["cubic"], "qdiscs": None, "features": {"tcp_low_latency_effective": False},
+        "sysctl": {FIN_TIMEOUT: {"exists": True, "writable": True},
+                   "net.ipv4.tcp_mem": {"exists": False, "writable": False}},
+    }
+    result = netns._apply({"id": "net:[1]"}, {FIN_TIMEOUT: "15", "net.ipv4.tcp_mem": "1 2 3"}, None, "test", str(tmp_path))
+    assert result["changed"] == [FIN_TIMEOUT]
+    assert result["skipped"] == ["net.ipv4.tcp_mem"]
+    mock_write.assert_called_once_with({FIN_TIMEOUT: "15"})
+
+@pytest.mark.skipif(os.geteuid() != 0 or not shutil.which("unshare"), reason="needs root and unshare")
+class TestThrowawayNamespaces:
+    @pytest.fixture
+    def namespace(self):
+        proc = subprocess.Popen(["unshare", "--net", "sleep", "60"])
+        try:
+            for _ in range(50):
+                if os.readlink(f"/proc/{proc.pid}/ns/net") != os.readlink("/proc/self/ns/net"):
+                    break
+                time.sleep(0.05)
+            else:
+                pytest.skip("could not create a network namespace")
+            yield next(ns for ns in netns.list_namespaces() if proc.pid in ns["pids"])
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def read_in(self, namespace):
+        return subprocess.run(["nsenter", f"--net={namespace['path']}", "cat", f"/proc/sys/net/ipv4/tcp_fin_timeout"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+
+    def test_apply_and_revert_leave_host_untouched(self, namespace, tmp_path):
+        host_value = open("/proc/sys/net/ipv4/tcp_fin_timeout").read().strip()
+        original = self.read_in(namespace)
+        target = "17" if original != "17" else "18"
+        min_free = open("/proc/sys/vm/min_free_kbytes").read().strip()
+        settings = {FIN_TIMEOUT: target, "vm.min_free_kbytes": str(int(min_free) + 1024)}
+        [result] = netns.apply_to_namespaces([namespace], settings, root=str(tmp_path))
+        assert result["changed"] == [FIN_TIMEOUT] and not result["errors"]
+        assert open("/proc/sys/vm/min_free_kbytes").read().strip() == min_free
+        assert self.read_in(namespace) == target
+        assert open("/proc/sys/net/ipv4/tcp_fin_timeout").read().strip() == host_value
+        [result] = netns.revert_namespaces([namespace], root=str(tmp_path))
+        assert result["changed"] == [FIN_TIMEOUT]
+        assert self.read_in(namespace) == original
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import uuid
+import pytest
+from src.network import pmtu
+
+class FakeProber(pmtu.PathMTUProber):
+    """A prober over a simulated path: fits up to path_mtu, too-big answers carry an ICMP hint unless black-holed."""
+
+    def __init__(self, path_mtu, route_mtu=9000, icmp=True, reachable=True):
+        self.family = socket.AF_INET
+        self.path_mtu, self._route_mtu, self.icmp, self.reachable = path_mtu, route_mtu, icmp, reachable
+        self.sizes = []
+
+    def route_mtu(self):
+        return self._route_mtu
+
+    def probe(self, mtu):
+        self.sizes.append(mtu)
+        if not self.reachable:
+            return {"fits": None, "hint": None}
+        if mtu <= self.path_mtu:
+            return {"fits": True, "hint": None}
+        return {"fits": False, "hint": self.path_mtu} if self.icmp else {"fits": None, "hint": None}
+
+class TestDiscover:
+    def test_icmp_hint_converges_in_a_few_probes(self):
+        prober = FakeProber(1400)
+        assert prober.discover() == {"path_mtu": 1400, "method": "icmp", "probes": 3}
+
+    def test_black_hole_is_found_by_binary_search(self):
+        prober = FakeProber(1452, icmp=False)
+        result = prober.discover()
+        assert result["path_mtu"] == 1452 and result["method"] == "blackhole"
+        assert result["probes"] < 20
+
+    def test_full_path_and_unreachable_host(self):
+        assert FakeProber(9000).discover()["method"] == "full"
+        assert FakeProber(9000, reachable=False).discover()["method"] == "unreachable"
+
+def result(target, path_mtu, method, interface="eth0", interface_mtu=9000):
+    return {"target": target, "interface": interface, "interface_mtu": interface_mtu, "path_mtu": path_mtu,
+            "method": method, "probes": 3, "family": socket.AF_INET}
+
+class TestRecommend:
+    def test_black_hole_calls_for_probing_and_a_clamp(self):
+        advice = pmtu.recommend_mtu_settings([result("a", 1400, "blackhole"), result("b", 9000, "full")])
+        assert advice["settings"] == {"net.ipv4.tcp_mtu_probing": "2"}
+        assert advice["mss_clamp"] == {"a": 1360}
+        assert any("do not reach a" in note for note in advice["notes"])
+
+    def test_clean_paths_keep_black_hole_fallback(self):
+        advice = pmtu.recommend_mtu_settings([result("a", 1500, "full", interface_mtu=1500)])
+        assert advice["settings"] == {"net.ipv4.tcp_mtu_probing": "1"}
+        assert advice["mss_clamp"] == {}
+        assert any("re-probe to test jumbo" in note for note in advice["notes"])
+
+def _probe_in(namespace, targets, queue):
+    from src.network.netns import enter_namespace
+    enter_namespace(f"/run/netns/{namespace}")
+    queue.put(pmtu.probe_path_mtu(targets, timeout=0.5))
+
+@pytest.mark.skipif(os.geteuid() != 0 or not shutil.which("ip"), reason="needs root and iproute2")
+def test_veth_paths_with_different_mtus():
+    """client --(9000)-- router --(1400)-- server answers with ICMP; client --9000/1400-- peer is a silent black hole."""
+    tag = uuid.uuid4().hex[:6]
+    client, router, server, peer = (f"pm{role}{tag}" for role in "crsp")
+    script = f"""
+    set -e
+    for n in {client} {router} {server} {peer}; do ip netns add $n; ip -n $n link set lo up; done
+    ip link add c0{tag} netns {client} mtu 9000 type veth peer name r0{tag} netns {router} mtu 9000
+    ip link add r1{tag} netns {router} mtu 1400 type veth peer name s0{tag} netns {server} mtu 1400
+    ip link add c1{tag} netns {client} mtu 9000 type veth peer name p0{tag} netns {peer} mtu 1400
+    ip -n {client} addr add 10.201.1.1/24 dev c0{tag}; ip -n {router} addr add 10.201.1.2/24 dev r0{tag}
+    ip -n {router} addr add 10.201.2.1/24 dev r1{tag}; ip -n {server} addr add 10.201.2.2/24 dev s0{tag}
+    ip -n {client} addr add 10.201.3.1/24 dev c1{tag}; ip -n {peer} addr add 10.201.3.2/24 dev p0{tag}
+    for pair in {client}:c0{tag} {client}:c1{tag} {router}:r0{tag} {router}:r1{tag} {server}:s0{tag} {peer}:p0{tag}; do
+        ip -n ${{pair%%:*}} link set ${{pair#*:}} up
+    done
+    ip -n {client} route add 10.201.2.0/24 via 10.201.1.2; ip -n {server} route add default via 10.201.2.1
+    ip netns exec {router} sysctl -qw net.ipv4.ip_forward=1
+    """
+    try:
+        if subprocess.run(["sh", "-c", script], capture_output=True).returncode != 0:
+            pytest.skip("could not build the veth topology")
+        queue = multiprocessing.get_context("fork").Queue()
+        worker = multiprocessing.get_context("fork").Process(target=_probe_in, args=(client, ["10.201.2.2", "10.201.1.2", "10.201.3.2"], queue))
+        worker.start()
+        routed, direct, blackhole = queue.get(timeout=60)
+        worker.join()
+    finally:
+        for namespace in (client, router, server, peer):
+            subprocess.run(["ip", "netns", "del", namespace], capture_output=True)
+    assert (routed["path_mtu"], routed["method"], routed["interface_mtu"]) == (1400, "icmp", 9000)
+    assert (direct["path_mtu"], direct["method"]) == (9000, "full")
+    # veth tolerates a VLAN header's worth of slack before dropping silently.
+    assert 1400 <= blackhole["path_mtu"] <= 1404 and blackhole["method"] == "blackhole"
+    assert pmtu.recommend_mtu_settings([routed, direct, blackhole])["settings"]["net.ipv4.tcp_mtu_probing"] == "2"
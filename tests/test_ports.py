@@ -0,0 +1,123 @@
+import math
+import socket
+import pytest
+from src.network import ports
+from src.network.ports import (
+    FIN_TIMEOUT_KEY, MAX_TW_KEY, PORT_RANGE_KEY, TIMESTAMPS_KEY, TW_REUSE_KEY,
+    parse_port_range, port_hold_time, project_exhaustion, recommend_port_settings, summarize_ports,
+)
+from src.network.procfs import read_sockstat
+from src.network.sysctl import read_sysctl_values
+
+DEFAULTS = {PORT_RANGE_KEY: "32768 60999", MAX_TW_KEY: "262144", TW_REUSE_KEY: "2",
+            FIN_TIMEOUT_KEY: "60", TIMESTAMPS_KEY: "1"}
+
+def sock(state, sport, dst="10.0.0.5", dport=443, expires=0):
+    return {"state": state, "sport": sport, "dst": dst, "dport": dport, "expires": expires}
+
+def proxy_sockets(time_wait=20000, established=3000):
+    """An outbound-heavy proxy: everything to one upstream, TIME-WAIT ages spread over the minute."""
+    entries = [sock("TIME-WAIT", 33000 + i, expires=60000 - (i * 3) % 60000) for i in range(time_wait)]
+    entries += [sock("ESTABLISHED", 55000 + i) for i in range(established)]
+    return entries
+
+class TestProjection:
+    def test_steady_state_below_the_range_never_runs_out(self):
+        p = project_exhaustion(held=100, time_wait=600, rate=10, range_size=28232, hold=60)
+        assert p["seconds_to_exhaustion"] is None
+        assert p["demand"] == 700 and p["max_rate"] == pytest.approx((28232 - 100) / 60)
+
+    def test_time_to_exhaustion_follows_the_filling_time_wait_pool(self):
+        p = project_exhaustion(held=3000, time_wait=20000, rate=500, range_size=28232, hold=60)
+        expected = -60 * math.log((28232 - 3000 - 30000) / (20000 - 30000))
+        assert p["seconds_to_exhaustion"] == pytest.approx(expected)
+        assert p["headroom_pct"] < 0
+        assert project_exhaustion(3000, 25232, 500, 28232, 60)["seconds_to_exhaustion"] == 0.0
+
+    def test_tw_reuse_hold_depends_on_mode_destination_and_timestamps(self):
+        assert port_hold_time("127.0.0.1", DEFAULTS) == ports.TW_REUSE_HOLD
+        assert port_hold_time("10.0.0.5", DEFAULTS) == ports.TIME_WAIT_LEN
+        assert port_hold_time("10.0.0.5", dict(DEFAULTS, **{TW_REUSE_KEY: "1"})) == ports.TW_REUSE_HOLD
+        assert port_hold_time("::1", dict(DEFAULTS, **{TIMESTAMPS_KEY: "0"})) == ports.TIME_WAIT_LEN
+
+def test_unreadable_port_range_is_a_clear_error():
+    assert parse_port_range("32768\t60999") == (32768, 60999)
+    for value in (None, "", "32768"):
+        with pytest.raises(ValueError, match=PORT_RANGE_KEY):
+            parse_port_range(value)
+
+class TestSummary:
+    def test_groups_by_destination_and_skips_listeners_and_other_ports(self):
+        entries = [
+            sock("LISTEN", 45000, dst="0.0.0.0", dport=0),
+            sock("TIME-WAIT", 40000, expires=55000), sock("TIME-WAIT", 40001, expires=5000),
+            sock("ESTABLISHED", 40002), sock("ESTABLISHED", 40000, dst="10.0.0.6"),
+            sock("ESTABLISHED", 8080, dst="192.0.2.1", dport=51000),      # below the range
+            sock("ESTABLISHED", 45000, dst="192.0.2.2", dport=52000),     # accepted on a listener in the range
+        ]
+        report = summarize_ports(entries, DEFAULTS, listening=[8080])
+        assert [(g["dst"], g["ports"], g["time_wait"]) for g in report["destinations"]] == [("10.0.0.5", 3, 2), ("10.0.0.6", 1, 0)]
+        assert report["tw_ages"][10] == 1 and report["tw_ages"][60] == 1
+        assert report["listening"] == [8080, 45000]
+        assert report["time_wait"] == 2 and report["range_size"] == 28232
+
+    def test_rate_uses_the_host_outbound_rate_when_time_wait_understates_it(self):
+        report = summarize_ports(proxy_sockets(600, 100), DEFAULTS, outbound_rate=50)
+        assert report["destinations"][0]["rate"] == 50
+        report = summarize_ports(proxy_sockets(600, 100), DEFAULTS, outbound_rate=0)
+        assert report["destinations"][0]["rate"] == 10
+
+class TestRecommendation:
+    def test_quiet_host_needs_nothing(self):
+        report = summarize_ports(proxy_sockets(600, 100), DEFAULTS, outbound_rate=10)
+        assert recommend_port_settings(report)["settings"] == {}
+
+    def test_outbound_proxy_gets_tw_reuse_and_headroom(self):
+        report = summarize_ports(proxy_sockets(), DEFAULTS, outbound_rate=500)
+        assert report["destinations"][0]["projection"]["seconds_to_exhaustion"] == pytest.approx(44.4, abs=0.5)
+        recommendation = recommend_port_settings(report)
+        overlay = recommendation["settings"]
+        assert overlay[TW_REUSE_KEY] == "1" and overlay[FIN_TIMEOUT_KEY] == "15"
+        assert PORT_RANGE_KEY not in overlay
+        after = recommendation["projected"][("10.0.0.5", 443)]
+        assert after["seconds_to_exhaustion"] is None and after["headroom_pct"] > 50
+        lines = ports.format_port_report(report, recommendation)
+        assert any("10.0.0.5:443" in line and "never" in line for line in lines)
+
+    def test_without_timestamps_the_range_is_widened_and_listeners_flagged(self):
+        settings = dict(DEFAULTS, **{TIMESTAMPS_KEY: "0", MAX_TW_KEY: "32768"})
+        report = summarize_ports(proxy_sockets(), settings, outbound_rate=500, listening=[8080, 40000])
+        recommendation = recommend_port_settings(report)
+        overlay = recommendation["settings"]
+        assert TW_REUSE_KEY not in overlay
+        low, high = (int(v) for v in overlay[PORT_RANGE_KEY].split())
+        assert high == 65535 and low == 1024
+        assert overlay[MAX_TW_KEY] == str(math.ceil(2 * 30000 / 1024) * 1024)
+        assert any("8080" in note and "ip_local_reserved_ports" in note for note in recommendation["notes"])
+        assert any("widest range" in note for note in recommendation["notes"])
+
+@pytest.mark.integration
+def test_analyze_ports_sees_local_time_wait_sockets():
+    limit = int(read_sysctl_values([MAX_TW_KEY])[MAX_TW_KEY] or 0)
+    if read_sockstat().get("TCP", {}).get("tw", 0) + 5 > limit:
+        pytest.skip(f"host TIME-WAIT count is at {MAX_TW_KEY}; new sockets would not enter TIME-WAIT")
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    port = server.getsockname()[1]
+    try:
+        for _ in range(5):
+            client = socket.create_connection(server.getsockname())
+            accepted, _ = server.accept()
+            client.close()
+            accepted.close()
+        try:
+            report = ports.analyze_ports(interval=0)
+        except OSError:
+            pytest.skip("sock_diag unavailable")
+    finally:
+        server.close()
+    group = next((g for g in report["destinations"] if g["dport"] == port), None)
+    assert group is not None, f"no TIME-WAIT sockets towards 127.0.0.1:{port} in {report['destinations']}"
+    assert group["time_wait"] >= 5
+    assert sum(report["tw_ages"].values()) >= 5
@@ -0,0 +1,49 @@
+import pytest
+from src.network.procfs import count_tcp_states, read_cpu_times, read_net_dev, read_snmp_counters, read_sockstat
+
+class TestProcfs:
+    def test_read_snmp_counters_merges_files(self, tmp_path):
+        snmp = tmp_path / "snmp"
+        snmp.write_text("Tcp: ActiveOpens PassiveOpens RetransSegs\nTcp: 10 20 3\nUdp: InDatagrams RcvbufErrors\nUdp: 5 1\n")
+        netstat = tmp_path / "netstat"
+        netstat.write_text("TcpExt: ListenOverflows ListenDrops\nTcpExt: 2 4\n")
+        counters = read_snmp_counters([str(snmp), str(netstat), str(tmp_path / "missing")])
+        assert counters["Tcp"] == {"ActiveOpens": 10, "PassiveOpens": 20, "RetransSegs": 3}
+        assert counters["Udp"]["RcvbufErrors"] == 1
+        assert counters["TcpExt"]["ListenDrops"] == 4
+
+    def test_read_sockstat(self, tmp_path):
+        path = tmp_path / "sockstat"
+        path.write_text("sockets: used 18\nTCP: inuse 4 orphan 0 tw 7 alloc 4 mem 12\n")
+        stats = read_sockstat(str(path))
+        assert stats["TCP"]["tw"] == 7
+        assert stats["sockets"]["used"] == 18
+
+    def test_read_net_dev(self, tmp_path):
+        path = tmp_path / "dev"
+        path.write_text(
+            "Inter-|   Receive |  Transmit\n face |bytes packets|bytes packets\n"
+            "  eth0: 1000 10 0 2 0 0 0 0 2000 20 0 3 0 0 0 0\n"
+        )
+        dev = read_net_dev(str(path))
+        assert dev["eth0"]["rx_bytes"] == 1000
+        assert dev["eth0"]["rx_drop"] == 2
+        assert dev["eth0"]["tx_drop"] == 3
+
+    def test_count_tcp_states(self, tmp_path):
+        path = tmp_path / "tcp"
+        path.write_text(
+            "  sl  local_address rem_address   st tx_queue\n"
+            "   0: 0100007F:BC8F 00000000:0000 0A 00000000:00000000\n"
+            "   1: 0100007F:BC8F 0100007F:1234 01 00000000:00000000\n"
+            "   2: 0100007F:BC8F 0100007F:1235 06 00000000:00000000\n"
+        )
+        counts = count_tcp_states([str(path)])
+        assert counts["LISTEN"] == 1
+        assert counts["ESTABLISHED"] == 1
+        assert counts["TIME-WAIT"] == 1
+
+    def test_read_cpu_times_counts_iowait_as_idle(self, tmp_path):
+        path = tmp_path / "stat"
+        path.write_text("cpu  100 5 50 800 40 3 2 1 0 0\ncpu0 100 5 50 800 40 3 2 1 0 0\n")
+        assert read_cpu_times(str(path)) == {"busy": 161, "total": 1001}
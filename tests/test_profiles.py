@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import patch, mock_open
-from src.config.profiles import load_profiles
+from src.config.profiles import load_profiles, save_profile
 import json 
 
 @pytest.fixture
@@ -48,4 +48,12 @@ class TestProfiles:
     @patch("json.load", side_effect=json.JSONDecodeError("mock error", "doc", 0))
     def test_load_profiles_invalid_json(self, mock_json_load, mock_file):
         profiles = load_profiles()
-        assert profiles is None
\ No newline at end of file
+        assert profiles is None
+
+    def test_save_profile_keeps_other_profiles(self, tmp_path):
+        path = tmp_path / "profiles.json"
+        path.write_text(json.dumps({"balanced": {"description": "b", "settings": {}}}))
+        save_profile("generated", {"description": "g", "settings": {"net.core.busy_read": "50"}}, str(path))
+        profiles = json.loads(path.read_text())
+        assert list(profiles) == ["balanced", "generated"]
+        assert profiles["generated"]["settings"] == {"net.core.busy_read": "50"}
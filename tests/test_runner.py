@@ -0,0 +1,88 @@
+import time
+import pytest
+from unittest.mock import patch
+from src.network.runner import CommandExecutor, CommandRunner, SESSION_ERROR_STATUS, TIMEOUT_STATUS, ShellSession, execute
+
+@pytest.fixture
+def executor():
+    executor = CommandExecutor(max_workers=4, cache_ttl=60)
+    yield executor
+    executor.close()
+
+class TestExecute:
+    def test_failure_and_timeout_are_results_not_exceptions(self):
+        assert execute("echo out; echo err >&2; exit 3") == (3, "out\n", "err\n")
+        status, _, stderr = execute("sleep 5", timeout=0.2)
+        assert status == TIMEOUT_STATUS and "timed out" in stderr
+
+class TestShellSession:
+    def test_batch_frames_output_status_and_stderr(self, executor):
+        results = executor.run_batch(["echo hi", "printf no-newline", "echo oops >&2; exit 4", "cd /; exit 1", "pwd"])
+        assert results[:3] == [(0, "hi\n", ""), (0, "no-newline", ""), (4, "", "oops\n")]
+        assert results[3][0] == 1
+        assert results[4][1] != "/\n"
+
+    def test_overrun_kills_session_and_next_command_gets_a_fresh_one(self, executor):
+        results = executor.run_batch(["sleep 5", "echo next"], timeout=0.2)
+        assert results[0][0] == TIMEOUT_STATUS
+        assert results[1] == (0, "next\n", "")
+
+    def test_unbalanced_quoting_cannot_break_the_framing(self):
+        session = ShellSession()
+        try:
+            start = time.monotonic()
+            results = session.run_batch(["echo 'unterminated", 'echo "also', "echo next"])
+            assert time.monotonic() - start < 5
+            assert [status for status, _, _ in results[:2]] != [TIMEOUT_STATUS, TIMEOUT_STATUS]
+            assert all(status not in (0, TIMEOUT_STATUS) for status, _, _ in results[:2])
+            assert results[2] == (0, "next\n", "")
+        finally:
+            session.close()
+
+    def test_lost_framing_is_reported_and_the_session_respawned(self):
+        session = ShellSession()
+        try:
+            session.run_batch(["true"])
+            first = session.process.pid
+            with patch.object(session, "_read_until", return_value=b"garbage"):
+                status, _, stderr = session.run_batch(["echo hi"])[0]
+            assert status == SESSION_ERROR_STATUS and "framing" in stderr
+            assert session.run_batch(["echo hi"]) == [(0, "hi\n", "")]
+            assert session.process.pid != first
+        finally:
+            session.close()
+
+    def test_commands_past_the_batch_deadline_are_not_started(self, executor):
+        results = executor.run_batch(["sleep 0.3", "echo late"], deadline=time.monotonic() + 0.1)
+        assert [status for status, _, _ in results] == [TIMEOUT_STATUS, TIMEOUT_STATUS]
+
+class TestCommandExecutor:
+    def test_run_many_runs_concurrently_within_overall_deadline(self, executor):
+        start = time.monotonic()
+        results = executor.run_many(["sleep 0.3; echo a", "sleep 0.3; echo b", "sleep 5"], timeout=2, overall_timeout=0.6)
+        assert time.monotonic() - start < 1.5
+        assert results[0] == (0, "a\n", "") and results[1] == (0, "b\n", "")
+        assert results[2][0] == TIMEOUT_STATUS
+
+    def test_single_commands_run_in_a_session_without_spawning_a_shell(self, executor):
+        with patch("src.network.runner.subprocess.run") as one_shot:
+            assert executor.run("echo $$") == executor.run("echo $$")
+            assert executor.run_batch(["echo a", "echo b"]) == [(0, "a\n", ""), (0, "b\n", "")]
+        one_shot.assert_not_called()
+
+    def test_cache_reuses_successful_results_until_ttl(self):
+        now = [0.0]
+        executor = CommandExecutor(cache_ttl=10, clock=lambda: now[0])
+        first = executor.run("date +%N", cache=True)
+        assert executor.run("date +%N", cache=True) == first
+        now[0] = 11.0
+        assert executor.run("date +%N", cache=True) != first
+
+class TestCommandRunner:
+    def test_outputs_are_stripped_and_errors_prefixed(self, executor):
+        runner = CommandRunner(executor)
+        assert runner.run_command("echo '  hi  '") == "hi"
+        assert runner.run_command("echo bad >&2; false") == "Error: bad"
+        assert runner.run_command("false", suppress_errors=True) == ""
+        assert runner.run_command("sleep 5", timeout=0.2).startswith("Error: Command timed out")
+        assert runner.run_many(["echo a", "echo b"]) == ["a", "b"]
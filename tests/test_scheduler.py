@@ -0,0 +1,196 @@
+import json
+import logging
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from src.network.scheduler import LoadSampler, ProfileScheduler, RulesEngine, in_window, parse_condition
+from src.network.sysctl import write_sysctl_values
+
+NIGHT = time.struct_time((2026, 1, 5, 23, 30, 0, 0, 5, 0))     # Monday 23:30
+DAY = time.struct_time((2026, 1, 5, 14, 0, 0, 0, 5, 0))        # Monday 14:00
+SATURDAY = time.struct_time((2026, 1, 10, 14, 0, 0, 5, 10, 0))
+
+BULK = {"name": "bulk", "profile": "high_speed", "when": {"throughput_mbps": ">= 500"}, "window": "22:00-06:00"}
+LOSSY = {"name": "lossy", "profile": "gaming", "when": {"rtt_ms": ">= 50", "retrans_rate": "> 1"}}
+
+def load(throughput=0.0, conn_rate=0.0, rtt_ms=1.0, retrans_rate=0.0):
+    return {"throughput_mbps": throughput, "conn_rate": conn_rate, "rtt_ms": rtt_ms, "retrans_rate": retrans_rate}
+
+def test_parse_condition():
+    assert parse_condition(">= 500") == (">=", 500.0)
+    assert parse_condition("<0.5") == ("<", 0.5)
+    with pytest.raises(ValueError):
+        parse_condition("~ 3")
+
+def test_windows_wrap_midnight_and_filter_days():
+    assert in_window(BULK, NIGHT)
+    assert in_window(BULK, time.struct_time((2026, 1, 6, 5, 59, 0, 1, 6, 0)))
+    assert not in_window(BULK, DAY)
+    weekend = {"days": ["sat", "Sunday"]}
+    assert in_window(weekend, SATURDAY) and not in_window(weekend, DAY)
+
+class TestRulesEngine:
+    def test_rule_needs_consecutive_matches_and_hysteresis_holds_it(self):
+        engine = RulesEngine([BULK], "balanced", enter_samples=2, exit_samples=2, hysteresis=0.2)
+        assert engine.evaluate(load(600), NIGHT)["profile"] == "balanced"
+        assert engine.evaluate(load(600), NIGHT)["profile"] == "high_speed"
+        # 450 is below the threshold but inside the 20% band, so the rule holds indefinitely.
+        for _ in range(5):
+            assert engine.evaluate(load(450), NIGHT)["rule"] == "bulk"
+        assert engine.evaluate(load(100), NIGHT)["profile"] == "high_speed"
+        assert engine.evaluate(load(100), NIGHT) == {"profile": "balanced", "rule": None, "reason": "no rule active"}
+
+    def test_leaving_the_window_releases_at_once(self):
+        engine = RulesEngine([BULK], "balanced", enter_samples=1)
+        assert engine.evaluate(load(600), NIGHT)["profile"] == "high_speed"
+        assert engine.evaluate(load(600), DAY)["profile"] == "balanced"
+
+    def test_all_conditions_must_hold_and_unknown_metrics_are_rejected(self):
+        engine = RulesEngine([LOSSY], "balanced", enter_samples=1)
+        assert engine.evaluate(load(rtt_ms=80), DAY)["profile"] == "balanced"
+        decision = engine.evaluate(load(rtt_ms=80, retrans_rate=2), DAY)
+        assert decision["profile"] == "gaming" and "rtt_ms >= 50" in decision["reason"]
+        with pytest.raises(ValueError):
+            RulesEngine([{"name": "x", "profile": "gaming", "when": {"cpu": "> 1"}}], "balanced")
+
+    def test_unmeasured_rtt_matches_no_condition(self):
+        engine = RulesEngine([{"name": "fast", "profile": "gaming", "when": {"rtt_ms": "<= 5"}}], "balanced", enter_samples=1)
+        assert engine.evaluate(load(rtt_ms=None), DAY)["profile"] == "balanced"
+        assert engine.evaluate(load(rtt_ms=2.0), DAY)["profile"] == "gaming"
+
+    @pytest.mark.parametrize("bad", [{"window": "22-06"}, {"window": "25:00-06:00"}, {"days": ["someday"]}])
+    def test_malformed_windows_and_days_are_rejected_up_front(self, bad):
+        with pytest.raises(ValueError):
+            RulesEngine([dict(BULK, **bad)], "balanced")
+
+class FakeSampler:
+    def __init__(self, samples):
+        self.samples = list(samples)
+
+    def sample(self):
+        sample = self.samples.pop(0)
+        if isinstance(sample, Exception):
+            raise sample
+        return sample
+
+class TestProfileScheduler:
+    PROFILES = {
+        "balanced": {"settings": {"net.core.somaxconn": "4096", "net.ipv4.tcp_congestion_control": "cubic"}},
+        "high_speed": {"settings": {"net.core.somaxconn": "4096", "net.ipv4.tcp_congestion_control": "bbr"}},
+    }
+
+    def make(self, tmp_path, samples, clock, profiles=None, **kwargs):
+        proc_root = tmp_path / "sys"
+        for key, value in (("net.core.somaxconn", "4096"), ("net.ipv4.tcp_congestion_control", "reno")):
+            path = proc_root / key.replace(".", "/")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(value + "\n")
+        engine = RulesEngine([BULK], "balanced", enter_samples=1, exit_samples=1, hysteresis=0.0)
+        return ProfileScheduler(profiles or self.PROFILES, engine, MagicMock(), sampler=FakeSampler(samples),
+                                audit_log=str(tmp_path / "audit.jsonl"), proc_root=str(proc_root),
+                                conf_file=str(tmp_path / "tcp.conf"), clock=clock, **kwargs)
+
+    def read_audit(self, tmp_path):
+        with open(tmp_path / "audit.jsonl") as f:
+            return [json.loads(line) for line in f]
+
+    def test_switches_write_only_differing_keys_and_are_audited(self, tmp_path):
+        now = [time.mktime(NIGHT)]
+        scheduler = self.make(tmp_path, [None, load(10), load(900)], lambda: now[0], min_dwell=0)
+        with patch("src.network.scheduler.write_sysctl_values", wraps=write_sysctl_values) as writes:
+            assert scheduler.tick() is None
+            first = scheduler.tick()
+            second = scheduler.tick()
+        assert first["to"] == "balanced" and first["changed"] == ["net.ipv4.tcp_congestion_control"]
+        assert writes.call_args_list[0].args[0] == {"net.ipv4.tcp_congestion_control": "cubic"}
+        assert second["from"] == "balanced" and second["to"] == "high_speed" and second["rule"] == "bulk"
+        assert second["metrics"]["throughput_mbps"] == 900
+        assert (tmp_path / "sys/net/ipv4/tcp_congestion_control").read_text().strip() == "bbr"
+        assert "net.ipv4.tcp_congestion_control = bbr" in (tmp_path / "tcp.conf").read_text()
+        assert [e["to"] for e in self.read_audit(tmp_path)] == ["balanced", "high_speed"]
+
+    def test_rate_limit_holds_the_current_profile(self, tmp_path):
+        now = [time.mktime(NIGHT)]
+        samples = [None, load(900), load(10), load(10), load(900), load(900)]
+        scheduler = self.make(tmp_path, samples, lambda: now[0], min_dwell=60, max_switches_per_hour=2)
+        scheduler.tick()
+        assert scheduler.tick()["applied"]
+        held = scheduler.tick()
+        assert not held["applied"] and "dwell" in held["suppressed_by"] and scheduler.current == "high_speed"
+        now[0] += 120
+        assert scheduler.tick()["applied"] and scheduler.current == "balanced"
+        now[0] += 120
+        held = scheduler.tick()
+        assert not held["applied"] and "last hour" in held["suppressed_by"]
+        now[0] += 3600
+        assert scheduler.tick()["applied"]
+        assert [e["applied"] for e in self.read_audit(tmp_path)] == [True, False, True, False, True]
+
+    def test_repeated_suppression_is_recorded_once(self, tmp_path):
+        now = [time.mktime(NIGHT)]
+        samples = [None, load(900), load(10), load(10), load(10), load(10)]
+        scheduler = self.make(tmp_path, samples, lambda: now[0], min_dwell=600)
+        scheduler.tick()
+        assert scheduler.tick()["applied"]
+        assert not scheduler.tick()["applied"]
+        now[0] += 30
+        assert scheduler.tick() is None and scheduler.tick() is None
+        now[0] += 600
+        assert scheduler.tick()["applied"]
+        assert [e["applied"] for e in self.read_audit(tmp_path)] == [True, False, True]
+        warnings = [call for call in scheduler.logger.log.call_args_list if call.kwargs.get("level") == logging.WARNING]
+        assert len(warnings) == 1
+
+    def test_switch_restores_keys_the_new_profile_does_not_manage(self, tmp_path):
+        profiles = {
+            "balanced": {"settings": {"net.ipv4.tcp_congestion_control": "cubic"}},
+            "high_speed": {"settings": {"net.core.somaxconn": "8192", "net.ipv4.tcp_congestion_control": "bbr"}},
+        }
+        scheduler = self.make(tmp_path, [], time.time, profiles=profiles)
+        assert scheduler.switch("high_speed")[0] == ["net.core.somaxconn", "net.ipv4.tcp_congestion_control"]
+        scheduler.current = "high_speed"
+        assert scheduler.switch("balanced")[0] == ["net.core.somaxconn", "net.ipv4.tcp_congestion_control"]
+        assert (tmp_path / "sys/net/core/somaxconn").read_text().strip() == "4096"
+        assert "somaxconn" not in (tmp_path / "tcp.conf").read_text()
+
+    def test_switch_leaves_keys_without_a_baseline_value(self, tmp_path):
+        profiles = {
+            "balanced": {"settings": {"net.ipv4.tcp_congestion_control": "cubic"}},
+            "high_speed": {"settings": {"net.core.somaxconn": "8192", "net.ipv4.tcp_congestion_control": "bbr"}},
+        }
+        scheduler = self.make(tmp_path, [], time.time, profiles=profiles, baseline={"net.core.somaxconn": None})
+        scheduler.switch("high_speed")
+        scheduler.current = "high_speed"
+        assert scheduler.switch("balanced")[0] == ["net.ipv4.tcp_congestion_control"]
+        assert (tmp_path / "sys/net/core/somaxconn").read_text().strip() == "8192"
+
+    def test_failed_ticks_are_logged_and_the_loop_continues(self, tmp_path):
+        now = [time.mktime(NIGHT)]
+        scheduler = self.make(tmp_path, [None, OSError("no /proc/net/snmp"), load(900)], lambda: now[0], min_dwell=0)
+        scheduler.audit_log = str(tmp_path / "audit.jsonl" / "not-a-dir" / "audit.jsonl")
+        (tmp_path / "audit.jsonl").write_text("")
+        scheduler.run(interval=0, iterations=3, sleep=lambda _: None)
+        assert scheduler.current == "high_speed"
+        errors = [call.args[0] for call in scheduler.logger.log.call_args_list if call.kwargs.get("level") == logging.ERROR]
+        assert any("tick failed" in e for e in errors) and any("audit log" in e for e in errors)
+
+    def test_unknown_profile_is_rejected(self, tmp_path):
+        engine = RulesEngine([dict(BULK, profile="missing")], "balanced")
+        with pytest.raises(ValueError):
+            ProfileScheduler(self.PROFILES, engine, MagicMock())
+
+def test_load_sampler_turns_counters_into_rates():
+    snmp = [{"Tcp": {"ActiveOpens": 10, "PassiveOpens": 0, "OutSegs": 1000, "RetransSegs": 0}},
+            {"Tcp": {"ActiveOpens": 30, "PassiveOpens": 20, "OutSegs": 2000, "RetransSegs": 50}}]
+    dev = [{"lo": {"rx_bytes": 0, "tx_bytes": 0}, "eth0": {"rx_bytes": 0, "tx_bytes": 0}},
+           {"lo": {"rx_bytes": 10**9, "tx_bytes": 0}, "eth0": {"rx_bytes": 125_000_000, "tx_bytes": 125_000_000}}]
+    clock = iter([0.0, 10.0])
+    sampler = LoadSampler(clock=lambda: next(clock))
+    with patch("src.network.scheduler.read_snmp_counters", side_effect=snmp), \
+            patch("src.network.scheduler.read_net_dev", side_effect=dev), \
+            patch("src.network.scheduler.collect_tcp_info", return_value=[{"rtt_ms": 2.0}, {"rtt_ms": 40.0}, {"rtt_ms": 5.0}]):
+        assert sampler.sample() is None
+        metrics = sampler.sample()
+    assert metrics == {"throughput_mbps": 200.0, "conn_rate": 4.0, "rtt_ms": 5.0, "retrans_rate": 5.0}
+    with patch("src.network.scheduler.collect_tcp_info", return_value=[]):
+        assert LoadSampler._rtt_ms() is None
@@ -0,0 +1,104 @@
+import logging
+import pytest
+from unittest.mock import MagicMock, patch
+from src.app.service import TCPService
+from src.network import ports
+from src.network.archive import MetricsArchive
+
+HEALTHY = {"timestamp": 0.0, "retrans_rate": 0.1, "listen_drops": 0.0, "rtt_ms": 5.0, "iface_drops": 0.0, "probe_failures": 0}
+
+@pytest.fixture
+def service():
+    config_loader = MagicMock()
+    config_loader.load_config.return_value = {"web": {"settings": {"net.core.somaxconn": "4096"}}}
+    tuning_manager = MagicMock()
+    tuning_manager.backup_settings.return_value = {"id": 7}
+    tuning_manager.checkpoints.rollback.return_value = ({"net.core.somaxconn": ("4096", "128")}, {})
+    svc = TCPService(config_loader, MagicMock(), tuning_manager, MagicMock(), MagicMock(), MagicMock())
+    with patch.object(svc, "_plan_settings", return_value={"net.core.somaxconn": "4096"}):
+        yield svc
+
+class TestCanaryApply:
+    @patch("src.app.service.HealthMonitor")
+    def test_soak_error_rolls_back_and_reraises(self, mock_monitor, service):
+        mock_monitor.return_value.sample.side_effect = [HEALTHY, KeyboardInterrupt()]
+        with pytest.raises(KeyboardInterrupt):
+            service.canary_apply("web", {}, baseline_window=1, soak_period=3, interval=1)
+        service.tuning_manager.apply_settings.assert_called_once()
+        service.tuning_manager.checkpoints.rollback.assert_called_once_with(7)
+
+    @patch("src.app.service.HealthMonitor")
+    def test_unreachable_rtt_target_rolls_back(self, mock_monitor, service):
+        mock_monitor.return_value.sample.side_effect = [HEALTHY, dict(HEALTHY, rtt_ms=None, probe_failures=1)]
+        result = service.canary_apply("web", {}, baseline_window=1, soak_period=3, interval=1)
+        assert result["outcome"] == "rolled_back"
+        service.tuning_manager.checkpoints.rollback.assert_called_once_with(7)
+
+class TestRecorderLifetime:
+    @patch("src.app.service.DriftDetector")
+    def test_watch_closes_the_archive_even_when_the_detector_fails(self, mock_detector, service):
+        mock_detector.return_value.run.side_effect = KeyboardInterrupt()
+        recorder = MagicMock()
+        with patch.object(service, "_open_recorder", return_value=recorder), pytest.raises(KeyboardInterrupt):
+            service.watch_for_drift("web", {}, iterations=1)
+        recorder.archive.close.assert_called_once()
+
+class TestTuneBusyPoll:
+    @patch("src.app.service.save_profile")
+    @patch("src.app.service.sweep_busy_poll", return_value=[
+        {"usecs": 0, "budget": None, "p50_us": 50.0, "p99_us": 100.0, "p999_us": 200.0, "cpu_cores": 0.5, "transactions_per_sec": 1000},
+        {"usecs": 50, "budget": None, "p50_us": 30.0, "p99_us": 60.0, "p999_us": 120.0, "cpu_cores": 0.8, "transactions_per_sec": 1500},
+    ])
+    def test_loopback_sweeps_are_never_saved(self, mock_sweep, mock_save, service):
+        service.tune_busy_poll({}, save=True)
+        service.tune_busy_poll({}, save=True, target="127.0.0.1:7000")
+        mock_save.assert_not_called()
+        service.tune_busy_poll({}, save=True, target="10.0.0.5:7000")
+        mock_save.assert_called_once()
+
+class TestAnalyzeEphemeralPorts:
+    @patch("src.network.ports.iter_tcp_sockets", return_value=iter([]))
+    @patch("src.network.ports.read_snmp_counters", return_value={"Tcp": {"ActiveOpens": 0}})
+    @patch("src.network.ports.read_sysctl_values", return_value={key: None for key in ports.PORT_KEYS})
+    def test_unreadable_port_range_is_logged(self, mock_values, mock_snmp, mock_sockets, service):
+        assert service.analyze_ephemeral_ports({}, interval=0) is None
+        assert "net.ipv4.ip_local_port_range" in service.logger.log.call_args.args[0]
+
+class TestPlanSettings:
+    @patch("src.app.service.get_capabilities", return_value={})
+    @patch("src.app.service.resolve_profile", side_effect=lambda settings, caps, fallbacks: (settings, []))
+    @patch("src.app.service.plan_memory_budget", return_value=None)
+    def test_unreadable_meminfo_skips_clamping(self, mock_plan, mock_resolve, mock_caps):
+        svc = TCPService(MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        settings = svc._plan_settings("web", {"web": {"settings": {"vm.min_free_kbytes": "65536"}}})
+        assert settings == {"vm.min_free_kbytes": "65536"}
+        assert "net.ipv4.tcp_mem" not in settings
+        assert svc.logger.log.call_args_list[0].kwargs["level"] == logging.WARNING
+
+class TestManagedKeys:
+    @patch("src.app.service.read_sysctl_config", return_value={"net.ipv4.ip_local_port_range": "1024 65535"})
+    def test_checkpoints_cover_every_managed_key(self, mock_conf):
+        svc = TCPService(MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        config = {"web": {"settings": {"net.core.somaxconn": "4096"}},
+                  "bulk": {"settings": {"net.ipv4.tcp_congestion_control": "bbr"}},
+                  "rtt_targets": ["10.0.0.1:443"]}
+        assert svc._managed_keys({"net.ipv4.tcp_mem": "1 2 3"}, config) == [
+            "net.core.somaxconn", "net.ipv4.ip_local_port_range", "net.ipv4.tcp_congestion_control", "net.ipv4.tcp_mem"]
+
+    @patch("src.app.service.HealthMonitor")
+    def test_canary_checkpoint_includes_other_profiles_keys(self, mock_monitor, service):
+        service.config_loader.load_config.return_value["bulk"] = {"settings": {"net.ipv4.tcp_congestion_control": "bbr"}}
+        mock_monitor.return_value.sample.return_value = HEALTHY
+        service.canary_apply("web", {}, baseline_window=1, soak_period=1, interval=1)
+        keys = service.tuning_manager.backup_settings.call_args.args[0]
+        assert {"net.core.somaxconn", "net.ipv4.tcp_congestion_control"} <= set(keys)
+
+class TestQueryMetrics:
+    def test_unknown_metric_is_logged_with_the_available_ones(self, tmp_path):
+        path = str(tmp_path / "metrics.arc")
+        MetricsArchive(path, ["a", "b"], ((10.0, 6),), writable=True).close()
+        svc = TCPService(MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        svc.config_loader.load_config.return_value = {"metrics_archive": path}
+        assert svc.query_metrics({}, 0, 10, ["foo"]) is None
+        message = svc.logger.log.call_args.args[0]
+        assert "foo" in message and "a, b" in message
@@ -0,0 +1,76 @@
+import socket
+import struct
+import pytest
+from src.network.sockdiag import (
+    INET_DIAG_BC_D_GE,
+    INET_DIAG_BC_D_LE,
+    INET_DIAG_BC_S_GE,
+    INET_DIAG_BC_S_LE,
+    INET_DIAG_INFO,
+    build_port_bytecode,
+    build_request,
+    decode_diag_msg,
+    iter_tcp_sockets,
+    state_mask,
+)
+
+def netlink_available():
+    try:
+        socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, 4).close()
+        return True
+    except (OSError, AttributeError):
+        return False
+
+class TestBytecode:
+    def test_single_port_is_an_inclusive_range(self):
+        code = build_port_bytecode(sport=8080)
+        ops = list(struct.iter_unpack("=BBH", code))
+        assert ops == [(INET_DIAG_BC_S_GE, 8, 20), (0, 0, 8080), (INET_DIAG_BC_S_LE, 8, 12), (0, 0, 8080)]
+
+    def test_sport_and_dport_are_chained(self):
+        code = build_port_bytecode(sport=(1000, 2000), dport=443)
+        ops = [op[0] for op in struct.iter_unpack("=BBH", code)][::2]
+        assert ops == [INET_DIAG_BC_S_GE, INET_DIAG_BC_S_LE, INET_DIAG_BC_D_GE, INET_DIAG_BC_D_LE]
+
+    def test_no_filter_means_no_bytecode(self):
+        assert build_port_bytecode() == b""
+        assert len(build_request(socket.AF_INET, state_mask(["LISTEN"]))) == 16 + 56
+
+class TestDecode:
+    def test_decode_diag_msg_with_tcp_info(self):
+        head = struct.pack("=BBBB", socket.AF_INET, 1, 0, 0)
+        sockid = struct.pack(">HH", 443, 51000) + socket.inet_aton("10.0.0.1") + bytes(12) + socket.inet_aton("10.0.0.2") + bytes(12) + bytes(12)
+        tail = struct.pack("=IIIII", 0, 0, 0, 1000, 4242)
+        tcp_info = bytearray(112)
+        struct.pack_into("=I", tcp_info, 68, 1500)
+        struct.pack_into("=I", tcp_info, 80, 42)
+        struct.pack_into("=I", tcp_info, 100, 7)
+        struct.pack_into("=Q", tcp_info, 104, 125000)
+        attr = struct.pack("=HH", 4 + len(tcp_info), INET_DIAG_INFO) + bytes(tcp_info)
+        payload = memoryview(head + sockid + tail + attr)
+        entry = decode_diag_msg(payload, 0, len(payload))
+        assert (entry["src"], entry["sport"], entry["dst"], entry["dport"]) == ("10.0.0.1", 443, "10.0.0.2", 51000)
+        assert entry["state"] == "ESTABLISHED"
+        assert entry["inode"] == 4242
+        assert entry["tcp_info"]["rtt"] == 1500
+        assert entry["tcp_info"]["snd_cwnd"] == 42
+        assert entry["tcp_info"]["total_retrans"] == 7
+        assert entry["tcp_info"]["pacing_rate"] == 125000
+        assert "bytes_acked" not in entry["tcp_info"]
+
+@pytest.mark.integration
+@pytest.mark.skipif(not netlink_available(), reason="NETLINK_SOCK_DIAG not available")
+def test_kernel_filters_by_port_and_state():
+    server = socket.socket(); server.bind(("127.0.0.1", 0)); server.listen()
+    port = server.getsockname()[1]
+    client = socket.create_connection(("127.0.0.1", port))
+    accepted, _ = server.accept()
+    try:
+        listening = list(iter_tcp_sockets(states=["LISTEN"], sport=port, families=[socket.AF_INET], info=False))
+        assert [(e["state"], e["sport"]) for e in listening] == [("LISTEN", port)]
+        established = list(iter_tcp_sockets(states=["ESTABLISHED"], dport=port, families=[socket.AF_INET]))
+        assert len(established) == 1
+        assert established[0]["sport"] == client.getsockname()[1]
+        assert "rtt" in established[0]["tcp_info"]
+    finally:
+        accepted.close(); client.close(); server.close()
@@ -6,6 +6,8 @@ from src.network.sysctl import (
     apply_sysctl_from_conf,
     backup_settings,
     revert_settings,
+    read_sysctl_values,
+    write_sysctl_values,
     SYSCTL_CONF_FILE,
     BACKUP_FILE
 )
@@ -100,4 +102,15 @@ class TestSysctl:
         result = revert_settings()
         
         mock_os_remove.assert_called_once_with(SYSCTL_CONF_FILE)
-        assert "Error: Backup file is corrupted. Cannot safely revert." in result
\ No newline at end of file
+        assert "Error: Backup file is corrupted. Cannot safely revert." in result
+
+class TestSysctlProcfs:
+    def test_read_and_write_sysctl_values(self, tmp_path):
+        ipv4 = tmp_path / "net" / "ipv4"
+        ipv4.mkdir(parents=True)
+        (ipv4 / "tcp_rmem").write_text("4096\t131072\t6291456\n")
+        values = read_sysctl_values(["net.ipv4.tcp_rmem", "net.ipv4.missing"], proc_root=str(tmp_path))
+        assert values == {"net.ipv4.tcp_rmem": "4096 131072 6291456", "net.ipv4.missing": None}
+        errors = write_sysctl_values({"net.ipv4.tcp_rmem": "4096 87380 16777216", "net.nope.key": "1"}, proc_root=str(tmp_path))
+        assert list(errors) == ["net.nope.key"]
+        assert (ipv4 / "tcp_rmem").read_text() == "4096 87380 16777216"
@@ -1,55 +1,36 @@
 import pytest
 from unittest.mock import patch, MagicMock
-import subprocess
-from src.utils.system import run_command
+from src.utils.system import run_command, run_commands
+
+@pytest.fixture
+def mock_executor():
+    with patch('src.utils.system.get_executor') as mock:
+        yield mock.return_value
 
 class TestSystem:
-    @patch('src.network.runner.subprocess.run')
-    def test_run_command_success(self, mock_subprocess_run):
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "command output"
-        mock_result.stderr = ""
-        mock_subprocess_run.return_value = mock_result
-
-        result = run_command(["echo", "hello"])
-        mock_subprocess_run.assert_called_once_with(
-            ["echo", "hello"],
-            shell=True, check=True, capture_output=True, text=True,
-            encoding='utf-8', timeout=None
-        )
+    def test_run_command_success(self, mock_executor):
+        mock_executor.run.return_value = (0, "command output", "")
+
+        result = run_command("echo hello")
+        mock_executor.run.assert_called_once_with("echo hello", timeout=None, cache=False)
         assert result == "command output"
 
-    @patch('src.network.runner.subprocess.run')
-    def test_run_command_failure(self, mock_subprocess_run, capsys):
-        mock_result = MagicMock()
-        mock_result.returncode = 1
-        mock_result.stdout = ""
-        mock_result.stderr = "error output"
-        mock_subprocess_run.side_effect = subprocess.CalledProcessError(1, cmd="false", stderr="error output")
-        mock_subprocess_run.return_value = mock_result
-
-        result = run_command(["false"])
-        mock_subprocess_run.assert_called_once_with(
-            ["false"],
-            shell=True, check=True, capture_output=True, text=True,
-            encoding='utf-8', timeout=None
-        )
+    def test_run_command_failure(self, mock_executor):
+        mock_executor.run.return_value = (1, "", "error output")
+
+        result = run_command("false")
+        mock_executor.run.assert_called_once_with("false", timeout=None, cache=False)
         assert result == "Error: error output"
 
-    @patch('src.network.runner.subprocess.run')
-    def test_run_command_suppress_errors(self, mock_subprocess_run):
-        mock_result = MagicMock()
-        mock_result.returncode = 1
-        mock_result.stdout = ""
-        mock_result.stderr = "error output"
-        mock_subprocess_run.side_effect = subprocess.CalledProcessError(1, cmd="false", stderr="error output")
-        mock_subprocess_run.return_value = mock_result
-
-        result = run_command(["false"], suppress_errors=True)
-        mock_subprocess_run.assert_called_once_with(
-            ["false"],
-            shell=True, check=True, capture_output=True, text=True,
-            encoding='utf-8', timeout=None
-        )
+    def test_run_command_suppress_errors(self, mock_executor):
+        mock_executor.run.return_value = (1, "", "error output")
+
+        result = run_command("false", suppress_errors=True)
         assert result == "Error: Command failed but error was suppressed."
+
+    def test_run_commands_returns_one_output_per_command(self, mock_executor):
+        mock_executor.run_batch.return_value = [(0, "5.15\n", ""), (1, "", "no lsb_release")]
+
+        result = run_commands(["uname -r", "lsb_release -d -s"], timeout=5, cache=True)
+        mock_executor.run_batch.assert_called_once_with(["uname -r", "lsb_release -d -s"], timeout=5, cache=True)
+        assert result == ["5.15\n", "Error: no lsb_release"]
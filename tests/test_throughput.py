@@ -0,0 +1,30 @@
+import os
+import time
+import pytest
+from unittest.mock import patch
+from src.network.throughput import format_throughput_report, run_throughput_benchmark
+
+@pytest.mark.integration
+@pytest.mark.slow
+@pytest.mark.parametrize("zero_copy", [True, False])
+def test_throughput_benchmark_over_loopback(zero_copy):
+    report = run_throughput_benchmark(duration=0.5, streams=1, zero_copy=zero_copy, source_size=1024 * 1024)
+    assert report["bytes"] > 0
+    assert report["gbit_per_s"] > 0
+    assert report["cpu_ns_per_byte"] > 0
+    assert report["zero_copy"] is zero_copy
+    assert len(format_throughput_report(report)) == 3
+
+@pytest.mark.integration
+@pytest.mark.slow
+def test_crashed_sender_times_out_instead_of_hanging():
+    def crash(*args):
+        os._exit(1)
+
+    with patch("src.network.throughput._sender", crash), \
+            patch("src.network.throughput.ACCEPT_TIMEOUT", 0.5), \
+            patch("src.network.throughput.WORKER_GRACE", 0.5):
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            run_throughput_benchmark(duration=0.2, streams=1, source_size=1024 * 1024)
+    assert time.monotonic() - started < 5
@@ -0,0 +1,34 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from src.network.checkpoints import CheckpointStore
+from src.network.tuning import NetworkTuningManager
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = NetworkTuningManager(MagicMock(), MagicMock(), CheckpointStore(str(tmp_path / "checkpoints"), conf_file=str(tmp_path / "tcp.conf")))
+    manager.sysctl_conf_file = str(tmp_path / "tcp.conf")
+    manager.backup_file = str(tmp_path / "tcp.conf.bak")
+    return manager
+
+class TestRevertSettings:
+    def test_revert_applies_the_backup_and_removes_both_files(self, manager, tmp_path):
+        (tmp_path / "tcp.conf").write_text("net.core.somaxconn=4096\n")
+        (tmp_path / "tcp.conf.bak").write_text(json.dumps({"net.core.somaxconn": "128", "net.ipv4.tcp_fin_timeout": "60"}))
+        applied = []
+        manager.runner.run_command.side_effect = lambda command: applied.append((tmp_path / "tcp.conf").read_text())
+        result = manager.revert_settings()
+        assert applied == ["net.core.somaxconn=128\nnet.ipv4.tcp_fin_timeout=60\n"]
+        assert not (tmp_path / "tcp.conf").exists() and not (tmp_path / "tcp.conf.bak").exists()
+        assert result == "Settings reverted. All optimizer config and backup files have been deleted."
+
+    def test_missing_backup_changes_nothing(self, manager, tmp_path):
+        (tmp_path / "tcp.conf").write_text("net.core.somaxconn=4096\n")
+        assert manager.revert_settings() == "No backup file found. Cannot revert."
+        assert (tmp_path / "tcp.conf").exists()
+        manager.runner.run_command.assert_not_called()
+
+    def test_corrupted_backup_is_reported_and_kept(self, manager, tmp_path):
+        (tmp_path / "tcp.conf.bak").write_text("{not json")
+        assert manager.revert_settings() == "Error: The backup file is corrupted. Cannot revert."
+        assert (tmp_path / "tcp.conf.bak").exists()
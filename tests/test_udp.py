@@ -0,0 +1,58 @@
+import os
+import time
+import socket
+import pytest
+from unittest.mock import patch
+from src.network import udp
+from src.network.udp import MessageBatch, format_udp_report, run_udp_benchmark
+
+@pytest.mark.skipif(udp._libc is None, reason="libc has no sendmmsg/recvmmsg")
+def test_message_batch_round_trip():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.connect(receiver.getsockname())
+    try:
+        outgoing = MessageBatch(8, 32, shared=True)
+        outgoing.buffer[:4] = b"ping"
+        assert outgoing.send(sender) == 8
+        incoming = MessageBatch(16, 32)
+        assert incoming.receive(receiver) == 8
+        assert incoming.msgs[7].msg_len == 32 and incoming.buffer[7 * 32:7 * 32 + 4] == b"ping"
+        with pytest.raises(BlockingIOError):
+            incoming.receive(receiver)
+    finally:
+        sender.close()
+        receiver.close()
+
+@pytest.mark.integration
+@pytest.mark.slow
+def test_udp_benchmark_accounts_for_every_datagram():
+    report = run_udp_benchmark(duration=0.5, rate=2000, rcvbuf=1 << 20)
+    assert report["sent"] > 0 and report["received"] + report["lost"] == report["sent"]
+    # Paced at 2000 pps with a generous buffer, nothing should be dropped and the rate must hold.
+    assert report["loss_pct"] == 0.0
+    assert report["sent_pps"] < 2000 * 1.5
+    assert set(report["udp_counters"]) >= {"RcvbufErrors", "SndbufErrors"}
+    assert len(format_udp_report(report)) == 3
+
+@pytest.mark.integration
+@pytest.mark.slow
+def test_udp_benchmark_falls_back_to_plain_send_and_recv():
+    with patch("src.network.udp._libc", None):
+        report = run_udp_benchmark(duration=0.3, gso=False, rate=1000)
+    assert not report["batched"] and not report["gso"]
+    assert report["received"] > 0
+    assert "send/recv" in format_udp_report(report)[0]
+
+@pytest.mark.integration
+@pytest.mark.slow
+def test_crashed_blaster_times_out_instead_of_hanging():
+    def crash(*args):
+        os._exit(1)
+
+    with patch("src.network.udp._blaster", crash), patch("src.network.udp.WORKER_GRACE", 0.5):
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            run_udp_benchmark(duration=0.2)
+    assert time.monotonic() - started < 5
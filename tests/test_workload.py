@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import patch
+from src.network.workload import (
+    HIGH_CHURN_OVERLAY,
+    SYNTHESIZED_HIGH_CHURN,
+    WORKLOAD_HIGH_CHURN,
+    WORKLOAD_INTERACTIVE,
+    WORKLOAD_LONG_FAT,
+    WORKLOAD_MIXED,
+    classify_workload,
+    collect_flow_samples,
+    recommend_profile,
+)
+
+def evidence(**overrides):
+    base = {
+        "window_s": 30.0, "arrival_rate": 1.0, "established": 10, "time_wait": 0, "syn_recv": 0,
+        "mean_flow_duration_s": 10.0, "bytes_per_flow": 2_000_000, "throughput_mbps": 100.0,
+        "rtt_ms": {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0},
+        "retrans_rate": 0.0, "listen_overflows": 0,
+    }
+    base.update(overrides)
+    return base
+
+PROFILES = {
+    "balanced": {"settings": {"net.ipv4.tcp_fin_timeout": "30", "net.core.default_qdisc": "fq"}},
+    "gaming": {"settings": {}},
+    "high_speed": {"settings": {}},
+    "ultimate_extreme": {"settings": {}},
+}
+
+class TestClassifyWorkload:
+    def test_high_churn(self):
+        workload, reasons = classify_workload(evidence(arrival_rate=800, time_wait=12000, mean_flow_duration_s=0.05))
+        assert workload == WORKLOAD_HIGH_CHURN
+        assert any("TIME-WAIT" in r for r in reasons)
+
+    def test_long_fat_flows(self):
+        workload, _ = classify_workload(evidence(mean_flow_duration_s=600, bytes_per_flow=500_000_000, throughput_mbps=2000))
+        assert workload == WORKLOAD_LONG_FAT
+
+    def test_interactive(self):
+        workload, _ = classify_workload(evidence(mean_flow_duration_s=120, bytes_per_flow=40_000, throughput_mbps=2))
+        assert workload == WORKLOAD_INTERACTIVE
+
+    def test_no_dominant_pattern_is_mixed(self):
+        workload, _ = classify_workload(evidence())
+        assert workload == WORKLOAD_MIXED
+
+class TestRecommendProfile:
+    def test_high_churn_synthesizes_from_balanced(self):
+        key, data = recommend_profile(WORKLOAD_HIGH_CHURN, evidence(), PROFILES)
+        assert key == SYNTHESIZED_HIGH_CHURN
+        assert data["settings"]["net.core.default_qdisc"] == "fq"
+        assert data["settings"]["net.ipv4.tcp_fin_timeout"] == HIGH_CHURN_OVERLAY["net.ipv4.tcp_fin_timeout"]
+
+    def test_long_fat_picks_by_throughput(self):
+        assert recommend_profile(WORKLOAD_LONG_FAT, evidence(throughput_mbps=900), PROFILES)[0] == "high_speed"
+        assert recommend_profile(WORKLOAD_LONG_FAT, evidence(throughput_mbps=9000), PROFILES)[0] == "ultimate_extreme"
+
+@patch("src.network.workload.iter_tcp_sockets", side_effect=OSError(97, "unsupported"))
+@patch("src.network.workload.run_command")
+def test_collect_flow_samples_falls_back_to_ss(mock_run_command, mock_iter_tcp_sockets):
+    mock_run_command.return_value = (
+        "Recv-Q Send-Q Local Address:Port Peer Address:Port\n"
+        "0 0 10.0.0.1:22 10.0.0.2:5000\n"
+        "\t cubic rto:204 rtt:1.5/0.7 bytes_acked:1000 bytes_received:500 cwnd:10\n"
+    )
+    assert collect_flow_samples() == ([1.5], 1500)
+
+
+@patch("src.network.workload.iter_tcp_sockets", return_value=iter([
+    {"tcp_info": {"rtt": 1500, "bytes_acked": 1000, "bytes_received": 500}},
+    {"tcp_info": None},
+    {"tcp_info": {"rtt": 2500, "bytes_acked": 100}},
+]))
+def test_collect_flow_samples_keeps_only_aggregates(mock_iter_tcp_sockets):
+    assert collect_flow_samples() == ([1.5, 2.5], 1600)